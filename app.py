@@ -1,10 +1,6 @@
 import streamlit as st
-import json
-from core.pipeline import run_detection_pipeline
-from security.validator import (
-    validate_file_size,
-    validate_logs
-)
+from security.validator import validate_file_size
+from ui.scan_jobs import follow_scan_job, submit_scan
 
 
 # ----------------------------
@@ -24,6 +20,7 @@ st.title("🛡️ AegisIR - Autonomous Cyber Incident Response System")
 
 if "results" not in st.session_state:
     st.session_state.results = None
+    st.session_state.playbooks = None
 
 # ----------------------------
 # Sidebar Upload Section
@@ -32,13 +29,13 @@ if "results" not in st.session_state:
 st.sidebar.header("📂 Upload Log Files")
 
 auth_file = st.sidebar.file_uploader(
-    "Upload Auth Logs (JSON)", type=["json"]
+    "Upload Auth Logs (JSON)", type=["json", "jsonl"]
 )
 endpoint_file = st.sidebar.file_uploader(
-    "Upload Endpoint Logs (JSON)", type=["json"]
+    "Upload Endpoint Logs (JSON)", type=["json", "jsonl"]
 )
 network_file = st.sidebar.file_uploader(
-    "Upload Network Logs (JSON)", type=["json"]
+    "Upload Network Logs (JSON)", type=["json", "jsonl"]
 )
 
 # ----------------------------
@@ -53,35 +50,14 @@ if auth_file and endpoint_file and network_file:
         validate_file_size(endpoint_file)
         validate_file_size(network_file)
 
-        # 🔐 Safe JSON loading
-        auth_logs = json.loads(auth_file.getvalue().decode("utf-8"))
-        endpoint_logs = json.loads(endpoint_file.getvalue().decode("utf-8"))
-        network_logs = json.loads(network_file.getvalue().decode("utf-8"))
-
-        # 🔐 Schema & structure validation
-        if isinstance(auth_logs, dict) and "logs" in auth_logs:
-          auth_logs = auth_logs["logs"]
-
-        validate_logs(auth_logs)
-        validate_logs(endpoint_logs)
-        validate_logs(network_logs)
-
         st.sidebar.success("✅ Logs uploaded successfully.")
 
         if st.sidebar.button("🚀 Start Security Scan"):
 
-            with st.spinner(
-                "🛡️ Correlating multi-system events... "
-                "Running ML anomaly detection... "
-                "Generating autonomous response playbook..."
-            ):
-                st.session_state.results = run_detection_pipeline(
-                    auth_logs,
-                    endpoint_logs,
-                    network_logs
-                )
-
-            st.sidebar.success("✅ Scan completed successfully.")
+            # 🔐 Runs as a background job (core.jobs): records are parsed and
+            # validated as they stream in, and uploads scanned before are
+            # answered from the result cache
+            submit_scan(auth_file, endpoint_file, network_file)
 
     except Exception:
         st.sidebar.error("❌ Invalid log format. Please upload valid JSON files.")
@@ -90,6 +66,24 @@ if auth_file and endpoint_file and network_file:
 else:
     st.sidebar.info("Upload all three log files and click 'Start Security Scan'.")
 
+# ----------------------------
+# Scan Job Progress
+# ----------------------------
+
+# Reruns the page until this session's scan has finished
+job = follow_scan_job()
+
+if job is not None and job["status"] == "failed":
+    st.sidebar.error(f"❌ Scan failed: {job['error']}")
+    st.stop()
+
+if job is not None:
+    st.sidebar.success("✅ Scan completed successfully.")
+
+    skipped = job["results"]["validation"]["invalid_records"]
+    if skipped:
+        st.sidebar.warning(f"⚠️ {skipped} malformed log records were skipped.")
+
 # ----------------------------
 # Stop Execution Until Scan Runs
 # ----------------------------
@@ -215,6 +209,13 @@ if results["incidents"]:
 
     st.subheader("🛠 Automated Response Playbook")
 
+    if not incident.get("playbook") and st.session_state.playbooks is not None:
+        # Render tokens as they arrive; the final text is shown below
+        placeholder = st.empty()
+        for text in st.session_state.playbooks.stream(incident):
+            placeholder.markdown(text)
+        placeholder.empty()
+
     if "playbook" in incident and incident["playbook"]:
         with st.expander("View Full Response Playbook", expanded=True):
             st.markdown(incident["playbook"])
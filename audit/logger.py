@@ -1,14 +1,314 @@
-import os
-import json
+import atexit
 import datetime
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+# Audit records are appended as JSON Lines to rotating segment files, with a
+# small index (one line per record) of segment offsets by run, time and the
+# run's incident ids so past runs can be read back without scanning every
+# segment. Incident ids restart at INC001 in every run, so an incident is
+# identified by (run_id, incident_id).
+AUDIT_DIR = os.environ.get("AEGISIR_AUDIT_DIR", "logs/audit")
+AUDIT_MAX_SEGMENT_BYTES = int(os.environ.get("AEGISIR_AUDIT_MAX_BYTES", 64 * 1024 * 1024))
+AUDIT_ROTATE_SECONDS = float(os.environ.get("AEGISIR_AUDIT_ROTATE_SECONDS", 24 * 3600))
+AUDIT_COMPRESS = os.environ.get("AEGISIR_AUDIT_COMPRESS", "0") == "1"
+
+# fsync after this many records or seconds, whichever comes first
+FSYNC_BATCH_RECORDS = 32
+FSYNC_INTERVAL_SECONDS = 1.0
+
+# Longest wait for queued records when the process exits
+FLUSH_TIMEOUT_SECONDS = 10.0
+
+INDEX_FILE = "index.jsonl"
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _encode(line, compress):
+
+    # Compressed records are independent gzip members, so an index offset
+    # can be decompressed on its own.
+    if not compress:
+        return line
+
+    compressor = zlib.compressobj(wbits=31)
+
+    return compressor.compress(line) + compressor.flush()
+
+
+def _decode(data, compressed):
+
+    if compressed:
+        data = zlib.decompress(data, wbits=31)
+
+    return json.loads(data)
+
+
+class AuditLogWriter:
+
+    def __init__(self, directory=AUDIT_DIR, max_segment_bytes=AUDIT_MAX_SEGMENT_BYTES,
+                 rotate_seconds=AUDIT_ROTATE_SECONDS, compress=AUDIT_COMPRESS):
+
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compress = compress
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue = queue.Queue()
+        self._segment = None
+        self._segment_path = None
+        self._segment_opened = 0.0
+        self._sequence = 0
+        self._index = open(os.path.join(directory, INDEX_FILE), "ab")
+
+        # Records that could not be written; write_audit_log has already
+        # returned their run_id, so failures are counted and reported here
+        self.written = 0
+        self.failed = 0
+        self.last_error = None
+
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, results, run_id=None):
+
+        # Serialised here so later changes to results (e.g. playbooks being
+        # filled in) cannot race with the writer thread. A run_id ties a
+        # follow-up record to an earlier one.
+        now = datetime.datetime.now()
+        run_id = run_id or f"{now.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        record = {"run_id": run_id, "timestamp": now.strftime(TIME_FORMAT)}
+        record.update(results)
+
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        entry = {
+            "run_id": run_id,
+            "time": record["timestamp"],
+            "incident_ids": [i.get("incident_id") for i in results.get("incidents", [])]
+        }
+
+        self._queue.put((line.encode("utf-8"), entry))
+
+        return run_id
+
+    def flush(self, timeout=FLUSH_TIMEOUT_SECONDS):
+
+        # True once every queued record is on disk (or has failed); False
+        # if that takes longer than timeout
+        deadline = time.monotonic() + timeout
+
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+
+        return True
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "failed": self.failed,
+            "queued": self._queue.unfinished_tasks,
+            "last_error": self.last_error
+        }
+
+    def _failure(self, error):
+
+        self.failed += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        print(f"audit-writer: record not written ({self.last_error})", file=sys.stderr)
+
+        # The segment may end in a partial record; later records go to a new one
+        try:
+            if self._segment is not None:
+                self._segment.close()
+        except Exception:
+            pass
+
+        self._segment = None
+
+    def _open_segment(self):
+
+        if self._segment is not None:
+            self._sync()
+            self._segment.close()
+
+        self._sequence += 1
+        suffix = ".jsonl.gz" if self.compress else ".jsonl"
+        name = (
+            f"audit_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            f"_{os.getpid()}_{self._sequence:04d}{suffix}"
+        )
+
+        self._segment_path = os.path.join(self.directory, name)
+        self._segment = open(self._segment_path, "ab")
+        self._segment_opened = time.monotonic()
+
+    def _needs_rotation(self, size):
+        return (
+            self._segment is None or
+            self._segment.tell() + size > self.max_segment_bytes or
+            time.monotonic() - self._segment_opened > self.rotate_seconds
+        )
+
+    def _sync(self):
+        for f in (self._segment, self._index):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _write(self, line, entry):
+
+        data = _encode(line, self.compress)
+
+        if self._needs_rotation(len(data)):
+            self._open_segment()
+
+        offset = self._segment.tell()
+        self._segment.write(data)
+
+        entry.update({
+            "file": os.path.basename(self._segment_path),
+            "offset": offset,
+            "length": len(data),
+            "compressed": self.compress
+        })
+        self._index.write((json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8"))
+
+    def _run(self):
+
+        pending = 0
+        last_sync = time.monotonic()
+
+        while True:
+            try:
+                item = self._queue.get(timeout=FSYNC_INTERVAL_SECONDS)
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+                # Any error is counted and the loop carries on, so flush()
+                # never waits on a dead thread
+                try:
+                    self._write(*item)
+                    self.written += 1
+                    pending += 1
+                except Exception as e:
+                    self._failure(e)
+
+            due = time.monotonic() - last_sync >= FSYNC_INTERVAL_SECONDS
+
+            # Sync before task_done() so flush() means "on disk"
+            if pending and (pending >= FSYNC_BATCH_RECORDS or due or self._queue.empty()):
+                try:
+                    self._sync()
+                except Exception as e:
+                    self._failure(e)
+                pending = 0
+                last_sync = time.monotonic()
+
+            if item is not None:
+                self._queue.task_done()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+
+    global _writer
+
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditLogWriter()
+            atexit.register(_writer.flush)
+
+    return _writer
+
 
 def write_audit_log(results):
 
-    os.makedirs("logs", exist_ok=True)
+    # Non-blocking: returns the run_id; the record is written in the background
+    return get_audit_writer().submit(results)
+
+
+def write_playbook_audit(run_id, incidents):
+
+    # Follow-up record for a run audited before its playbooks existed: UI
+    # scans run the pipeline with playbooks=False and generate them after
+    # (response.llm_playbook.PlaybookBatch). find_audit_records(run_id)
+    # returns both records.
+    return get_audit_writer().submit({
+        "record_type": "playbooks",
+        "incidents": [
+            {"incident_id": incident["incident_id"], "playbook": incident.get("playbook")}
+            for incident in incidents
+        ]
+    }, run_id=run_id)
+
+
+def audit_writer_stats():
+    return get_audit_writer().stats()
+
+
+def _iter_index(directory):
+
+    path = os.path.join(directory, INDEX_FILE)
+
+    if not os.path.exists(path):
+        return
+
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _read_record(directory, entry):
+
+    with open(os.path.join(directory, entry["file"]), "rb") as f:
+        f.seek(entry["offset"])
+        return _decode(f.read(entry["length"]), entry.get("compressed", False))
+
+
+def find_audit_records(run_id=None, incident_id=None, since=None, until=None,
+                       directory=AUDIT_DIR):
+
+    # Looks runs up through the index and reads only the matching records.
+    # since/until are datetimes or "%Y-%m-%d %H:%M:%S" strings.
+    if incident_id is not None and run_id is None:
+        raise ValueError("Incident ids are only unique within a run; pass its run_id too.")
+
+    if isinstance(since, datetime.datetime):
+        since = since.strftime(TIME_FORMAT)
+    if isinstance(until, datetime.datetime):
+        until = until.strftime(TIME_FORMAT)
+
+    records = []
 
-    filename = f"logs/audit_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    for entry in _iter_index(directory):
+        if run_id is not None and entry["run_id"] != run_id:
+            continue
+        if incident_id is not None and incident_id not in entry["incident_ids"]:
+            continue
+        if since is not None and entry["time"] < since:
+            continue
+        if until is not None and entry["time"] > until:
+            continue
 
-    with open(filename, "w") as f:
-        json.dump(results, f, indent=4)
+        records.append(_read_record(directory, entry))
 
-    return filename
+    return records
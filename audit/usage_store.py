@@ -0,0 +1,207 @@
+import datetime
+import json
+import math
+import os
+import sqlite3
+import threading
+
+USAGE_DB_PATH = os.environ.get("AEGISIR_USAGE_DB", "logs/system_usage.db")
+
+# Previous read-modify-write history, imported once into the store
+LEGACY_USAGE_PATH = "logs/system_usage.json"
+
+RECENT_RUNS_LIMIT = 50
+
+
+class UsageStore:
+
+    # Scan usage history in SQLite (WAL). Appends are a single insert plus a
+    # running-totals update in one transaction, so summary queries are O(1)
+    # and concurrent Streamlit sessions or processes never lose updates.
+
+    def __init__(self, path=USAGE_DB_PATH, legacy_path=LEGACY_USAGE_PATH):
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                total_logs INTEGER NOT NULL,
+                incidents_detected INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS totals (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_runs INTEGER NOT NULL,
+                total_logs INTEGER NOT NULL,
+                total_incidents INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS stage_metrics (
+                run_id INTEGER NOT NULL REFERENCES runs(id),
+                stage TEXT NOT NULL,
+                wall_ms REAL,
+                cpu_ms REAL,
+                peak_rss_mb REAL,
+                rows INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS stage_metrics_run ON stage_metrics (run_id);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            INSERT OR IGNORE INTO totals VALUES (1, 0, 0, 0);
+        """)
+
+        if legacy_path:
+            self._import_legacy(legacy_path)
+
+    def _import_legacy(self, legacy_path):
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+
+            try:
+                imported = self._db.execute(
+                    "SELECT 1 FROM meta WHERE key = 'legacy_imported'"
+                ).fetchone()
+
+                if not imported and os.path.exists(legacy_path):
+                    with open(legacy_path, "r") as f:
+                        for record in json.load(f):
+                            self._insert(
+                                record["timestamp"],
+                                record["total_logs"],
+                                record["incidents_detected"]
+                            )
+
+                self._db.execute("INSERT OR IGNORE INTO meta VALUES ('legacy_imported', '1')")
+                self._db.execute("COMMIT")
+
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _insert(self, timestamp, total_logs, incidents_detected):
+
+        self._db.execute(
+            "INSERT INTO runs (timestamp, total_logs, incidents_detected) VALUES (?, ?, ?)",
+            (timestamp, total_logs, incidents_detected)
+        )
+        self._db.execute(
+            "UPDATE totals SET total_runs = total_runs + 1, "
+            "total_logs = total_logs + ?, total_incidents = total_incidents + ? "
+            "WHERE id = 1",
+            (total_logs, incidents_detected)
+        )
+
+    def record_run(self, total_logs, incidents_detected, timestamp=None, stage_metrics=None):
+
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+
+            try:
+                self._insert(timestamp, int(total_logs), int(incidents_detected))
+                run_id = self._db.execute("SELECT last_insert_rowid()").fetchone()[0]
+
+                # results["stage_metrics"] from core.pipeline
+                self._db.executemany(
+                    "INSERT INTO stage_metrics VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (run_id, m["stage"], m.get("wall_ms"), m.get("cpu_ms"),
+                         m.get("peak_rss_mb"), m.get("rows"))
+                        for m in stage_metrics or []
+                    ]
+                )
+                self._db.execute("COMMIT")
+
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+        return run_id
+
+    def summary(self):
+
+        with self._lock:
+            total_runs, total_logs, total_incidents = self._db.execute(
+                "SELECT total_runs, total_logs, total_incidents FROM totals WHERE id = 1"
+            ).fetchone()
+
+        return {
+            "total_runs": total_runs,
+            "total_logs": total_logs,
+            "total_incidents": total_incidents
+        }
+
+    def recent_runs(self, limit=RECENT_RUNS_LIMIT):
+
+        # Newest first, straight off the primary key
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, timestamp, total_logs, incidents_detected FROM runs "
+                "ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+        return [
+            {
+                "id": run_id,
+                "timestamp": timestamp,
+                "total_logs": total_logs,
+                "incidents_detected": incidents_detected
+            }
+            for run_id, timestamp, total_logs, incidents_detected in rows
+        ]
+
+    def stage_latency_percentiles(self, runs=RECENT_RUNS_LIMIT, percentiles=(50, 95)):
+
+        # Wall-time percentiles per pipeline stage over the last `runs` runs,
+        # in pipeline order: {stage: {"runs": n, "p50_ms": ..., "p95_ms": ...}}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT stage, wall_ms FROM stage_metrics "
+                "WHERE run_id > (SELECT COALESCE(MAX(id), 0) FROM runs) - ? "
+                "ORDER BY run_id, rowid",
+                (runs,)
+            ).fetchall()
+
+        samples = {}
+        for stage, wall_ms in rows:
+            if wall_ms is not None:
+                samples.setdefault(stage, []).append(wall_ms)
+
+        stats = {}
+        for stage, values in samples.items():
+            values.sort()
+            stats[stage] = {"runs": len(values)}
+
+            for p in percentiles:
+                # Nearest-rank percentile
+                rank = max(math.ceil(p / 100 * len(values)), 1)
+                stats[stage][f"p{p}_ms"] = values[rank - 1]
+
+        return stats
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_usage_store():
+
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = UsageStore()
+
+    return _store
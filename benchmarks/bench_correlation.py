@@ -0,0 +1,199 @@
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from correlation.engine import correlate_incidents, correlate_incidents_chunked, time_chunks
+from correlation.rules import RULES_PATH, RuleSet, load_rules
+
+
+# ----------------------------
+# Synthetic scored events
+# ----------------------------
+
+def synthetic_events(n_events, n_users=50, attacks_per_10k=5, seed=42):
+
+    rng = np.random.default_rng(seed)
+
+    start = pd.Timestamp("2026-02-16")
+    offsets = rng.integers(0, 24 * 3600, n_events)
+    users = rng.integers(0, n_users, n_events)
+
+    df = pd.DataFrame({
+        "timestamp": start + pd.to_timedelta(offsets, unit="s"),
+        "user": users.astype(str),
+        "log_source": rng.choice(["auth", "endpoint", "network"], n_events),
+        "is_failed": (rng.random(n_events) < 0.05).astype(int),
+        "is_unusual_ip": (rng.random(n_events) < 0.02).astype(int),
+        "is_privilege_escalation": (rng.random(n_events) < 0.01).astype(int),
+        "is_sensitive_access": (rng.random(n_events) < 0.02).astype(int),
+        "data_volume_mb": rng.integers(0, 50, n_events),
+        "anomaly_flag": np.where(rng.random(n_events) < 0.1, -1, 1),
+        "anomaly_score": rng.normal(0.05, 0.1, n_events)
+    })
+
+    # Inject attack bursts: 8 suspicious events for one user within 20 minutes
+    n_attacks = max(1, n_events * attacks_per_10k // 10_000)
+    burst = np.arange(8)
+
+    attack_rows = n_attacks * len(burst)
+    attack_start = rng.integers(0, 23 * 3600, n_attacks).repeat(len(burst))
+
+    attacks = pd.DataFrame({
+        "timestamp": start + pd.to_timedelta(attack_start + np.tile(burst * 150, n_attacks), unit="s"),
+        "user": rng.integers(0, n_users, n_attacks).repeat(len(burst)).astype(str),
+        "log_source": np.tile(["auth"] * 6 + ["endpoint", "network"], n_attacks),
+        "is_failed": np.tile([1] * 6 + [0, 0], n_attacks),
+        "is_unusual_ip": np.tile([1] * 6 + [0, 0], n_attacks),
+        "is_privilege_escalation": np.tile([0] * 6 + [1, 0], n_attacks),
+        "is_sensitive_access": np.tile([0] * 6 + [1, 0], n_attacks),
+        "data_volume_mb": np.tile([0] * 7 + [850], n_attacks),
+        "anomaly_flag": np.full(attack_rows, -1),
+        "anomaly_score": rng.normal(-0.2, 0.05, attack_rows)
+    })
+
+    return pd.concat([df, attacks], ignore_index=True)
+
+
+# ----------------------------
+# Reference implementation (per-row sliding window, O(n^2) per user)
+# ----------------------------
+
+def legacy_correlate_incidents(df):
+
+    # Every qualifying window, with overlapping windows of a user merged
+    incidents = []
+    df = df.sort_values("timestamp", kind="stable")
+
+    for user in df["user"].unique():
+
+        user_logs = df[df["user"] == user]
+        runs = []
+
+        for i in range(len(user_logs)):
+
+            window_start = user_logs.iloc[i]["timestamp"]
+            window_end = window_start + pd.Timedelta(minutes=30)
+
+            in_window = (
+                (user_logs["timestamp"] >= window_start) &
+                (user_logs["timestamp"] <= window_end)
+            ).to_numpy()
+            window_logs = user_logs[in_window]
+
+            if (
+                window_logs["is_failed"].sum() >= 5 and
+                window_logs["is_unusual_ip"].sum() >= 1 and
+                window_logs["is_privilege_escalation"].sum() >= 1 and
+                window_logs["is_sensitive_access"].sum() >= 1 and
+                window_logs["data_volume_mb"].max() > 500 and
+                (window_logs["anomaly_flag"] == -1).sum() >= 2
+            ):
+                positions = np.flatnonzero(in_window)
+                lo, hi = positions[0], positions[-1] + 1
+
+                if runs and lo < runs[-1][1]:
+                    runs[-1][1] = max(runs[-1][1], hi)
+                else:
+                    runs.append([lo, hi])
+
+        for lo, hi in runs:
+            run_logs = user_logs.iloc[lo:hi]
+            incidents.append((
+                str(user),
+                run_logs["timestamp"].iloc[0].strftime("%Y-%m-%d %H:%M:%S"),
+                run_logs["timestamp"].iloc[-1].strftime("%Y-%m-%d %H:%M:%S"),
+                int(len(run_logs))
+            ))
+
+    return incidents
+
+
+def _signature(incidents):
+    return sorted((i["user"], i["start_time"], i["end_time"], i["events_count"]) for i in incidents)
+
+
+def _rule_specs():
+    with open(RULES_PATH) as f:
+        return json.load(f)["rules"]
+
+
+def legacy_rules():
+    return RuleSet([s for s in _rule_specs() if s["id"] == "account_compromise_exfiltration"])
+
+
+def scaled_rules(n_rules):
+
+    # n variants of the shipped rules with shifted thresholds; they share the
+    # shipped windows, so they fall into the same evaluation groups.
+    specs = []
+
+    for i in range(n_rules):
+        spec = dict(_rule_specs()[i % len(_rule_specs())])
+        spec["id"] = f"{spec['id']}_{i}"
+        spec["when"] = [
+            condition.rsplit(" ", 1)[0] + f" {int(condition.rsplit(' ', 1)[1]) + i // 4}"
+            for condition in spec["when"]
+        ]
+        specs.append(spec)
+
+    return RuleSet(specs)
+
+
+def _chunked(df):
+    return correlate_incidents_chunked(time_chunks(df), legacy_rules())
+
+
+def _timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+
+# ----------------------------
+# Benchmark
+# ----------------------------
+
+def main(sizes=(1_000, 10_000, 100_000, 1_000_000), legacy_limit=10_000):
+
+    print(
+        f"{'events':>10} {'rolling (s)':>12} {'us/event':>9} {'chunked (s)':>12} "
+        f"{'legacy (s)':>11} {'incidents':>10} {'4 rules (s)':>12} {'32 rules (s)':>13}"
+    )
+
+    rules = legacy_rules()
+    shipped = load_rules()
+    many = scaled_rules(32)
+
+    for n_events in sizes:
+
+        df = synthetic_events(n_events)
+        incidents, elapsed = _timed(lambda frame: correlate_incidents(frame, rules), df)
+
+        # Hour-by-hour correlation must give exactly the same incidents
+        chunked, chunked_elapsed = _timed(_chunked, df)
+        assert chunked == incidents, "chunked incidents differ from the full frame"
+
+        legacy_elapsed = ""
+
+        if n_events <= legacy_limit:
+            legacy, legacy_elapsed = _timed(legacy_correlate_incidents, df)
+            assert _signature(incidents) == sorted(legacy), "incident mismatch vs legacy"
+            legacy_elapsed = f"{legacy_elapsed:.3f}"
+
+        # Rules sharing a window and key are evaluated in one pass
+        _, shipped_elapsed = _timed(lambda frame: correlate_incidents(frame, shipped), df)
+        _, many_elapsed = _timed(lambda frame: correlate_incidents(frame, many), df)
+
+        print(
+            f"{n_events:>10} {elapsed:>12.3f} {elapsed / n_events * 1e6:>9.2f} "
+            f"{chunked_elapsed:>12.3f} {legacy_elapsed:>11} {len(incidents):>10} "
+            f"{shipped_elapsed:>12.3f} {many_elapsed:>13.3f}"
+        )
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(s) for s in sys.argv[1:]) or (1_000, 10_000, 100_000, 1_000_000)
+    main(sizes)
@@ -0,0 +1,85 @@
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from detection.anomaly_model import risk_indicators
+
+
+# ----------------------------
+# Synthetic preprocessed events
+# ----------------------------
+
+def synthetic_features(n_events, seed=42):
+
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({
+        "is_failed": (rng.random(n_events) < 0.05).astype(int),
+        "is_unusual_ip": (rng.random(n_events) < 0.02).astype(int),
+        "is_privilege_escalation": (rng.random(n_events) < 0.01).astype(int),
+        "is_sensitive_access": (rng.random(n_events) < 0.02).astype(int),
+        "data_volume_mb": rng.integers(0, 50, n_events),
+        "hour": rng.integers(0, 24, n_events)
+    })
+
+
+# ----------------------------
+# Approaches
+# ----------------------------
+
+def legacy_row_dicts(df):
+
+    # Previous explainability layer: one dict per row through df.apply
+    df["risk_indicators"] = df.apply(lambda row: {
+        "failed_login": int(row["is_failed"]),
+        "unusual_ip": int(row["is_unusual_ip"]),
+        "privilege_escalation": int(row["is_privilege_escalation"]),
+        "sensitive_access": int(row["is_sensitive_access"]),
+        "data_volume_mb": float(row["data_volume_mb"]),
+        "login_hour": int(row["hour"])
+    }, axis=1)
+
+    return df
+
+
+def lazy_incident_rows(df, incident_rows=200):
+
+    # Typed columns stay as they are; dicts only for rows in incidents
+    return risk_indicators(df.iloc[:incident_rows])
+
+
+def _measure(func, df):
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    func(df)
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak / (1024 * 1024)
+
+
+# ----------------------------
+# Benchmark
+# ----------------------------
+
+def main(sizes=(10_000, 100_000, 1_000_000)):
+
+    print(f"{'events':>10} {'approach':>10} {'wall (s)':>9} {'peak (MB)':>10}")
+
+    for n_events in sizes:
+
+        for name, func in (("legacy", legacy_row_dicts), ("lazy", lazy_incident_rows)):
+            elapsed, peak = _measure(func, synthetic_features(n_events))
+            print(f"{n_events:>10} {name:>10} {elapsed:>9.3f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(s) for s in sys.argv[1:]) or (10_000, 100_000, 1_000_000)
+    main(sizes)
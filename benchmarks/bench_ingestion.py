@@ -0,0 +1,163 @@
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from preprocessing.feature_engineering import preprocess_logs
+
+
+# ----------------------------
+# Synthetic raw records
+# ----------------------------
+
+def synthetic_logs(n_events, seed=42):
+
+    rng = random.Random(seed)
+    base_time = datetime(2026, 2, 16)
+    per_source = n_events // 3
+
+    def stamp():
+        return (base_time + timedelta(seconds=rng.randint(0, 86_400), microseconds=rng.randint(0, 999_999))).isoformat()
+
+    def user():
+        return f"user_{rng.randint(1, 200)}"
+
+    auth_logs = [{
+        "timestamp": stamp(),
+        "user": user(),
+        "event_type": "login_attempt",
+        "status": "failed" if rng.random() < 0.05 else "success",
+        "ip": f"192.168.1.{rng.randint(2, 50)}" if rng.random() < 0.98 else f"203.45.{rng.randint(10, 99)}.7"
+    } for _ in range(per_source)]
+
+    endpoint_logs = [{
+        "timestamp": stamp(),
+        "user": user(),
+        "event_type": "privilege_escalation" if rng.random() < 0.01 else "file_access",
+        "asset": "server_A",
+        "sensitive_access": rng.random() < 0.02
+    } for _ in range(per_source)]
+
+    network_logs = [{
+        "timestamp": stamp(),
+        "user": user(),
+        "event_type": "data_transfer",
+        "destination_ip": "192.168.1.20",
+        "data_volume_mb": rng.randint(1, 50)
+    } for _ in range(per_source)]
+
+    return auth_logs, endpoint_logs, network_logs
+
+
+# ----------------------------
+# Reference implementation (list of dicts -> DataFrame)
+# ----------------------------
+
+def legacy_preprocess_logs(auth_logs, endpoint_logs, network_logs):
+
+    all_records = []
+
+    for log in auth_logs:
+        all_records.append({
+            "timestamp": log["timestamp"],
+            "user": log["user"],
+            "log_source": "auth",
+            "is_failed": 1 if log.get("status") == "failed" else 0,
+            "is_unusual_ip": 0 if log.get("ip", "").startswith("192.168") else 1,
+            "is_privilege_escalation": 0,
+            "is_sensitive_access": 0,
+            "data_volume_mb": 0
+        })
+
+    for log in endpoint_logs:
+        all_records.append({
+            "timestamp": log["timestamp"],
+            "user": log["user"],
+            "log_source": "endpoint",
+            "is_failed": 0,
+            "is_unusual_ip": 0,
+            "is_privilege_escalation": 1 if log.get("event_type") == "privilege_escalation" else 0,
+            "is_sensitive_access": 1 if log.get("sensitive_access") else 0,
+            "data_volume_mb": 0
+        })
+
+    for log in network_logs:
+        all_records.append({
+            "timestamp": log["timestamp"],
+            "user": log["user"],
+            "log_source": "network",
+            "is_failed": 0,
+            "is_unusual_ip": 0,
+            "is_privilege_escalation": 0,
+            "is_sensitive_access": 0,
+            "data_volume_mb": log.get("data_volume_mb", 0)
+        })
+
+    df = pd.DataFrame(all_records)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df["hour"] = df["timestamp"].dt.hour
+
+    return df
+
+
+def _measure(func, logs):
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    df = func(*logs)
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return df, elapsed, peak / (1024 * 1024)
+
+
+def _same_features(legacy, columnar):
+
+    for column in legacy.columns:
+        if column in ("user", "log_source"):
+            equal = (legacy[column].astype(str) == columnar[column].astype(str)).all()
+        else:
+            equal = (legacy[column] == columnar[column]).all()
+
+        if not equal:
+            return False
+
+    return True
+
+
+# ----------------------------
+# Benchmark
+# ----------------------------
+
+def main(sizes=(30_000, 300_000, 1_500_000)):
+
+    print(f"{'events':>10} {'approach':>9} {'wall (s)':>9} {'peak (MB)':>10} {'MB/1M events':>13} {'frame (MB)':>11}")
+
+    for n_events in sizes:
+
+        logs = synthetic_logs(n_events)
+        n_events = sum(len(source) for source in logs)
+        frames = {}
+
+        for name, func in (("legacy", legacy_preprocess_logs), ("columnar", preprocess_logs)):
+            df, elapsed, peak = _measure(func, logs)
+            frame_mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
+            frames[name] = df
+
+            print(
+                f"{n_events:>10} {name:>9} {elapsed:>9.3f} {peak:>10.1f} "
+                f"{peak / n_events * 1e6:>13.1f} {frame_mb:>11.1f}"
+            )
+
+        assert _same_features(frames["legacy"], frames["columnar"]), "feature mismatch vs legacy"
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(s) for s in sys.argv[1:]) or (30_000, 300_000, 1_500_000)
+    main(sizes)
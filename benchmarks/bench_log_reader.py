@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_ingestion import synthetic_logs
+from preprocessing.log_reader import stream_logs
+
+
+# ----------------------------
+# Approaches (count records, keep nothing)
+# ----------------------------
+
+def whole_file(path):
+
+    # Previous upload path: bytes + decoded string + parsed list at once
+    with open(path, "rb") as f:
+        logs = json.loads(f.read().decode("utf-8"))
+
+    return sum(1 for _ in logs)
+
+
+def streamed(path):
+
+    with open(path, "rb") as f:
+        return sum(1 for _ in stream_logs(f))
+
+
+def _measure(func, path):
+
+    # Timed without tracemalloc, which slows allocation-heavy code
+    start = time.perf_counter()
+    count = func(path)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return count, elapsed, peak / (1024 * 1024)
+
+
+# ----------------------------
+# Benchmark
+# ----------------------------
+
+def main(sizes=(30_000, 300_000)):
+
+    print(f"{'records':>9} {'file (MB)':>10} {'approach':>9} {'wall (s)':>9} {'peak (MB)':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        for n_events in sizes:
+
+            path = os.path.join(tmp, "auth_logs.json")
+            auth_logs = synthetic_logs(n_events * 3)[0]
+
+            with open(path, "w") as f:
+                json.dump(auth_logs, f, indent=4)
+
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            del auth_logs
+
+            for name, func in (("whole", whole_file), ("streamed", streamed)):
+                count, elapsed, peak = _measure(func, path)
+                print(f"{count:>9} {size_mb:>10.1f} {name:>9} {elapsed:>9.3f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(s) for s in sys.argv[1:]) or (30_000, 300_000)
+    main(sizes)
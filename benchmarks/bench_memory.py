@@ -0,0 +1,88 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from generate_logs import generate_logs
+from preprocessing.feature_engineering import preprocess_logs
+from detection.anomaly_model import risk_indicators, train_anomaly_model
+
+# Bytes per event of the scored pipeline frame: the compact schema
+# (preprocessing.feature_engineering.EVENT_SCHEMA) against the original
+# representation, i.e. object strings, 64-bit numbers and the per-row
+# risk_indicators dicts the anomaly stage used to attach.
+#
+#   python -m benchmarks.bench_memory [n_records ...]
+
+
+def scored_events(n_records):
+
+    users = max(5, n_records // 1000)
+    auth, endpoint, network = generate_logs(
+        users=users, events_per_user=max(1, n_records // 3 // users),
+        attacks=max(1, n_records // 20_000), span_minutes=7 * 24 * 60, seed=42
+    )
+
+    df = preprocess_logs(auth, endpoint, network)
+    df, _ = train_anomaly_model(df)
+
+    return df
+
+
+def original_frame(df):
+
+    flags = ["is_failed", "is_unusual_ip", "is_privilege_escalation", "is_sensitive_access"]
+
+    original = pd.DataFrame({
+        "timestamp": df["timestamp"].astype("datetime64[ns]"),
+        "user": df["user"].astype(str).astype(object),
+        "log_source": df["log_source"].astype(str).astype(object),
+        **{flag: df[flag].astype(np.int64) for flag in flags},
+        "data_volume_mb": df["data_volume_mb"].astype(np.float64),
+        "hour": df["hour"].astype(np.int64),
+        "anomaly_score": df["anomaly_score"].astype(np.float64),
+        "anomaly_flag": df["anomaly_flag"].astype(np.int64)
+    })
+
+    # Dict sizes are shallow (pandas' deep memory usage), so this is a floor
+    original["risk_indicators"] = risk_indicators(df)
+
+    return original
+
+
+def bytes_per_event(df):
+    return df.memory_usage(deep=True, index=False) / len(df)
+
+
+def main(sizes=(10_000, 100_000, 1_000_000)):
+
+    print(f"{'records':>10} {'original B/ev':>14} {'compact B/ev':>13} {'ratio':>7} "
+          f"{'original GB @50M':>17} {'compact GB @50M':>16}")
+
+    for n_records in sizes:
+        compact = scored_events(n_records)
+        original = original_frame(compact)
+
+        before = bytes_per_event(original).sum()
+        after = bytes_per_event(compact).sum()
+
+        print(
+            f"{n_records:>10} {before:>14.1f} {after:>13.1f} {before / after:>7.1f} "
+            f"{before * 50e6 / 1e9:>17.2f} {after * 50e6 / 1e9:>16.2f}"
+        )
+
+    # Per-column breakdown for the largest size
+    columns = pd.DataFrame({
+        "original": bytes_per_event(original),
+        "compact": bytes_per_event(compact),
+        "original dtype": original.dtypes.astype(str),
+        "compact dtype": compact.dtypes.astype(str)
+    })
+
+    print()
+    print(columns.round(2).fillna("-").to_string())
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(s) for s in sys.argv[1:]) or (10_000, 100_000, 1_000_000)
+    main(sizes)
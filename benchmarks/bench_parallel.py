@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from generate_logs import write_logs
+
+# Serial against parallel pipeline (core.parallel) on the same JSONL input,
+# with the shipped rules plus one grouped by log_source rather than user,
+# so the parallel run has to partition events by both columns. Checks that
+# every worker count gives the serial incidents.
+#
+#   python -m benchmarks.bench_parallel
+#   python -m benchmarks.bench_parallel --users 200 --events-per-user 500 --workers 2 4
+
+SHIPPED_RULES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "correlation", "rules.json"
+)
+
+SOURCE_RULE = {
+    "id": "source_anomaly_burst",
+    "incident_type": "Anomaly Burst",
+    "window_minutes": 30,
+    "group_by": "log_source",
+    "when": ["count(anomaly_flag == -1) >= 20"],
+    "mitre_tactics": []
+}
+
+
+def write_rules(path):
+
+    with open(SHIPPED_RULES) as f:
+        document = json.load(f)
+
+    document["rules"].append(SOURCE_RULE)
+
+    with open(path, "w") as f:
+        json.dump(document, f)
+
+
+def signature(results):
+    return [
+        (i["incident_id"], i.get("rule_id"), i["user"], i.get("group"), i["start_time"],
+         i["end_time"], i["events_count"], i["windows_merged"])
+        for i in results["incidents"]
+    ]
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--events-per-user", type=int, default=400)
+    parser.add_argument("--attacks", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="aegisir-parallel-") as tmp:
+
+        # Before the pipeline modules are imported, as they read these once
+        os.environ["AEGISIR_AUDIT_DIR"] = os.path.join(tmp, "audit")
+        os.environ["AEGISIR_MODEL_PATH"] = os.path.join(tmp, "model.joblib")
+        os.environ["AEGISIR_BASELINES_PATH"] = os.path.join(tmp, "baselines.joblib")
+        os.environ["AEGISIR_RULES_PATH"] = os.path.join(tmp, "rules.json")
+        write_rules(os.environ["AEGISIR_RULES_PATH"])
+
+        from preprocessing.feature_engineering import preprocess_logs
+        from preprocessing.log_reader import stream_logs
+        from detection.anomaly_model import fit_anomaly_model, save_anomaly_model
+        from core.pipeline import run_detection_pipeline
+
+        write_logs(
+            tmp, fmt="jsonl", users=args.users, events_per_user=args.events_per_user,
+            attacks=args.attacks, span_minutes=24 * 60, seed=42, base_time=datetime(2026, 1, 5)
+        )
+        paths = [os.path.join(tmp, f"{source}_logs.jsonl") for source in ("auth", "endpoint", "network")]
+
+        # The parallel pipeline scores with a pre-trained model only
+        with open(paths[0], "rb") as a, open(paths[1], "rb") as e, open(paths[2], "rb") as n:
+            df = preprocess_logs(stream_logs(a), stream_logs(e), stream_logs(n))
+        save_anomaly_model(fit_anomaly_model(df), os.environ["AEGISIR_MODEL_PATH"], training_rows=len(df))
+
+        files = [open(path, "rb") for path in paths]
+        started = time.perf_counter()
+        serial = run_detection_pipeline(*(stream_logs(f) for f in files), playbooks=False)
+        serial_s = time.perf_counter() - started
+        for f in files:
+            f.close()
+
+        expected = signature(serial)
+        by_source = sum(i.get("rule_id") == SOURCE_RULE["id"] for i in serial["incidents"])
+
+        print(f"{serial['total_logs']} events, {len(expected)} incidents "
+              f"({by_source} grouped by log_source)\n")
+        print(f"{'workers':>7} {'wall s':>8} {'identical':>9}")
+        print(f"{'serial':>7} {serial_s:>8.2f} {'-':>9}")
+
+        for workers in args.workers:
+            started = time.perf_counter()
+            parallel = run_detection_pipeline(*paths, playbooks=False, workers=workers)
+            parallel_s = time.perf_counter() - started
+
+            identical = signature(parallel) == expected
+            print(f"{workers:>7} {parallel_s:>8.2f} {str(identical):>9}")
+
+            assert identical, f"{workers} workers: incidents differ from the serial run"
+
+
+if __name__ == "__main__":
+    main()
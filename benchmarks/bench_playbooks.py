@@ -0,0 +1,195 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ----------------------------
+# Local fake Ollama (POST /api/chat)
+# ----------------------------
+
+FAKE_PLAYBOOK = """
+- Immediate Containment: disable the affected account and isolate the host.
+- Investigation: review authentication and transfer history for the window.
+- Eradication: remove unauthorised privileges.
+- Recovery: restore access after credential reset.
+- Post-Incident: tighten monitoring thresholds.
+"""
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+
+    delay_seconds = 0.5
+    playbook = FAKE_PLAYBOOK
+
+    def do_POST(self):
+
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        try:
+            if body.get("stream"):
+                self._stream_reply(body)
+            else:
+                self._reply(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _chunk(self, body, content, done):
+        return json.dumps({
+            "model": body.get("model"),
+            "created_at": "2026-02-16T00:00:00Z",
+            "message": {"role": "assistant", "content": content},
+            "done": done
+        }).encode("utf-8")
+
+    def _reply(self, body):
+
+        time.sleep(self.delay_seconds)
+        payload = self._chunk(body, self.playbook, True)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream_reply(self, body):
+
+        # NDJSON, one word per chunk, spread over the same total delay
+        words = self.playbook.split(" ")
+        tokens = [word + " " for word in words[:-1]] + [words[-1]]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        for token in tokens:
+            time.sleep(self.delay_seconds / len(tokens))
+            self.wfile.write(self._chunk(body, token, False) + b"\n")
+            self.wfile.flush()
+
+        self.wfile.write(self._chunk(body, "", True) + b"\n")
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_ollama(delay_seconds=0.5):
+
+    FakeOllamaHandler.delay_seconds = delay_seconds
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+    server.daemon_threads = True
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def sample_incidents(n_incidents):
+    return [{
+        "incident_id": f"INC{i:03d}",
+        "incident_type": "Account Compromise + Data Exfiltration",
+        "severity_level": "Critical",
+        "systems_involved": ["auth", "endpoint", "network"],
+        "mitre_mapping": ["Initial Access", "Exfiltration"]
+    } for i in range(1, n_incidents + 1)]
+
+
+# ----------------------------
+# Benchmark
+# ----------------------------
+
+def main(n_incidents=20, delay_seconds=0.5):
+
+    server = start_fake_ollama(delay_seconds)
+    os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{server.server_address[1]}"
+
+    from response import llm_playbook
+    from response.playbook_cache import configure_playbook_cache
+
+    # Timings below measure generation, not cache hits
+    configure_playbook_cache(None)
+
+    start = time.perf_counter()
+    for incident in sample_incidents(n_incidents):
+        assert llm_playbook.generate_playbook(incident) == FAKE_PLAYBOOK
+    serial = time.perf_counter() - start
+
+    print(f"serial        {n_incidents} playbooks: {serial:.2f} s")
+
+    for workers in (4, 8, 16):
+        incidents = sample_incidents(n_incidents)
+
+        start = time.perf_counter()
+        llm_playbook.generate_playbooks(incidents, max_workers=workers)
+        elapsed = time.perf_counter() - start
+
+        assert all(incident["playbook"] == FAKE_PLAYBOOK for incident in incidents)
+        print(f"concurrent x{workers:<3} {n_incidents} playbooks: {elapsed:.2f} s")
+
+    # First result is available after one round trip, not after all of them
+    start = time.perf_counter()
+    batch = llm_playbook.PlaybookBatch(sample_incidents(n_incidents), max_workers=4)
+    next(batch.as_completed())
+    print(f"first playbook ready after {time.perf_counter() - start:.2f} s")
+    batch.wait()
+
+    # Streaming: time to first rendered content vs the full generation
+    incident = sample_incidents(1)[0]
+    start = time.perf_counter()
+    texts = []
+    for text in llm_playbook.stream_playbook(incident):
+        if not texts:
+            first = time.perf_counter() - start
+        texts.append(text)
+    total = time.perf_counter() - start
+    assert texts[-1] == FAKE_PLAYBOOK
+    print(f"streamed playbook: first content {first * 1000:.0f} ms, complete {total * 1000:.0f} ms, {len(texts)} updates")
+
+    # Unsafe output is cut off before the keyword is ever yielded
+    FakeOllamaHandler.playbook = FAKE_PLAYBOOK + "\n- Run sudo reboot on the host."
+    texts = list(llm_playbook.stream_playbook(incident))
+    FakeOllamaHandler.playbook = FAKE_PLAYBOOK
+    assert texts[-1] == llm_playbook.UNSAFE_PLAYBOOK_MESSAGE
+    assert not any("sudo" in text for text in texts)
+    print("streamed unsafe output blocked: ok")
+
+    # Batch workers stream too, so any incident can render progressively
+    incident = sample_incidents(1)[0]
+    batch = llm_playbook.PlaybookBatch([incident], max_workers=1)
+    updates = list(batch.stream(incident, poll_interval=0.02))
+    assert updates[-1] == FAKE_PLAYBOOK == incident["playbook"]
+    print(f"batch stream: {len(updates)} progressive updates")
+
+    # Per-request timeout and cancellation
+    incidents = sample_incidents(2)
+    llm_playbook.generate_playbooks(incidents, timeout=delay_seconds / 5)
+    assert all(i["playbook"] == llm_playbook.FAILED_PLAYBOOK_MESSAGE for i in incidents)
+
+    incidents = sample_incidents(8)
+    llm_playbook.PlaybookBatch(incidents, max_workers=1).wait(timeout=delay_seconds / 2)
+    assert all(i["playbook"] == llm_playbook.CANCELLED_PLAYBOOK_MESSAGE for i in incidents)
+    print("timeouts and cancellation: ok")
+
+    # Content-addressed cache: repeat incidents skip the LLM round trip
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_playbook_cache(os.path.join(tmp, "playbooks.db"))
+
+        for label in ("cold", "warm"):
+            incidents = sample_incidents(n_incidents)
+            start = time.perf_counter()
+            llm_playbook.generate_playbooks(incidents, max_workers=4)
+            elapsed = time.perf_counter() - start
+            print(f"cache {label}    {n_incidents} playbooks: {elapsed * 1000:.1f} ms")
+
+        print(f"cache stats: {llm_playbook.playbook_cache_stats()}")
+        configure_playbook_cache(None)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+
+from generate_logs import generate_logs
+from preprocessing.feature_engineering import LOG_SOURCES, preprocess_logs
+from detection.anomaly_model import fit_anomaly_model, save_anomaly_model
+
+# Load test of the local scoring service (core.service): concurrent clients
+# push small time-ordered event batches, with requests coalesced into
+# micro-batches and without (one request per batch). Reports client-side
+# latency percentiles, throughput and the batch sizes the service formed.
+#
+#   python -m benchmarks.bench_service
+#   python -m benchmarks.bench_service --clients 1 8 32 --events-per-request 5
+#   python -m benchmarks.bench_service --url http://127.0.0.1:8765   # running service
+
+BASE_TIME = datetime(2026, 1, 5)
+
+# (label, batch_wait_ms, batch_max_events) of each in-process service
+MODES = (
+    ("per-request", 0, 1),
+    ("coalesced", 0, 50_000),
+    ("coalesced+5ms", 5, 50_000)
+)
+
+
+def event_requests(users, events_per_user, attacks, events_per_request, seed):
+
+    # Request bodies in time order, each holding events_per_request records
+    auth, endpoint, network = generate_logs(
+        users=users, events_per_user=events_per_user, attacks=attacks,
+        span_minutes=24 * 60, seed=seed, base_time=BASE_TIME
+    )
+
+    records = sorted(
+        ((record["timestamp"], source, record)
+         for source, logs in zip(LOG_SOURCES, (auth, endpoint, network)) for record in logs),
+        key=lambda item: item[0]
+    )
+
+    bodies = []
+    for start in range(0, len(records), events_per_request):
+        body = {}
+        for _, source, record in records[start:start + events_per_request]:
+            body.setdefault(source, []).append(record)
+        bodies.append(json.dumps(body).encode("utf-8"))
+
+    return bodies, len(records)
+
+
+def train_model(path, users, events_per_user, attacks):
+
+    # Trained on a different day of traffic than the one replayed
+    auth, endpoint, network = generate_logs(
+        users=users, events_per_user=events_per_user, attacks=attacks,
+        span_minutes=24 * 60, seed=7, base_time=BASE_TIME
+    )
+    df = preprocess_logs(auth, endpoint, network)
+    save_anomaly_model(fit_anomaly_model(df), path, training_rows=len(df))
+
+
+def run_load(url, bodies, clients):
+
+    # Every client takes the next body off a shared cursor, so events reach
+    # the service in roughly time order
+    latencies = []
+    errors = []
+    cursor = iter(bodies)
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                body = next(cursor, None)
+            if body is None:
+                return
+
+            request = urllib.request.Request(
+                url + "/events", data=body, headers={"Content-Type": "application/json"}
+            )
+            started = time.perf_counter()
+
+            try:
+                with urllib.request.urlopen(request) as response:
+                    json.loads(response.read())
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return latencies, errors, wall
+
+
+def metrics_of(url):
+    with urllib.request.urlopen(url + "/metrics") as response:
+        return json.loads(response.read())
+
+
+def report(label, clients, latencies, errors, wall, n_events, n_requests, metrics):
+
+    # Incidents as the service counted them: every request of a batch
+    # receives the incidents that batch completed, so replies share them
+    p50, p95, p99 = np.percentile(latencies, (50, 95, 99)) if latencies else (0, 0, 0)
+
+    print(
+        f"{label:>14} {clients:>7} {n_requests / wall:>8.0f} {n_events / wall:>9.0f} "
+        f"{p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {metrics.get('mean_batch_requests', 0):>9.1f} "
+        f"{metrics.get('incidents', 0):>9} {len(errors):>6}"
+    )
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="load-test a running service instead of in-process ones")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--events-per-user", type=int, default=40)
+    parser.add_argument("--attacks", type=int, default=5)
+    parser.add_argument("--events-per-request", type=int, default=10)
+    args = parser.parse_args()
+
+    bodies, n_events = event_requests(
+        args.users, args.events_per_user, args.attacks, args.events_per_request, seed=42
+    )
+
+    print(f"{len(bodies)} requests, {n_events} events, {args.events_per_request} events/request\n")
+    print(f"{'mode':>14} {'clients':>7} {'req/s':>8} {'events/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'req/batch':>9} {'incidents':>9} {'errors':>6}")
+
+    if args.url:
+        for clients in args.clients:
+            result = run_load(args.url, bodies, clients)
+            report("external", clients, *result, n_events, len(bodies), metrics_of(args.url))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="aegisir-service-") as tmp:
+
+        # Before core.service is imported, as the audit logger reads it once
+        os.environ["AEGISIR_AUDIT_DIR"] = os.path.join(tmp, "audit")
+
+        from core.service import ScoringService, make_server
+
+        model_path = os.path.join(tmp, "model.joblib")
+        train_model(model_path, args.users, args.events_per_user, args.attacks)
+
+        for label, batch_wait_ms, batch_max_events in MODES:
+            for clients in args.clients:
+                # A fresh service per run, so correlator state starts empty
+                service = ScoringService(
+                    model_path=model_path, baselines_path=os.path.join(tmp, "none.joblib"),
+                    batch_wait_ms=batch_wait_ms, batch_max_events=batch_max_events
+                )
+                server = make_server(service, "127.0.0.1", 0)
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                url = f"http://127.0.0.1:{server.server_address[1]}"
+
+                try:
+                    result = run_load(url, bodies, clients)
+                    report(label, clients, *result, n_events, len(bodies), metrics_of(url))
+                finally:
+                    server.shutdown()
+                    server.server_close()
+                    service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import sys
+import time
+
+import numpy as np
+
+from scoring.severity import (
+    calculate_severity, get_severity_config, score_incidents, score_severity_batch
+)
+
+# Re-scoring incidents (e.g. from audit history after tuning weights):
+# calculate_severity per incident dict against score_severity_batch on a
+# columnar table, and score_incidents, which builds that table from the
+# dicts and writes the results back. Also checks that all three agree.
+#
+#   python -m benchmarks.bench_severity [n_incidents ...]
+
+
+def synthetic_incidents(n, seed=42):
+
+    rng = np.random.default_rng(seed)
+
+    events = rng.integers(1, 60, n)
+    table = {
+        "events_count": events,
+        "anomalies_detected": rng.integers(0, events + 1),
+        "systems_affected": rng.integers(1, 4, n),
+        "max_data_transfer_mb": np.round(rng.exponential(250, n), 3)
+    }
+
+    incidents = [
+        {
+            "events_count": int(e), "anomalies_detected": int(a), "systems_affected": int(s),
+            "risk_summary": {"max_data_transfer_mb": float(t)}
+        }
+        for e, a, s, t in zip(table["events_count"], table["anomalies_detected"],
+                              table["systems_affected"], table["max_data_transfer_mb"])
+    ]
+
+    return incidents, table
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main(sizes=(10_000, 100_000, 1_000_000)):
+
+    config = get_severity_config()
+
+    print(f"{'incidents':>10} {'scalar s':>9} {'batch s':>9} {'dicts s':>9} "
+          f"{'batch x':>8} {'dicts x':>8} {'identical':>9}")
+
+    for n in sizes:
+        incidents, table = synthetic_incidents(n)
+
+        scalar, scalar_s = timed(lambda: [calculate_severity(i, config) for i in incidents])
+        (scores, levels), batch_s = timed(lambda: score_severity_batch(table, config))
+        _, dicts_s = timed(lambda: score_incidents(incidents, config))
+
+        identical = (
+            [r["severity_score"] for r in scalar] == scores.tolist() ==
+            [i["severity_score"] for i in incidents] and
+            [r["severity_level"] for r in scalar] == levels.tolist() ==
+            [i["severity_level"] for i in incidents]
+        )
+
+        print(f"{n:>10} {scalar_s:>9.3f} {batch_s:>9.4f} {dicts_s:>9.3f} "
+              f"{scalar_s / batch_s:>8.0f} {scalar_s / dicts_s:>8.1f} {str(identical):>9}")
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(s) for s in sys.argv[1:]) or (10_000, 100_000, 1_000_000)
+    main(sizes)
@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from generate_logs import write_logs
+
+# Full-pipeline benchmark over generated datasets. Every run happens in a
+# fresh subprocess so peak RSS is per run, and results are compared with a
+# stored baseline to catch slowdowns.
+#
+#   python -m benchmarks.run_benchmarks                       # 10k..10M
+#   python -m benchmarks.run_benchmarks --sizes 10000 100000
+#   python -m benchmarks.run_benchmarks --update-baseline
+#   python -m benchmarks.run_benchmarks --workers 32      # core.parallel
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DATA_DIR = os.path.join(tempfile.gettempdir(), "aegisir-bench")
+
+# Slower/larger than the baseline by more than this fraction is a regression
+REGRESSION_TOLERANCE = 0.20
+
+# Stages faster than this in the baseline are too noisy to compare
+MIN_COMPARABLE_MS = 20.0
+
+RECORDS_PER_USER = 1_000
+SPAN_MINUTES = 7 * 24 * 60
+SEED = 42
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ----------------------------
+# Datasets
+# ----------------------------
+
+def dataset_params(n_records):
+
+    # n_records across the three sources; each normal event writes one
+    # record per source, each attack adds 10 records.
+    users = max(5, n_records // RECORDS_PER_USER)
+    attacks = max(1, n_records // 20_000)
+
+    return {
+        "users": users,
+        "events_per_user": max(1, (n_records - attacks * 10) // 3 // users),
+        "attacks": attacks,
+        "span_minutes": SPAN_MINUTES,
+        "seed": SEED,
+        "base_time": datetime(2026, 1, 5)
+    }
+
+
+def ensure_dataset(n_records, data_dir=DATA_DIR):
+
+    # Generated once per size and reused by later runs
+    directory = os.path.join(data_dir, f"{n_records}_{SEED}")
+    marker = os.path.join(directory, "complete")
+
+    if not os.path.exists(marker):
+        start = time.perf_counter()
+        write_logs(directory, fmt="jsonl", **dataset_params(n_records))
+
+        with open(marker, "w") as f:
+            f.write("1")
+
+        print(f"generated {n_records} records in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    return directory
+
+
+def dataset_paths(directory):
+    return [os.path.join(directory, f"{source}_logs.jsonl") for source in ("auth", "endpoint", "network")]
+
+
+def ensure_model(directory):
+
+    # The parallel pipeline needs a pre-trained model; fit one on the dataset
+    path = os.path.join(directory, "model.joblib")
+
+    if not os.path.exists(path):
+        auth, endpoint, network = dataset_paths(directory)
+        subprocess.run(
+            [sys.executable, "train_model.py", "--auth", auth, "--endpoint", endpoint,
+             "--network", network, "--output", path],
+            cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL
+        )
+
+    return path
+
+
+# ----------------------------
+# Worker (one pipeline run)
+# ----------------------------
+
+def run_worker(directory, workers=1):
+
+    from core.pipeline import run_detection_pipeline
+    from preprocessing.log_reader import stream_logs
+
+    paths = dataset_paths(directory)
+    start = time.perf_counter()
+
+    if workers > 1:
+        # File paths, so the workers split and parse the input themselves
+        results = run_detection_pipeline(*paths, playbooks=False, workers=workers)
+    else:
+        files = [open(path, "rb") for path in paths]
+        results = run_detection_pipeline(*(stream_logs(f) for f in files), playbooks=False)
+        for f in files:
+            f.close()
+
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    total_logs = results["total_logs"]
+
+    return {
+        "total_logs": total_logs,
+        "incidents": len(results["incidents"]),
+        "wall_ms": round(wall_ms, 3),
+        "throughput_eps": round(total_logs / (wall_ms / 1000), 1),
+        # Parent process only; pool workers are reported via RUSAGE_CHILDREN
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "worker_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "stages": {
+            m["stage"]: {
+                "wall_ms": m["wall_ms"],
+                "cpu_ms": m["cpu_ms"],
+                "rows": m["rows"],
+                "throughput_rps": round(m["rows"] / (m["wall_ms"] / 1000), 1)
+                if m["rows"] and m["wall_ms"] else None
+            }
+            for m in results["stage_metrics"]
+        }
+    }
+
+
+def run_once(directory, model_path=None, workers=1):
+
+    # Isolated process: its own RSS high-water mark, audit directory, user
+    # baselines and (unless a model is given) a model fitted on the batch itself.
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env["AEGISIR_AUDIT_DIR"] = os.path.join(tmp, "audit")
+        env["AEGISIR_MODEL_PATH"] = model_path or os.path.join(tmp, "no_model.joblib")
+        env["AEGISIR_BASELINES_PATH"] = os.path.join(tmp, "baselines.joblib")
+        env["AEGISIR_PROFILE"] = ""
+
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run_benchmarks", "--worker", directory,
+             "--workers", str(workers)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+
+    return json.loads(output)
+
+
+def summarise(runs):
+
+    # Median latency over repeats, worst-case memory
+    def median(values):
+        return round(statistics.median(values), 3)
+
+    summary = dict(runs[0])
+    summary["repeats"] = len(runs)
+    summary["wall_ms"] = median([r["wall_ms"] for r in runs])
+    summary["throughput_eps"] = round(summary["total_logs"] / (summary["wall_ms"] / 1000), 1)
+    summary["peak_rss_mb"] = max(r["peak_rss_mb"] for r in runs)
+
+    for stage, metrics in summary["stages"].items():
+        metrics["wall_ms"] = median([r["stages"][stage]["wall_ms"] for r in runs])
+        metrics["cpu_ms"] = median([r["stages"][stage]["cpu_ms"] for r in runs])
+        if metrics["rows"] and metrics["wall_ms"]:
+            metrics["throughput_rps"] = round(metrics["rows"] / (metrics["wall_ms"] / 1000), 1)
+
+    return summary
+
+
+# ----------------------------
+# Baseline comparison
+# ----------------------------
+
+def environment():
+
+    import numpy
+    import pandas
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__
+    }
+
+
+def find_regressions(current, baseline, tolerance=REGRESSION_TOLERANCE):
+
+    regressions = []
+    limit = 1 + tolerance
+
+    for size, result in current["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if base is None:
+            continue
+
+        checks = [("total", "wall_ms", result["wall_ms"], base["wall_ms"]),
+                  ("total", "peak_rss_mb", result["peak_rss_mb"], base["peak_rss_mb"])]
+
+        for stage, metrics in result["stages"].items():
+            base_stage = base["stages"].get(stage)
+            if base_stage and base_stage["wall_ms"] >= MIN_COMPARABLE_MS:
+                checks.append((stage, "wall_ms", metrics["wall_ms"], base_stage["wall_ms"]))
+
+        for stage, metric, value, reference in checks:
+            if reference and value > reference * limit:
+                regressions.append({
+                    "size": int(size),
+                    "stage": stage,
+                    "metric": metric,
+                    "baseline": reference,
+                    "current": value,
+                    "change": round(value / reference - 1, 3)
+                })
+
+    return regressions
+
+
+# ----------------------------
+# Benchmark
+# ----------------------------
+
+def main(sizes=DEFAULT_SIZES, repeat=1, baseline_path=BASELINE_PATH, output=None,
+         update_baseline=False, data_dir=DATA_DIR, model_path=None, workers=1):
+
+    current = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "workers": workers,
+        "results": {}
+    }
+
+    print(f"{'records':>10} {'stage':>20} {'wall (ms)':>11} {'rows/s':>12} {'peak RSS (MB)':>14}")
+
+    for n_records in sizes:
+        directory = ensure_dataset(n_records, data_dir)
+        model = model_path or (ensure_model(directory) if workers > 1 else None)
+        result = summarise([run_once(directory, model, workers) for _ in range(repeat)])
+        current["results"][str(n_records)] = result
+
+        for stage, metrics in result["stages"].items():
+            rate = metrics["throughput_rps"] or 0
+            print(f"{n_records:>10} {stage:>20} {metrics['wall_ms']:>11.1f} {rate:>12.0f}")
+
+        print(
+            f"{n_records:>10} {'pipeline':>20} {result['wall_ms']:>11.1f} "
+            f"{result['throughput_eps']:>12.0f} {result['peak_rss_mb']:>14.1f}"
+        )
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    regressions = []
+
+    if os.path.exists(baseline_path) and not update_baseline:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+        if baseline.get("workers", 1) != workers:
+            print(f"Baseline was recorded with {baseline.get('workers', 1)} workers; not comparing")
+        else:
+            regressions = find_regressions(current, baseline)
+
+            for r in regressions:
+                print(
+                    f"REGRESSION {r['size']} {r['stage']} {r['metric']}: "
+                    f"{r['baseline']} -> {r['current']} ({r['change']:+.0%})"
+                )
+
+            if not regressions:
+                print(f"No regressions against {baseline_path}")
+
+    if update_baseline or not os.path.exists(baseline_path):
+        with open(baseline_path, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline written to {baseline_path}")
+
+    return regressions
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="AegisIR pipeline benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--model", help="persisted model to score with instead of fitting per run")
+    parser.add_argument("--workers", type=int, default=1, help="processes for core.parallel")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.workers)))
+        sys.exit(0)
+
+    regressions = main(
+        args.sizes, args.repeat, args.baseline, args.output,
+        args.update_baseline, args.data_dir, args.model, args.workers
+    )
+
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,137 @@
+import argparse
+import glob
+import json
+import os
+import sys
+
+# --------------------------
+# Headless scans for cron and SIEM export jobs:
+#
+#   python -m core.cli --auth 'exports/auth-*.jsonl' --endpoint endpoint.json \
+#       --network - --output incidents.jsonl --no-playbook < network.jsonl
+#
+# Each source takes file paths or globs (JSON, JSON Lines or {"logs": [...]})
+# or "-" for JSON Lines on stdin. One incident per line goes to --output
+# (stdout by default); a summary goes to stderr. The pipeline and its
+# dependencies are imported only once the arguments are valid.
+# --------------------------
+
+STDIN = "-"
+
+
+def expand_paths(patterns, source):
+
+    paths = []
+
+    for pattern in patterns:
+        if pattern == STDIN:
+            paths.append(STDIN)
+            continue
+
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+
+        if not matches or not all(os.path.isfile(path) for path in matches):
+            raise ValueError(f"No {source} log file matches {pattern}")
+
+        paths.extend(matches)
+
+    return paths
+
+
+def iter_records(paths):
+
+    # Records of every file in turn, each opened only when it is reached
+    from preprocessing.log_reader import stream_logs
+
+    for path in paths:
+        if path == STDIN:
+            yield from stream_logs(sys.stdin.buffer)
+            continue
+
+        with open(path, "rb") as f:
+            yield from stream_logs(f)
+
+
+def scan_input(paths, workers):
+
+    # The parallel pipeline splits a single file by byte range itself
+    if workers > 1 and len(paths) == 1 and paths[0] != STDIN:
+        return paths[0]
+
+    return iter_records(paths)
+
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="python -m core.cli",
+        description="Run an AegisIR detection scan and write incidents as JSON Lines."
+    )
+    parser.add_argument("--auth", nargs="+", required=True, metavar="PATH",
+                        help="auth log files or globs, or - for stdin")
+    parser.add_argument("--endpoint", nargs="+", required=True, metavar="PATH")
+    parser.add_argument("--network", nargs="+", required=True, metavar="PATH")
+    parser.add_argument("--output", default=STDIN,
+                        help="incidents JSONL file (default: stdout)")
+    parser.add_argument("--no-playbook", action="store_true",
+                        help="skip LLM playbook generation (no Ollama needed)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes for the parallel pipeline (needs train_model.py)")
+    parser.add_argument("--quiet", action="store_true", help="no summary on stderr")
+
+    args = parser.parse_args(argv)
+
+    if sum(paths.count(STDIN) for paths in (args.auth, args.endpoint, args.network)) > 1:
+        parser.error("only one log source can be read from stdin")
+
+    return args
+
+
+def main(argv=None):
+
+    args = parse_args(argv)
+
+    try:
+        sources = [
+            expand_paths(patterns, source)
+            for patterns, source in ((args.auth, "auth"), (args.endpoint, "endpoint"),
+                                     (args.network, "network"))
+        ]
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    from core.pipeline import run_detection_pipeline
+
+    try:
+        results = run_detection_pipeline(
+            *(scan_input(paths, args.workers) for paths in sources),
+            playbooks=not args.no_playbook, workers=args.workers
+        )
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    output = sys.stdout if args.output == STDIN else open(args.output, "w", encoding="utf-8")
+
+    try:
+        for incident in results["incidents"]:
+            output.write(json.dumps(incident, separators=(",", ":"), default=str) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if not args.quiet:
+        print(
+            f"Scanned {results['total_logs']} logs "
+            f"({results['validation']['invalid_records']} invalid records skipped): "
+            f"{results['total_anomalies']} anomalies, {len(results['incidents'])} incidents. "
+            f"Audit run {results['run_id']}.",
+            file=sys.stderr
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
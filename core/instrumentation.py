@@ -0,0 +1,138 @@
+import cProfile
+import datetime
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# "" (metrics only), "cprofile" or "tracemalloc": the latter two also dump a
+# profile of the whole run to PROFILE_DIR.
+PROFILE_MODE = os.environ.get("AEGISIR_PROFILE", "")
+PROFILE_DIR = os.environ.get("AEGISIR_PROFILE_DIR", "logs/profiles")
+
+# RSS sampling period while a pipeline run is being measured
+RSS_SAMPLE_SECONDS = 0.005
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_mb():
+
+    # Current RSS on Linux; elsewhere fall back to the process high-water mark
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _RssSampler(threading.Thread):
+
+    def __init__(self):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.peak = _rss_mb()
+        self._halt = threading.Event()
+
+    def reset(self):
+        self.peak = _rss_mb()
+
+    def run(self):
+        while not self._halt.wait(RSS_SAMPLE_SECONDS):
+            self.peak = max(self.peak, _rss_mb())
+
+    def stop(self):
+        self._halt.set()
+
+
+class PipelineProfiler:
+
+    # Per-stage wall time, CPU time, peak RSS and row counts for one
+    # pipeline run. Use as a context manager around the run and
+    # profiler.stage(name) around each step. progress(name, metrics), if
+    # given, is called as each stage starts (metrics None) and finishes.
+
+    def __init__(self, mode=PROFILE_MODE, progress=None):
+        self.mode = mode
+        self.progress = progress
+        self.stages = []
+        self.dump_path = None
+        self._sampler = None
+        self._profile = None
+
+    def __enter__(self):
+
+        self._sampler = _RssSampler()
+        self._sampler.start()
+
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.mode == "tracemalloc":
+            tracemalloc.start()
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self._sampler.stop()
+
+        if self.mode == "cprofile":
+            self._profile.disable()
+            self.dump_path = self._dump_path("prof")
+            self._profile.dump_stats(self.dump_path)
+
+        elif self.mode == "tracemalloc":
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+            self.dump_path = self._dump_path("txt")
+            with open(self.dump_path, "w") as f:
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+
+        return False
+
+    def _dump_path(self, extension):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return os.path.join(PROFILE_DIR, f"pipeline_{stamp}.{extension}")
+
+    @contextmanager
+    def stage(self, name, rows=None):
+
+        # Callers may set metrics["rows"] (and other counters) inside the block
+        metrics = {"stage": name, "rows": rows}
+
+        if self.progress is not None:
+            self.progress(name, None)
+
+        if self._sampler is not None:
+            self._sampler.reset()
+
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+
+        try:
+            yield metrics
+        finally:
+            metrics["wall_ms"] = round((time.perf_counter() - wall) * 1000, 3)
+            metrics["cpu_ms"] = round((time.process_time() - cpu) * 1000, 3)
+
+            if self._sampler is not None:
+                metrics["peak_rss_mb"] = round(max(self._sampler.peak, _rss_mb()), 1)
+
+            if tracing:
+                metrics["peak_traced_mb"] = round(
+                    tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1
+                )
+
+            self.stages.append(metrics)
+
+            if self.progress is not None:
+                self.progress(name, metrics)
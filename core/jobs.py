@@ -0,0 +1,400 @@
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import socket
+import sqlite3
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from core.result_cache import HASH_CHUNK_BYTES, run_cached_scan, scan_cache_key, upload_digest
+from audit.usage_store import get_usage_store
+
+# Background scan jobs. A scan is submitted with its three uploads and gets
+# a job id back straight away; a bounded pool of worker threads runs the
+# pipeline while the job table (SQLite, WAL) records its status and the
+# stage it has reached. Streamlit reruns and page switches only poll the
+# table, and finished jobs are served from it.
+
+JOBS_DB_PATH = os.environ.get("AEGISIR_JOBS_DB", "logs/scan_jobs.db")
+
+# Scans that run at the same time; further submissions wait in the queue
+SCAN_WORKERS = int(os.environ.get("AEGISIR_SCAN_WORKERS", "2"))
+
+# Finished jobs older than this are deleted when the runner starts
+JOB_RETENTION_DAYS = float(os.environ.get("AEGISIR_JOB_RETENTION_DAYS", "7"))
+
+# Stages of a serial scan in order, for progress reporting
+SCAN_STAGES = [
+    "preprocessing", "anomaly_detection", "baseline_update", "correlation",
+    "severity_scoring", "mitre_mapping", "audit_write"
+]
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _spool(upload, directory):
+
+    # The pipeline reads the upload after the Streamlit rerun that submitted
+    # it has finished, so take a private copy: a temp file rather than a
+    # second copy of the bytes in memory, hashed while it is written.
+    # Returns (path, SHA-256 as upload_digest gives it, whether it is a copy).
+    if isinstance(upload, (str, os.PathLike)):
+        return upload, upload_digest(upload), False
+
+    digest = hashlib.sha256()
+    upload.seek(0)
+
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".upload", delete=False) as f:
+        for chunk in iter(lambda: upload.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+            f.write(chunk)
+
+    upload.seek(0)
+
+    return f.name, digest.hexdigest(), True
+
+
+def _hold_owner_lock(spool_root, owner):
+
+    # Locked for as long as this process lives: the lock is made under a
+    # temporary name and only then renamed into place, so an owner lock that
+    # exists but is free belongs to a process that has exited
+    fd, temp = tempfile.mkstemp(dir=spool_root, suffix=".tmp")
+    f = os.fdopen(fd, "w")
+    fcntl.flock(f, fcntl.LOCK_EX)
+    os.replace(temp, os.path.join(spool_root, owner + ".lock"))
+
+    return f
+
+
+def _owner_gone(spool_root, owner):
+
+    # Whether the process that owns these jobs has exited. Without file locks
+    # only jobs from before owners were recorded are reaped.
+    if owner is None:
+        return True
+
+    if fcntl is None:
+        return False
+
+    try:
+        f = open(os.path.join(spool_root, owner + ".lock"))
+    except FileNotFoundError:
+        return True
+
+    with f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+    return True
+
+
+def _discard(spooled):
+    for path, _, copied in spooled:
+        if copied:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class ScanJobs:
+
+    # Job table plus the worker pool that fills it. Safe to share across
+    # threads; one instance per app process (get_scan_jobs). Several app
+    # processes may share the table: each records itself as the owner of the
+    # jobs it submits and only reaps the jobs of owners that have exited.
+
+    def __init__(self, path=JOBS_DB_PATH, workers=SCAN_WORKERS,
+                 retention_days=JOB_RETENTION_DAYS):
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # Uploads are copied next to the job table, in a directory per owner,
+        # until their job has run
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._spool_root = path + "-uploads"
+        self.spool_dir = os.path.join(self._spool_root, self.owner)
+        os.makedirs(self._spool_root, exist_ok=True)
+
+        self._owner_lock = (
+            _hold_owner_lock(self._spool_root, self.owner) if fcntl is not None else None
+        )
+        os.makedirs(self.spool_dir)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                submitted_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                cache_key TEXT NOT NULL,
+                record_usage INTEGER NOT NULL,
+                owner TEXT,
+                stage TEXT,
+                stages TEXT NOT NULL DEFAULT '[]',
+                results BLOB,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, cache_key);
+        """)
+
+        # Job tables from before owners were recorded
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]
+        if "owner" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=retention_days)
+
+        with self._lock:
+            self._reap()
+            self._db.execute(
+                "DELETE FROM jobs WHERE finished_at < ?",
+                (cutoff.strftime("%Y-%m-%d %H:%M:%S"),)
+            )
+
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan-job")
+
+    def _reap(self):
+
+        # Queued and running jobs of owners that have exited died with them,
+        # and so did the uploads they left spooled
+        owners = self._db.execute(
+            "SELECT DISTINCT owner FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+        ).fetchall()
+
+        for owner, in owners:
+            if owner != self.owner and _owner_gone(self._spool_root, owner):
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, "
+                    "error = 'Interrupted: the app restarted before the scan finished.' "
+                    "WHERE status IN (?, ?) AND owner IS ?",
+                    (_now(), *ACTIVE_STATUSES, owner)
+                )
+
+        for name in os.listdir(self._spool_root):
+            owner = name[:-len(".lock")] if name.endswith(".lock") else name
+
+            if name.endswith(".tmp") or owner == self.owner:
+                continue
+
+            if _owner_gone(self._spool_root, owner):
+                path = os.path.join(self._spool_root, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def _update(self, job_id, **columns):
+
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+
+        with self._lock:
+            self._db.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*columns.values(), job_id)
+            )
+
+    def submit(self, auth_file, endpoint_file, network_file, record_usage=False):
+
+        # Returns the job id. The same uploads already queued or running
+        # (another session, or a double click) share that job instead of
+        # scanning twice.
+        spooled = [
+            _spool(upload, self.spool_dir) for upload in (auth_file, endpoint_file, network_file)
+        ]
+        digests = [digest for _, digest, _ in spooled]
+        key = scan_cache_key([path for path, _, _ in spooled], digests=digests)
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+
+            try:
+                active = self._db.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?) AND cache_key = ? "
+                    "ORDER BY submitted_at LIMIT 1",
+                    (*ACTIVE_STATUSES, key)
+                ).fetchone()
+
+                if active is None:
+                    job_id = uuid.uuid4().hex
+                    self._db.execute(
+                        "INSERT INTO jobs (id, status, submitted_at, cache_key, record_usage, owner) "
+                        "VALUES (?, 'queued', ?, ?, ?, ?)",
+                        (job_id, _now(), key, int(record_usage), self.owner)
+                    )
+                else:
+                    # A joining caller that records usage still gets it recorded
+                    self._db.execute(
+                        "UPDATE jobs SET record_usage = record_usage OR ? WHERE id = ?",
+                        (int(record_usage), active[0])
+                    )
+
+                self._db.execute("COMMIT")
+
+            except Exception:
+                self._db.execute("ROLLBACK")
+                _discard(spooled)
+                raise
+
+        if active is not None:
+            _discard(spooled)
+            return active[0]
+
+        self._pool.submit(self._run, job_id, spooled)
+
+        return job_id
+
+    def _finish(self, job_id, results):
+
+        # Marks the job done and returns its record_usage flag in one
+        # transaction, so no submission can join the job after the flag is read
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+
+            try:
+                record_usage, = self._db.execute(
+                    "SELECT record_usage FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+                self._db.execute(
+                    "UPDATE jobs SET status = 'done', finished_at = ?, stage = NULL, results = ? "
+                    "WHERE id = ?",
+                    (_now(), pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL), job_id)
+                )
+                self._db.execute("COMMIT")
+
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+        return bool(record_usage)
+
+    def _run(self, job_id, spooled):
+
+        self._update(job_id, status="running", started_at=_now())
+
+        stages = []
+
+        def progress(stage, metrics):
+            if metrics is None:
+                self._update(job_id, stage=stage)
+            else:
+                stages.append(metrics)
+                self._update(job_id, stages=json.dumps(stages, default=str))
+
+        try:
+            with ExitStack() as files:
+                uploads = [files.enter_context(open(path, "rb")) for path, _, _ in spooled]
+
+                # Keyed on the pipeline version when the job runs, not when it was queued
+                results = run_cached_scan(
+                    *uploads, progress=progress, digests=[digest for _, digest, _ in spooled]
+                )
+        except Exception as e:
+            self._update(job_id, status="failed", finished_at=_now(), error=str(e))
+            return
+        finally:
+            _discard(spooled)
+
+        record_usage = self._finish(job_id, results)
+
+        # Cache hits count as runs, but ran no pipeline stages: the stage
+        # metrics they carry are those of the scan that filled the cache
+        if record_usage:
+            get_usage_store().record_run(
+                total_logs=results["total_logs"],
+                incidents_detected=len(results["incidents"]),
+                stage_metrics=None if results["cached"] else results["stage_metrics"]
+            )
+
+    def get(self, job_id):
+
+        # None for an unknown (or expired) job; results only once it is done
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, submitted_at, started_at, finished_at, stage, stages, "
+                "results, error FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        status, submitted_at, started_at, finished_at, stage, stages, results, error = row
+        stages = json.loads(stages)
+
+        if status == "done":
+            progress = 1.0
+        else:
+            finished = {metrics["stage"] for metrics in stages}
+            progress = sum(name in finished for name in SCAN_STAGES) / len(SCAN_STAGES)
+
+        return {
+            "id": job_id,
+            "status": status,
+            "submitted_at": submitted_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "stage": stage,
+            "stages": stages,
+            "progress": round(progress, 3),
+            "results": pickle.loads(results) if results is not None else None,
+            "error": error
+        }
+
+    def counts(self):
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+
+        return counts
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def get_scan_jobs():
+
+    # One runner per process, shared by every Streamlit session and page
+    global _jobs
+
+    with _jobs_lock:
+        if _jobs is None:
+            _jobs = ScanJobs()
+
+    return _jobs
@@ -0,0 +1,352 @@
+import io
+import json
+import multiprocessing
+import os
+import pickle
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from preprocessing.feature_engineering import LOG_SOURCES, concat_events, preprocess_logs
+from preprocessing.log_reader import iter_log_records
+from preprocessing.user_baselines import (
+    BASELINES_PATH, UserBaselines, combine_digests, events_digest, fold_baselines,
+    load_baselines, update_baselines
+)
+from detection.anomaly_model import MODEL_PATH, load_anomaly_model, score_anomalies
+from correlation.engine import correlate_incidents_keyed
+from correlation.rules import get_rules
+from security.validator import ValidationReport
+from core.instrumentation import PipelineProfiler, PROFILE_MODE
+from core.pipeline import complete_run
+
+# Parallel pipeline, in two passes over a process pool:
+#   1. map:    each split of the input (a byte range of a JSONL file, or a
+#              batch of records) is validated, featurised and scored with
+#              the shared pre-trained model, then hash-partitioned into
+#              shard files by every column a rule groups by (usually only
+#              user; a rule grouped by log_source gets its own partition);
+#   2. reduce: each shard (all events of its keys) is correlated with the
+#              rules grouping by its column.
+# Incidents are merged and numbered as the serial pipeline would number them.
+
+# Byte range per map task when the input is a JSON Lines file path
+SPLIT_BYTES = 64 * 1024 * 1024
+
+# Records per map task when the input is an iterable of records
+RECORD_BATCH = 200_000
+
+
+def shard_of(key, shards):
+    return zlib.crc32(str(key).encode("utf-8")) % shards
+
+
+def _row_shards(values, shards):
+
+    # Shard of every row by its key; rows without a key share shard 0
+    codes, keys = pd.factorize(values)
+    shard_by_code = np.fromiter((shard_of(k, shards) for k in keys), dtype=np.int64, count=len(keys))
+
+    return np.append(shard_by_code, 0)[codes]
+
+
+# ----------------------------
+# Input splits
+# ----------------------------
+
+def _is_path(logs):
+    return isinstance(logs, (str, os.PathLike))
+
+
+def _jsonl_splits(path, split_bytes):
+
+    # Line-aligned byte ranges, or None when the file is not one JSON
+    # object per line (arrays and wrappers are streamed by the parent).
+    with open(path, "rb") as f:
+        first = f.readline()
+
+        try:
+            record = json.loads(first)
+        except ValueError:
+            return None
+
+        if not isinstance(record, dict) or "logs" in record:
+            return None
+
+        size = os.fstat(f.fileno()).st_size
+        bounds = [0]
+
+        while bounds[-1] + split_bytes < size:
+            f.seek(bounds[-1] + split_bytes)
+            f.readline()
+
+            if f.tell() >= size:
+                break
+
+            bounds.append(f.tell())
+
+    bounds.append(size)
+
+    return [(path, start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _iter_tasks(sources, split_bytes, record_batch):
+
+    # (source, split) pairs in input order: auth, endpoint, network
+    for source, logs in zip(LOG_SOURCES, sources):
+
+        splits = _jsonl_splits(logs, split_bytes) if _is_path(logs) else None
+
+        if splits is not None:
+            for split in splits:
+                yield source, split
+            continue
+
+        if _is_path(logs):
+            f = open(logs, "rb")
+            logs = iter_log_records(f)
+        else:
+            f = None
+
+        try:
+            batch = []
+            for record in logs:
+                batch.append(record)
+                if len(batch) >= record_batch:
+                    yield source, batch
+                    batch = []
+
+            if batch:
+                yield source, batch
+        finally:
+            if f is not None:
+                f.close()
+
+
+def _read_split(split):
+
+    if isinstance(split, list):
+        return split
+
+    path, start, end = split
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    if not data.strip():
+        return []
+
+    return iter_log_records(io.BytesIO(data))
+
+
+# ----------------------------
+# Worker tasks
+# ----------------------------
+
+_worker_model = None
+_worker_features = None
+_worker_baselines = None
+
+
+def _init_worker(model_path, baselines_path):
+
+    global _worker_model, _worker_features, _worker_baselines
+
+    bundle = load_anomaly_model(model_path)
+    _worker_model = bundle["model"]
+    _worker_features = bundle["features"]
+
+    # Read-only here: every split is joined against the index as it was
+    # before the run, and the parent folds the per-split updates in.
+    _worker_baselines = load_baselines(baselines_path)
+
+
+def _map_split(task_index, source, split, shards, shard_dir, group_columns):
+
+    report = ValidationReport()
+
+    logs = {name: [] for name in LOG_SOURCES}
+    logs[source] = _read_split(split)
+
+    df = preprocess_logs(logs["auth"], logs["endpoint"], logs["network"], report, _worker_baselines)
+
+    shard_paths = {}
+    baselines = None
+    digest = None
+
+    if not df.empty:
+        df = score_anomalies(df, _worker_model, _worker_features)
+
+        if _worker_baselines is not None:
+            baselines = update_baselines(UserBaselines(), df)
+            digest = events_digest(df)
+
+            # Not needed past the baselines, unless a rule groups by it
+            if "ip" not in group_columns:
+                df = df.drop(columns="ip")
+
+        # Input order of every kept row, so shards can restore the serial
+        # tie-break between events with equal timestamps.
+        df["seq"] = (np.int64(task_index) << 32) + np.arange(len(df), dtype=np.int64)
+
+        for column in group_columns:
+            row_shards = _row_shards(df[column], shards)
+
+            for shard in np.unique(row_shards):
+                path = os.path.join(shard_dir, f"{column}_shard{shard:04d}_task{task_index:06d}.pkl")
+                with open(path, "wb") as f:
+                    pickle.dump(df[row_shards == shard], f, protocol=pickle.HIGHEST_PROTOCOL)
+                shard_paths[(column, int(shard))] = path
+
+    return {
+        "task": task_index,
+        "source": source,
+        "records": report.records.get(source, 0),
+        "rows": len(df),
+        "anomalies": int((df["anomaly_flag"] == -1).sum()) if not df.empty else 0,
+        "report": report,
+        "baselines": baselines,
+        "digest": digest,
+        "shard_paths": shard_paths
+    }
+
+
+def _reduce_shard(paths, rules):
+
+    # rules: the RuleSet of the column the shard is partitioned by
+    frames = []
+    for path in paths:
+        with open(path, "rb") as f:
+            frames.append(pickle.load(f))
+
+    df = concat_events(frames)
+
+    # Time order with input order as tie-break, as in the serial frame
+    order = np.lexsort((df["seq"].to_numpy(), df["timestamp"].to_numpy()))
+    df = df.iloc[order].reset_index(drop=True)
+
+    # Positions in the keys refer to this (already time-sorted) frame; the
+    # global key is the first event's time and input position, then the rule.
+    timestamps = df["timestamp"].to_numpy().astype(np.int64)
+    seq = df["seq"].to_numpy()
+
+    return [
+        ((int(timestamps[position]), int(seq[position]), rule_index), incident)
+        for (position, rule_index), incident in correlate_incidents_keyed(df, rules)
+    ]
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+
+def run_parallel_pipeline(auth_logs, endpoint_logs, network_logs, workers=None, shards=None,
+                          model_path=MODEL_PATH, playbooks=True, profile_mode=PROFILE_MODE,
+                          split_bytes=SPLIT_BYTES, record_batch=RECORD_BATCH,
+                          baselines_path=BASELINES_PATH, progress=None):
+
+    # Inputs are JSONL file paths (split by byte range, so parsing scales
+    # with the workers too) or iterables of records (batched by the parent).
+    # Scores must not depend on how events are sharded, so a baseline model
+    # from train_model.py is required rather than fitting per batch.
+    if load_anomaly_model(model_path) is None:
+        raise ValueError(
+            f"No trained anomaly model at {model_path}. "
+            "Run train_model.py before using the parallel pipeline."
+        )
+
+    workers = workers or os.cpu_count()
+    shards = shards or workers
+
+    report = ValidationReport()
+    profiler = PipelineProfiler(profile_mode, progress)
+
+    # Compiled once here so every split and shard uses the same rule version
+    rules = get_rules()
+    group_columns = rules.group_columns()
+
+    with profiler, tempfile.TemporaryDirectory(prefix="aegisir-shards-") as shard_dir, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(),
+                                initializer=_init_worker, initargs=(model_path, baselines_path)) as pool:
+
+        with profiler.stage("parallel_map") as stage:
+            outputs = []
+            pending = set()
+
+            tasks = _iter_tasks((auth_logs, endpoint_logs, network_logs), split_bytes, record_batch)
+
+            for task_index, (source, split) in enumerate(tasks):
+                # Bound the record batches held in memory by the parent
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    outputs.extend(future.result() for future in done)
+
+                pending.add(pool.submit(
+                    _map_split, task_index, source, split, shards, shard_dir, group_columns
+                ))
+
+            outputs.extend(future.result() for future in pending)
+            outputs.sort(key=lambda output: output["task"])
+
+            # Merge validation reports; record indexes become positions in
+            # the whole source rather than in the split.
+            offsets = {}
+            shard_paths = {}
+
+            for output in outputs:
+                source = output["source"]
+
+                report.merge(output["report"], offsets.get(source, 0))
+                offsets[source] = offsets.get(source, 0) + output["records"]
+
+                for shard, path in output["shard_paths"].items():
+                    shard_paths.setdefault(shard, []).append(path)
+
+            total_logs = sum(output["rows"] for output in outputs)
+            total_anomalies = sum(output["anomalies"] for output in outputs)
+            stage["rows"] = total_logs
+            stage["tasks"] = len(outputs)
+
+        deltas = [output for output in outputs if output["baselines"] is not None]
+
+        if deltas:
+            with profiler.stage("baseline_update", rows=total_logs):
+                delta = UserBaselines()
+                for output in deltas:
+                    delta.merge(output["baselines"])
+                digest = combine_digests(output["digest"] for output in deltas)
+                fold_baselines(delta, digest, baselines_path)
+
+        if total_logs == 0:
+            errors = "; ".join(e["error"] for e in report.errors[:3])
+            raise ValueError(f"No valid log records to analyse. {errors}".strip())
+
+        with profiler.stage("parallel_correlation", rows=total_logs) as stage:
+            keyed = []
+            shard_list = list(shard_paths.values())
+            shard_rules = {column: rules.grouped_by(column) for column in group_columns}
+            rule_list = [shard_rules[column] for column, _ in shard_paths]
+
+            for shard_incidents in pool.map(_reduce_shard, shard_list, rule_list):
+                keyed.extend(shard_incidents)
+
+            keyed.sort(key=lambda item: item[0])
+
+            incidents = []
+            for number, (_, incident) in enumerate(keyed, start=1):
+                incident["incident_id"] = f"INC{number:03d}"
+                incidents.append(incident)
+
+            stage["incidents"] = len(incidents)
+            stage["shards"] = len(shard_paths)
+
+        results = complete_run(profiler, incidents, total_logs, total_anomalies, report, playbooks)
+
+    if profiler.dump_path:
+        results["profile_path"] = profiler.dump_path
+
+    return results
@@ -1,33 +1,181 @@
 from preprocessing.feature_engineering import preprocess_logs
-from detection.anomaly_model import train_anomaly_model
+from preprocessing.user_baselines import (
+    UserBaselines, events_digest, fold_baselines, load_baselines, update_baselines
+)
+from detection.anomaly_model import MODEL_PATH, detect_anomalies
+from detection.online_model import detect_anomalies_online
 from correlation.engine import correlate_incidents
-from scoring.severity import calculate_severity
+from scoring.severity import score_incidents
 from mapping.mitre import map_to_mitre
-from response.llm_playbook import generate_playbook
+from response.llm_playbook import generate_playbooks
 from audit.logger import write_audit_log
+from security.validator import ValidationReport
+from core.instrumentation import PipelineProfiler, PROFILE_MODE
 
 
-def run_detection_pipeline(auth_logs, endpoint_logs, network_logs):
+def complete_run(profiler, incidents, total_logs, total_anomalies, report, playbooks=True):
 
-    df = preprocess_logs(auth_logs, endpoint_logs, network_logs)
+    # Shared tail of the serial and parallel (core.parallel) pipelines
+    with profiler.stage("severity_scoring", rows=len(incidents)):
+        score_incidents(incidents)
 
-    df, model = train_anomaly_model(df)
+    with profiler.stage("mitre_mapping", rows=len(incidents)):
+        for incident in incidents:
+            incident["mitre_mapping"] = map_to_mitre(incident)
+            incident["playbook"] = None
 
-    incidents = correlate_incidents(df)
+    # With playbooks=False the caller generates them afterwards
+    # (response.llm_playbook.PlaybookBatch) and can show results right away;
+    # audit.logger.write_playbook_audit then records them under the run_id.
+    if playbooks:
+        with profiler.stage("playbooks", rows=len(incidents)):
+            generate_playbooks(incidents)
+
+    results = {
+        "total_logs": total_logs,
+        "total_anomalies": total_anomalies,
+        "incidents": incidents,
+        "validation": report.as_dict(),
+        "stage_metrics": profiler.stages
+    }
+
+    # Written in the background; the run_id locates the record later
+    # (audit.logger.find_audit_records). The record carries every stage
+    # up to this one; the audit stage itself is only in results.
+    with profiler.stage("audit_write", rows=len(incidents)):
+        results["run_id"] = write_audit_log(results)
+
+    return results
+
+
+def run_detection_pipeline(auth_logs, endpoint_logs, network_logs, playbooks=True,
+                           profile_mode=PROFILE_MODE, workers=1, progress=None):
+
+    # workers > 1 shards the run across processes by user (core.parallel);
+    # that mode needs a pre-trained model and accepts JSONL file paths.
+    if workers > 1:
+        from core.parallel import run_parallel_pipeline
+        return run_parallel_pipeline(
+            auth_logs, endpoint_logs, network_logs, workers=workers,
+            playbooks=playbooks, profile_mode=profile_mode, progress=progress
+        )
+
+    # Records are validated while they are ingested; bad ones are skipped
+    # and reported in results["validation"].
+    report = ValidationReport()
+
+    # Per-stage timings land in results["stage_metrics"]; profile_mode
+    # "cprofile"/"tracemalloc" additionally dumps a profile of the run.
+    # progress(stage, metrics) follows the run stage by stage (core.jobs).
+    profiler = PipelineProfiler(profile_mode, progress)
+
+    with profiler:
+
+        with profiler.stage("preprocessing") as stage:
+            # Per-user baselines, once an index has been built (train_model.py --baselines)
+            baselines = load_baselines()
+            df = preprocess_logs(auth_logs, endpoint_logs, network_logs, report, baselines)
+            stage["rows"] = len(df)
+
+        if df.empty:
+            errors = "; ".join(e["error"] for e in report.errors[:3])
+            raise ValueError(f"No valid log records to analyse. {errors}".strip())
+
+        with profiler.stage("anomaly_detection", rows=len(df)):
+            df, model = detect_anomalies(df)
+
+        if baselines is not None:
+            with profiler.stage("baseline_update", rows=len(df)):
+                fold_baselines(update_baselines(UserBaselines(), df), events_digest(df))
+
+        with profiler.stage("correlation", rows=len(df)) as stage:
+            incidents = correlate_incidents(df)
+            stage["incidents"] = len(incidents)
+
+        results = complete_run(
+            profiler, incidents, len(df), int((df["anomaly_flag"] == -1).sum()),
+            report, playbooks
+        )
+
+    if profiler.dump_path:
+        results["profile_path"] = profiler.dump_path
+
+    return results
+
+
+def run_streaming_pipeline(correlator, auth_logs, endpoint_logs, network_logs, detector=None,
+                           baselines=None, playbooks=True, report=None, model_path=MODEL_PATH):
+
+    # One micro-batch of a continuous run: correlator state (a
+    # correlation.streaming.RuleStreamCorrelator) carries across calls, and
+    # so does an optional online detector (detection.online_model), which
+    # then replaces the batch model and keeps learning from every
+    # micro-batch. Baselines (preprocessing.user_baselines) are updated in
+    # memory; saving them is up to the caller.
+    report = report if report is not None else ValidationReport()
+
+    df = preprocess_logs(auth_logs, endpoint_logs, network_logs, report, baselines)
+
+    return run_streaming_batch(
+        correlator, df, report, detector=detector, baselines=baselines,
+        playbooks=playbooks, model_path=model_path
+    )
+
+
+def run_streaming_batch(correlator, df, report, detector=None, baselines=None,
+                        playbooks=True, model_path=MODEL_PATH):
+
+    # run_streaming_pipeline after preprocessing, for callers that preprocess
+    # (and reject) their inputs one by one (core.service). Returns results
+    # shaped like run_detection_pipeline's, audited per batch; run_id is None
+    # when the batch held no valid records (correlator state is then unchanged).
+    if df.empty:
+        return {
+            "total_logs": 0,
+            "total_anomalies": 0,
+            "incidents": [],
+            "validation": report.as_dict(),
+            "run_id": None
+        }
+
+    if detector is not None:
+        df, model = detect_anomalies_online(df, detector)
+    else:
+        df, model = detect_anomalies(df, model_path)
+
+    if baselines is not None:
+        update_baselines(baselines, df)
+
+    return _complete_streaming(
+        correlator.process_batch(df), len(df), int((df["anomaly_flag"] == -1).sum()),
+        report, playbooks
+    )
+
+
+def flush_streaming(correlator, playbooks=True):
+
+    # Incidents of every window the correlator still holds open (see
+    # RuleStreamCorrelator.flush), scored, mapped and audited like a batch's
+    return _complete_streaming(correlator.flush(), 0, 0, ValidationReport(), playbooks)
+
+
+def _complete_streaming(incidents, total_logs, total_anomalies, report, playbooks):
+
+    incidents = score_incidents(incidents)
 
     for incident in incidents:
-        incident.update(calculate_severity(incident))
         incident["mitre_mapping"] = map_to_mitre(incident)
-        incident["playbook"] = generate_playbook(incident)
+        incident["playbook"] = None
 
-    total_anomalies = len(df[df["anomaly_flag"] == -1])
+    if playbooks:
+        generate_playbooks(incidents)
 
     results = {
-        "total_logs": len(df),
+        "total_logs": total_logs,
         "total_anomalies": total_anomalies,
-        "incidents": incidents
+        "incidents": incidents,
+        "validation": report.as_dict()
     }
-
-    write_audit_log(results)
+    results["run_id"] = write_audit_log(results)
 
     return results
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from core.pipeline import run_detection_pipeline
+from detection.anomaly_model import MODEL_PATH, MODEL_VERSION
+from correlation.rules import RULES_PATH
+from preprocessing.user_baselines import BASELINES_PATH
+from preprocessing.log_reader import stream_logs
+
+# Scan results keyed on the uploaded bytes and the pipeline version, so a
+# re-upload of the same files (from any page or session of the app process)
+# is answered without parsing anything. Entries live in a bounded in-memory
+# LRU; least recently used ones spill to disk, which is bounded too.
+
+# Empty AEGISIR_RESULT_CACHE_DIR keeps the cache in memory only
+RESULT_CACHE_DIR = os.environ.get("AEGISIR_RESULT_CACHE_DIR", "logs/result_cache")
+RESULT_CACHE_MEMORY_MB = float(os.environ.get("AEGISIR_RESULT_CACHE_MEMORY_MB", "64"))
+RESULT_CACHE_DISK_MB = float(os.environ.get("AEGISIR_RESULT_CACHE_DISK_MB", "512"))
+
+# Bump when the shape of cached results changes
+RESULT_CACHE_FORMAT = 1
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def upload_digest(upload):
+
+    # SHA-256 of an uploaded file (or path), read in chunks and rewound
+    digest = hashlib.sha256()
+
+    if isinstance(upload, (str, os.PathLike)):
+        with open(upload, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    upload.seek(0)
+    for chunk in iter(lambda: upload.read(HASH_CHUNK_BYTES), b""):
+        digest.update(chunk)
+    upload.seek(0)
+
+    return digest.hexdigest()
+
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+
+def pipeline_version(model_path=MODEL_PATH, rules_path=RULES_PATH, baselines_path=BASELINES_PATH):
+
+    # What else decides a scan's results: the trained model, the rules and
+    # the per-user baselines the features are computed against. A scan that
+    # folds new events into the baselines moves them to a new version; a
+    # re-scan of the same uploads is not folded in twice (fold_baselines skips
+    # digests it has seen), so the baselines stay put and its results cache.
+    return {
+        "format": RESULT_CACHE_FORMAT,
+        "model_version": MODEL_VERSION,
+        "model": _file_version(model_path),
+        "rules": _file_version(rules_path),
+        "baselines": _file_version(baselines_path)
+    }
+
+
+def scan_cache_key(uploads, version=None, digests=None):
+
+    payload = json.dumps({
+        "uploads": digests or [upload_digest(upload) for upload in uploads],
+        "pipeline": version or pipeline_version()
+    }, sort_keys=True)
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+
+    # In-memory LRU of pickled results, bounded by memory_bytes; evicted
+    # entries spill to directory/<key>.pkl, whose total size is bounded by
+    # disk_bytes (oldest files deleted first). Safe to share across threads.
+
+    def __init__(self, directory=RESULT_CACHE_DIR, memory_bytes=RESULT_CACHE_MEMORY_MB * 1024 * 1024,
+                 disk_bytes=RESULT_CACHE_DISK_MB * 1024 * 1024):
+
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self.spills = 0
+        self.evictions = 0
+
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+
+        # A fresh copy every time: callers fill in playbooks on the incidents
+        with self._lock:
+            data = self._memory.get(key)
+
+            if data is not None:
+                self._memory.move_to_end(key)
+            elif self.directory and os.path.exists(self._path(key)):
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._path(key))
+                self._remember(key, data)
+
+            if data is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        return pickle.loads(data)
+
+    def put(self, key, results):
+
+        data = pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            self._remember(key, data)
+
+    def _remember(self, key, data):
+
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key))
+
+        self._memory[key] = data
+        self._memory_size += len(data)
+
+        while self._memory_size > self.memory_bytes and self._memory:
+            spilled_key, spilled = self._memory.popitem(last=False)
+            self._memory_size -= len(spilled)
+            self._spill(spilled_key, spilled)
+
+    def _spill(self, key, data):
+
+        if not self.directory:
+            self.evictions += 1
+            return
+
+        path = self._path(key)
+
+        if not os.path.exists(path):
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            self.spills += 1
+
+        # Least recently used files go first (get() touches what it reads)
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in files)
+
+        for _, size, name in sorted(files):
+            if total <= self.disk_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+
+        with self._lock:
+            memory_entries = len(self._memory)
+            memory_size = self._memory_size
+
+        disk_entries = 0
+        disk_size = 0
+
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".pkl"):
+                    disk_entries += 1
+                    disk_size += os.path.getsize(os.path.join(self.directory, name))
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": memory_entries,
+            "memory_mb": round(memory_size / 1024 / 1024, 2),
+            "disk_entries": disk_entries,
+            "disk_mb": round(disk_size / 1024 / 1024, 2),
+            "spills": self.spills,
+            "evictions": self.evictions
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+
+    # One cache per process, shared by every Streamlit session and page
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+
+    return _cache
+
+
+def run_cached_scan(auth_file, endpoint_file, network_file, progress=None, digests=None):
+
+    # Results of run_detection_pipeline(playbooks=False) for three uploads,
+    # plus results["cached"]. Only the hashes are computed on a hit, and not
+    # even those when the caller already has the upload digests.
+    uploads = (auth_file, endpoint_file, network_file)
+    cache = get_result_cache()
+    version = pipeline_version()
+    key = scan_cache_key(uploads, version, digests)
+
+    results = cache.get(key)
+
+    if results is not None:
+        results["cached"] = True
+        return results
+
+    results = run_detection_pipeline(
+        *(stream_logs(upload) for upload in uploads), playbooks=False, progress=progress
+    )
+
+    # The model, rules or baselines changed during the run (train_model.py in
+    # another process, or this scan folding its events into the baselines):
+    # the key of the version the scan started with is stale, so nothing is
+    # stored under it
+    if pipeline_version() == version:
+        cache.put(key, results)
+
+    results["cached"] = False
+
+    return results
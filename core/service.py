@@ -0,0 +1,545 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from preprocessing.feature_engineering import LOG_SOURCES, concat_events, preprocess_logs
+from preprocessing.user_baselines import BASELINES_PATH, load_baselines
+from detection.anomaly_model import MODEL_PATH, load_anomaly_model
+from detection.online_model import OnlineIsolationForest
+from correlation.streaming import RuleStreamCorrelator
+from security.validator import ValidationReport
+from core.pipeline import flush_streaming, run_streaming_batch
+
+# --------------------------
+# Local scoring service: other systems push event batches over HTTP
+# instead of analysts uploading files.
+#
+#   python -m core.service [--port 8765] [--batch-wait-ms 0] [--playbooks]
+#
+#   POST /events          {"auth": [...], "endpoint": [...], "network": [...]}
+#                         -> incidents completed by the request's micro-batch
+#                            (any user's: an incident completes once later
+#                            events pass its window), and the batch's run_id
+#   POST /flush           -> incidents of every window still open, closed now
+#   GET  /incidents?after=N   every incident since sequence number N
+#   GET  /metrics         request latency, queue wait and batch sizes
+#   GET  /health
+#
+# Requests that arrive together are coalesced into one micro-batch, so the
+# model scores one vectorized frame per batch rather than a few rows per
+# request. The model, correlator state and baselines stay in memory; a
+# single batch thread owns them, so batches run in arrival order. The
+# correlator runs the rules of correlation/rules.json, as scans do, and
+# reports an incident once the stream has passed the end of its window.
+# Windows still open are flushed on POST /flush, after FLUSH_IDLE_SECONDS
+# without requests and at shutdown. Every batch and flush gets an audit record.
+# --------------------------
+
+SERVICE_HOST = os.environ.get("AEGISIR_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("AEGISIR_SERVICE_PORT", "8765"))
+
+# A batch takes every request queued while the previous one ran, then
+# waits this long for more. Under load the queue alone forms large
+# batches; a wait only adds latency for light traffic (benchmarks/bench_service.py)
+BATCH_WAIT_MS = float(os.environ.get("AEGISIR_BATCH_WAIT_MS", "0"))
+
+# A batch closes early once it holds this many events
+BATCH_MAX_EVENTS = int(os.environ.get("AEGISIR_BATCH_MAX_EVENTS", "50000"))
+
+# Wall-clock quiet period after which open windows are flushed, so the last
+# incidents before a pause are reported (0 leaves it to POST /flush)
+FLUSH_IDLE_SECONDS = float(os.environ.get("AEGISIR_FLUSH_IDLE_SECONDS", "60"))
+
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+# Latency samples and incidents kept for /metrics and /incidents
+METRIC_SAMPLES = 10_000
+RECENT_INCIDENTS = 1_000
+
+
+class _Request:
+
+    # Events to score, or (flush=True) a request to close every open window
+
+    def __init__(self, logs, flush=False):
+        self.logs = logs
+        self.flush = flush
+        self.events = sum(len(records) for records in logs.values())
+        self.arrived = time.perf_counter()
+        self.started = None
+        self.done = threading.Event()
+        self.incidents = []
+        self.batch = None
+        self.report = None
+        self.error = None
+
+
+def _percentiles(samples, percentiles=(50, 95, 99)):
+
+    if not samples:
+        return {}
+
+    values = np.percentile(np.fromiter(samples, dtype=np.float64), percentiles)
+
+    return {f"p{p}_ms": round(float(v), 3) for p, v in zip(percentiles, values)}
+
+
+def _zone(frame):
+    tz = getattr(frame["timestamp"].dtype, "tz", None)
+    return "naive" if tz is None else str(tz)
+
+
+class ScoringService:
+
+    # Micro-batching front of core.pipeline's streaming run. submit() blocks the
+    # calling (HTTP handler) thread until the batch holding its events has
+    # been scored and correlated.
+
+    def __init__(self, model_path=MODEL_PATH, baselines_path=BASELINES_PATH,
+                 batch_wait_ms=BATCH_WAIT_MS, batch_max_events=BATCH_MAX_EVENTS, playbooks=False,
+                 flush_idle_seconds=FLUSH_IDLE_SECONDS):
+
+        # Scores must not depend on how requests happen to be batched, so
+        # a model from train_model.py is required rather than fitting per batch
+        bundle = load_anomaly_model(model_path)
+
+        if bundle is None:
+            raise ValueError(
+                f"No trained anomaly model at {model_path}. "
+                "Run train_model.py before starting the service."
+            )
+
+        # An online model (train_model.py --online) keeps learning from the stream
+        model = bundle["model"]
+        self.detector = model if isinstance(model, OnlineIsolationForest) else None
+        self.model_path = model_path
+
+        # Joined and updated in memory only; the saved index is left to scans
+        self.baselines = load_baselines(baselines_path)
+
+        self.correlator = RuleStreamCorrelator()
+        self.timestamp_tz = None
+        self.batch_wait = batch_wait_ms / 1000
+        self.batch_max_events = batch_max_events
+        self.playbooks = playbooks
+        self.flush_idle = flush_idle_seconds
+
+        self.incidents = deque(maxlen=RECENT_INCIDENTS)
+        self.incident_seq = 0
+
+        self._lock = threading.Lock()
+        self._latency_ms = deque(maxlen=METRIC_SAMPLES)
+        self._queue_ms = deque(maxlen=METRIC_SAMPLES)
+        self._batch_ms = deque(maxlen=METRIC_SAMPLES)
+        self._batch_events = deque(maxlen=METRIC_SAMPLES)
+        self._batch_requests = deque(maxlen=METRIC_SAMPLES)
+        self._counters = {
+            "requests": 0, "events": 0, "batches": 0, "flushes": 0, "incidents": 0,
+            "invalid_records": 0, "errors": 0
+        }
+        self._started = time.time()
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    # ----------------------------
+    # Batching
+    # ----------------------------
+
+    def submit(self, logs):
+
+        request = _Request(logs)
+        self._queue.put(request)
+        request.done.wait()
+
+        latency_ms = (time.perf_counter() - request.arrived) * 1000
+
+        with self._lock:
+            self._latency_ms.append(latency_ms)
+            self._queue_ms.append((request.started - request.arrived) * 1000)
+
+        if request.error is not None:
+            raise request.error
+
+        return {
+            "incidents": request.incidents,
+            "validation": request.report.as_dict(),
+            "batch": request.batch,
+            "latency_ms": round(latency_ms, 3)
+        }
+
+    def flush(self):
+
+        # Blocks until the batch thread has closed every open window
+        request = _Request({}, flush=True)
+        self._queue.put(request)
+        request.done.wait()
+
+        if request.error is not None:
+            raise request.error
+
+        return {"incidents": request.incidents, "run_id": request.batch["run_id"]}
+
+    def _next_request(self):
+
+        # Waits for the next request; once the stream has been quiet for
+        # flush_idle seconds with windows open, flushes them first
+        if not self.flush_idle:
+            return self._queue.get()
+
+        while True:
+            try:
+                return self._queue.get(timeout=self.flush_idle)
+            except queue.Empty:
+                if self.correlator.tracked_events():
+                    self._run_flush()
+
+    def _loop(self):
+
+        while True:
+            request = self._next_request()
+
+            if request is None:
+                # Shutdown: report what the open windows hold
+                self._run_flush()
+                return
+
+            if request.flush:
+                self._run_flush(request)
+                continue
+
+            flush = None
+            batch = [request]
+            events = request.events
+            deadline = time.perf_counter() + self.batch_wait
+
+            # Everything already queued, then whatever arrives before the deadline
+            while events < self.batch_max_events:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        request = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+
+                if request is None:
+                    self._queue.put(None)
+                    break
+
+                # Runs after the events queued before it
+                if request.flush:
+                    flush = request
+                    break
+
+                batch.append(request)
+                events += request.events
+
+            self._run_batch(batch, events)
+
+            if flush is not None:
+                self._run_flush(flush)
+
+    def _record(self, incidents):
+
+        # With self._lock held
+        for incident in incidents:
+            self.incident_seq += 1
+            incident["seq"] = self.incident_seq
+            self.incidents.append(incident)
+
+        self._counters["incidents"] += len(incidents)
+
+    def _run_flush(self, request=None):
+
+        try:
+            results = flush_streaming(self.correlator, playbooks=self.playbooks)
+            incidents, run_id, error = results["incidents"], results["run_id"], None
+        except Exception as e:
+            incidents, run_id, error = [], None, e
+
+        with self._lock:
+            self._record(incidents)
+            self._counters["flushes"] += 1
+            self._counters["errors"] += error is not None
+
+        if request is not None:
+            request.incidents = incidents
+            request.batch = {"run_id": run_id}
+            request.error = error
+            request.done.set()
+
+    def _preprocess(self, request, timestamp_tz):
+
+        # Each request is preprocessed and validated on its own, so a bad one
+        # fails alone instead of taking its batch down. Correlator state has
+        # one kind of timestamp (naive or a single zone), fixed by the first
+        # events accepted; requests of the other kind cannot be compared with it.
+        request.report = ValidationReport()
+
+        frame = preprocess_logs(
+            request.logs.get("auth", []), request.logs.get("endpoint", []),
+            request.logs.get("network", []), request.report, self.baselines
+        )
+
+        if len(frame) and timestamp_tz is not None and _zone(frame) != timestamp_tz:
+            raise ValueError(
+                f"Timestamps ({_zone(frame)}) cannot be mixed with the stream's ({timestamp_tz})."
+            )
+
+        return frame
+
+    def _run_batch(self, batch, events):
+
+        started = time.perf_counter()
+        for request in batch:
+            request.started = started
+
+        report = ValidationReport()
+        timestamp_tz = self.timestamp_tz
+        accepted = []
+        frames = []
+
+        for request in batch:
+            try:
+                frame = self._preprocess(request, timestamp_tz)
+            except Exception as e:
+                request.error = e
+                continue
+
+            report.merge(request.report)
+            accepted.append(request)
+
+            if len(frame):
+                frames.append(frame)
+                timestamp_tz = _zone(frame)
+
+        incidents = []
+        run_id = None
+        error = None
+
+        if accepted:
+            df = concat_events(frames) if frames else pd.DataFrame()
+
+            try:
+                results = run_streaming_batch(
+                    self.correlator, df, report, detector=self.detector,
+                    baselines=self.baselines, playbooks=self.playbooks,
+                    model_path=self.model_path
+                )
+                incidents = results["incidents"]
+                run_id = results["run_id"]
+                self.timestamp_tz = timestamp_tz
+            except Exception as e:
+                error = e
+
+        batch_ms = (time.perf_counter() - started) * 1000
+
+        for request in accepted:
+            request.error = error
+
+        with self._lock:
+            self._record(incidents)
+
+            self._batch_ms.append(batch_ms)
+            self._batch_events.append(events)
+            self._batch_requests.append(len(batch))
+
+            self._counters["requests"] += len(batch)
+            self._counters["events"] += events
+            self._counters["batches"] += 1
+            self._counters["invalid_records"] += report.invalid_records
+            self._counters["errors"] += sum(request.error is not None for request in batch)
+
+        summary = {
+            "requests": len(batch),
+            "events": events,
+            "invalid_records": report.invalid_records,
+            "pipeline_ms": round(batch_ms, 3),
+            "run_id": run_id
+        }
+
+        for request in batch:
+            request.incidents = incidents
+            request.batch = summary
+            request.done.set()
+
+    def close(self):
+
+        # Open windows are flushed (and audited) before the batch thread exits
+        self._queue.put(None)
+        self._thread.join()
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+
+    def recent_incidents(self, after=0):
+        with self._lock:
+            return [incident for incident in self.incidents if incident["seq"] > after]
+
+    def metrics(self):
+
+        with self._lock:
+            latency = list(self._latency_ms)
+            queue_wait = list(self._queue_ms)
+            batch_ms = list(self._batch_ms)
+            batch_events = list(self._batch_events)
+            batch_requests = list(self._batch_requests)
+            counters = dict(self._counters)
+
+        return {
+            **counters,
+            "uptime_s": round(time.time() - self._started, 1),
+            "queued_requests": self._queue.qsize(),
+            "tracked_events": self.correlator.tracked_events(),
+            "late_events": self.correlator.late_events,
+            "request_latency": _percentiles(latency),
+            "queue_wait": _percentiles(queue_wait),
+            "batch_latency": _percentiles(batch_ms),
+            "mean_batch_events": round(float(np.mean(batch_events)), 1) if batch_events else 0.0,
+            "mean_batch_requests": round(float(np.mean(batch_requests)), 2) if batch_requests else 0.0
+        }
+
+
+# ----------------------------
+# HTTP front end
+# ----------------------------
+
+class ServiceHandler(BaseHTTPRequestHandler):
+
+    service = None
+
+    def log_message(self, format, *args):
+        # One line per request would dominate the service's output
+        pass
+
+    def _send(self, status, payload):
+
+        body = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+
+        url = urlparse(self.path)
+
+        if url.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif url.path == "/metrics":
+            self._send(200, self.service.metrics())
+        elif url.path == "/incidents":
+            try:
+                after = int(parse_qs(url.query).get("after", ["0"])[0])
+            except ValueError:
+                self._send(400, {"error": "after must be an integer"})
+                return
+            self._send(200, {"incidents": self.service.recent_incidents(after)})
+        else:
+            self._send(404, {"error": f"Unknown path {url.path}"})
+
+    def do_POST(self):
+
+        path = urlparse(self.path).path
+
+        if path == "/flush":
+            try:
+                self._send(200, self.service.flush())
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+            return
+
+        if path != "/events":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+
+        if length > MAX_REQUEST_BYTES:
+            self._send(413, {"error": f"Request larger than {MAX_REQUEST_BYTES} bytes"})
+            return
+
+        try:
+            logs = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._send(400, {"error": "Body is not valid JSON"})
+            return
+
+        if not isinstance(logs, dict) or not set(logs) <= set(LOG_SOURCES) or \
+                not all(isinstance(records, list) for records in logs.values()):
+            self._send(400, {"error": f"Expected an object of record lists keyed by {LOG_SOURCES}"})
+            return
+
+        try:
+            self._send(200, self.service.submit(logs))
+        except ValueError as e:
+            self._send(422, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+
+
+class ServiceServer(ThreadingHTTPServer):
+
+    # The default listen backlog (5) refuses bursts of concurrent clients,
+    # which then retry after a second
+    request_queue_size = 256
+
+
+def make_server(service, host=SERVICE_HOST, port=SERVICE_PORT):
+
+    # Port 0 picks a free port (server.server_address has the actual one)
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    return ServiceServer((host, port), handler)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Run the AegisIR local scoring service.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--batch-wait-ms", type=float, default=BATCH_WAIT_MS)
+    parser.add_argument("--batch-max-events", type=int, default=BATCH_MAX_EVENTS)
+    parser.add_argument("--flush-idle-seconds", type=float, default=FLUSH_IDLE_SECONDS,
+                        help="flush open windows after this long without requests (0: never)")
+    parser.add_argument("--playbooks", action="store_true",
+                        help="generate LLM playbooks before answering (needs Ollama)")
+    args = parser.parse_args()
+
+    service = ScoringService(
+        model_path=args.model, batch_wait_ms=args.batch_wait_ms,
+        batch_max_events=args.batch_max_events, playbooks=args.playbooks,
+        flush_idle_seconds=args.flush_idle_seconds
+    )
+    server = make_server(service, args.host, args.port)
+
+    print(f"AegisIR scoring service on http://{args.host}:{server.server_address[1]}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,363 @@
+import numpy as np
 import pandas as pd
 
-def correlate_incidents(df):
+from correlation.rules import get_rules, rule_matches
+from preprocessing.feature_engineering import concat_events, enforce_event_schema
+
+# Detection rules are declared in correlation/rules.json (see
+# correlation.rules).
+
+# Slice size used by time_chunks for bounded-memory correlation
+CHUNK_PERIOD = pd.Timedelta(hours=1)
+
+
+def _group_by(df, column="user"):
+
+    # Stable reorder so each key's events are contiguous and still
+    # time-sorted; keys keep their order of first appearance.
+    codes, keys = pd.factorize(df[column], sort=False)
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes, minlength=len(keys))
+    ends = np.cumsum(counts)
+    starts = ends - counts
+
+    return order, keys, starts, ends
+
+
+def _window_bounds(timestamps, starts, ends, window):
+
+    # Window of event i is [t_i, t_i + window], i.e. positions [lo, hi).
+    lo = np.empty(len(timestamps), dtype=np.int64)
+    hi = np.empty(len(timestamps), dtype=np.int64)
+
+    window = np.timedelta64(window)
+
+    for start, end in zip(starts, ends):
+        ts = timestamps[start:end]
+        lo[start:end] = start + np.searchsorted(ts, ts, side="left")
+        hi[start:end] = start + np.searchsorted(ts, ts + window, side="right")
+
+    return lo, hi
+
+
+def _merge_windows(anchors, lo, hi):
+
+    # Coalesce the qualifying windows [lo, hi) of the given anchors (in
+    # position order) into maximal runs of overlapping windows. Windows of
+    # different keys never overlap, and hi is non-decreasing within a key,
+    # so a window starts a new run iff it begins at or after the previous end.
+    # Returns (run_lo, run_hi, windows_per_run).
+    if not len(anchors):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    anchor_lo = lo[anchors]
+    anchor_hi = hi[anchors]
+
+    run_starts = np.flatnonzero(np.r_[True, anchor_lo[1:] >= anchor_hi[:-1]])
+
+    run_lo = anchor_lo[run_starts]
+    run_hi = np.maximum.reduceat(anchor_hi, run_starts)
+    windows = np.diff(np.r_[run_starts, len(anchors)])
+
+    return run_lo, run_hi, windows
+
+
+def _event_columns(df):
+
+    # Plain arrays of the columns an incident is built from, extracted once
+    # per frame so building many incidents avoids per-slice pandas overhead
+    return {
+        "timestamp": df["timestamp"].to_numpy(),
+        "user": df["user"].to_numpy(),
+        "log_source": df["log_source"].to_numpy(),
+        "is_failed": df["is_failed"].to_numpy(),
+        "is_unusual_ip": df["is_unusual_ip"].to_numpy(),
+        "is_privilege_escalation": df["is_privilege_escalation"].to_numpy(),
+        "is_sensitive_access": df["is_sensitive_access"].to_numpy(),
+        "data_volume_mb": df["data_volume_mb"].to_numpy(),
+        "anomaly_flag": df["anomaly_flag"].to_numpy(),
+        "anomaly_score": df["anomaly_score"].to_numpy()
+    }
+
+
+def _incident(incident_id, key, columns, a, b, windows_merged, rule):
+
+    # Incident from events [a, b) of the column arrays
+    window = {name: values[a:b] for name, values in columns.items()}
+
+    sources = [str(s) for s in window["log_source"]]
+    systems = list(dict.fromkeys(sources))
+
+    aggregated_risk = {
+        "failed_logins": int(window["is_failed"].sum()),
+        "unusual_ip_events": int(window["is_unusual_ip"].sum()),
+        "privilege_escalations": int(window["is_privilege_escalation"].sum()),
+        "sensitive_access_events": int(window["is_sensitive_access"].sum()),
+        "max_data_transfer_mb": float(window["data_volume_mb"].max())
+    }
+
+    stamps = [
+        stamp.replace("T", " ")
+        for stamp in np.datetime_as_string(window["timestamp"], unit="s")
+    ]
+
+    timeline = [
+        {"timestamp": timestamp, "log_source": source}
+        for timestamp, source in zip(stamps, sources)
+    ]
+
+    group_by = rule["group_by"]
+
+    incident = {
+        "incident_id": incident_id,
+        "user": str(key) if group_by == "user" else str(window["user"][0]),
+        "incident_type": rule["incident_type"],
+        "start_time": stamps[0],
+        "end_time": stamps[-1],
+        "windows_merged": int(windows_merged),
+        "systems_affected": int(len(systems)),
+        "systems_involved": systems,
+        "events_count": int(b - a),
+        "anomalies_detected": int((window["anomaly_flag"] == -1).sum()),
+        # Scores are float32 in the frame; native float, without float32 noise
+        "max_anomaly_score": round(float(window["anomaly_score"].min()), 6),
+        "risk_summary": aggregated_risk,
+        "timeline": timeline,
+        "rule_id": rule["id"],
+        "mitre_tactics": list(rule["mitre_tactics"])
+    }
+
+    if group_by != "user":
+        incident["group"] = {group_by: str(key)}
+
+    return incident
+
+
+def _key_of(positions, starts):
+    return np.searchsorted(starts, positions, side="right") - 1
+
+
+def _number(found):
+
+    # Incidents ordered by their first event (in time order), then by rule
+    found.sort(key=lambda item: item[0])
 
     incidents = []
-    df = df.sort_values("timestamp")
-
-    incident_counter = 1
-
-    for user in df["user"].unique():
-
-        user_logs = df[df["user"] == user]
-
-        for i in range(len(user_logs)):
-
-            window_start = user_logs.iloc[i]["timestamp"]
-            window_end = window_start + pd.Timedelta(minutes=30)
-
-            window_logs = user_logs[
-                (user_logs["timestamp"] >= window_start) &
-                (user_logs["timestamp"] <= window_end)
-            ]
-
-            failed_count = int(window_logs["is_failed"].sum())
-            unusual_ip = int(window_logs["is_unusual_ip"].sum())
-            privilege = int(window_logs["is_privilege_escalation"].sum())
-            sensitive = int(window_logs["is_sensitive_access"].sum())
-            max_data_transfer = float(window_logs["data_volume_mb"].max())
-            large_transfer = max_data_transfer > 500
-            anomaly_count = int(len(window_logs[window_logs["anomaly_flag"] == -1]))
-
-            if (
-                failed_count >= 5 and
-                unusual_ip >= 1 and
-                privilege >= 1 and
-                sensitive >= 1 and
-                large_transfer and
-                anomaly_count >= 2
-            ):
-
-                systems = [str(s) for s in window_logs["log_source"].unique()]
-
-                # Ensure anomaly score is native float
-                max_anomaly_score = float(window_logs["anomaly_score"].min())
-
-                aggregated_risk = {
-                    "failed_logins": failed_count,
-                    "unusual_ip_events": unusual_ip,
-                    "privilege_escalations": privilege,
-                    "sensitive_access_events": sensitive,
-                    "max_data_transfer_mb": max_data_transfer
-                }
-
-                # Convert timestamps safely to string
-                timeline = window_logs.sort_values("timestamp").apply(
-                    lambda row: {
-                        "timestamp": row["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
-                        "log_source": str(row["log_source"])
-                    },
-                    axis=1
-                ).tolist()
-
-                incident = {
-                    "incident_id": f"INC{incident_counter:03d}",
-                    "user": str(user),
-                    "incident_type": "Account Compromise + Data Exfiltration",
-                    "start_time": window_start.strftime("%Y-%m-%d %H:%M:%S"),
-                    "systems_affected": int(len(systems)),
-                    "systems_involved": systems,
-                    "events_count": int(len(window_logs)),
-                    "anomalies_detected": anomaly_count,
-                    "max_anomaly_score": max_anomaly_score,
-                    "risk_summary": aggregated_risk,
-                    "timeline": timeline
-                }
-
-                incidents.append(incident)
-                incident_counter += 1
-                break
+    for number, (_, incident) in enumerate(found, start=1):
+        incident["incident_id"] = f"INC{number:03d}"
+        incidents.append(incident)
 
     return incidents
+
+
+def correlate_incidents_keyed(df, rules=None):
+
+    # Unnumbered incidents as ((first event position, rule index), incident),
+    # where positions refer to df stably sorted by timestamp. Used directly
+    # by core.parallel to merge shards.
+    if rules is None:
+        rules = get_rules()
+
+    found = []
+
+    if df.empty:
+        return found
+
+    df = enforce_event_schema(df.sort_values("timestamp", kind="stable"))
+
+    # One pass per (key, window) group, however many rules share it
+    for (group_by, window), group_rules in rules.groups.items():
+
+        order, keys, starts, ends = _group_by(df, group_by)
+        grouped = df.iloc[order]
+
+        lo, hi = _window_bounds(grouped["timestamp"].to_numpy(), starts, ends, window)
+        aggregates = {}
+        columns = None
+
+        for rule in group_rules:
+            qualifying = rule_matches(rule, grouped, lo, hi, aggregates)
+            run_lo, run_hi, windows = _merge_windows(np.flatnonzero(qualifying), lo, hi)
+
+            if len(run_lo) and columns is None:
+                columns = _event_columns(grouped)
+
+            for a, b, n, k in zip(run_lo, run_hi, windows, _key_of(run_lo, starts)):
+                found.append((
+                    (int(order[a]), rule["index"]),
+                    _incident(None, keys[k], columns, a, b, n, rule)
+                ))
+
+    return found
+
+
+def correlate_incidents(df, rules=None):
+
+    # Every qualifying window of every rule is found; overlapping windows of
+    # a rule and key are merged into one incident spanning all their events.
+    return _number(correlate_incidents_keyed(df, rules))
+
+
+# ----------------------------
+# Bounded-memory mode
+# ----------------------------
+
+def time_chunks(df, period=CHUNK_PERIOD):
+
+    # Split a frame into consecutive time slices, e.g. to correlate a full
+    # day hour by hour with correlate_incidents_chunked.
+    df = df.sort_values("timestamp", kind="stable")
+
+    buckets = df["timestamp"].dt.floor(period).to_numpy()
+    bounds = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1], True])
+
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        yield df.iloc[a:b]
+
+
+class ChunkedCorrelator:
+
+    # State of correlate_incidents_chunked between chunks, so chunks can
+    # also be fed as they arrive (correlation.streaming.RuleStreamCorrelator).
+    # Chunks must be in time order (no event earlier than the previous
+    # chunk's latest). After each chunk only events whose windows are still
+    # incomplete, and runs of windows that could still grow, are carried
+    # forward. add() returns the incidents completed by a chunk, unnumbered
+    # and keyed ((first event sequence number, rule index), incident) like
+    # correlate_incidents_keyed.
+
+    def __init__(self, rules=None):
+
+        self.rules = get_rules() if rules is None else rules
+        self.carry = None
+        self.latest = None
+        self.seen = 0
+
+        # Per rule and key: the input position from which anchors have to be
+        # evaluated again. Carried rows before it (kept for other rules) were
+        # already accounted for; keys without an entry start at the new chunk.
+        self.pending = {rule["index"]: {} for rule in self.rules.rules}
+
+    def carried_events(self):
+        return 0 if self.carry is None else len(self.carry)
+
+    def add(self, chunk, final=False):
+
+        # final: no more chunks follow, so every window is complete (a final
+        # call may pass an empty chunk to close what is carried)
+        found = []
+        chunk_start = self.seen
+
+        if chunk is not None and len(chunk):
+            chunk = enforce_event_schema(chunk.sort_values("timestamp", kind="stable"))
+
+            if self.latest is not None and chunk["timestamp"].iloc[0] < self.latest:
+                raise ValueError("Chunks must be in time order.")
+
+            chunk = chunk.assign(_seq=np.arange(self.seen, self.seen + len(chunk), dtype=np.int64))
+            self.seen += len(chunk)
+
+            data = chunk if self.carry is None else concat_events([self.carry, chunk])
+
+        elif final and self.carry is not None and len(self.carry):
+            data = self.carry
+
+        else:
+            return found
+
+        latest = self.latest = data["timestamp"].iloc[-1]
+
+        kept = np.zeros(len(data), dtype=bool)
+
+        for (group_by, window), group_rules in self.rules.groups.items():
+
+            order, keys, starts, ends = _group_by(data, group_by)
+            grouped = data.iloc[order]
+
+            timestamps = grouped["timestamp"].to_numpy()
+            seq = grouped["_seq"].to_numpy()
+            lo, hi = _window_bounds(timestamps, starts, ends, window)
+
+            # Windows anchored before `latest - window` are complete: later
+            # chunks cannot add events to them. Per key, [start, cut) are.
+            if final:
+                cuts = ends.copy()
+            else:
+                horizon = latest.to_datetime64() - np.timedelta64(window)
+                cuts = np.array([
+                    start + np.searchsorted(timestamps[start:end], horizon, side="left")
+                    for start, end in zip(starts, ends)
+                ], dtype=np.int64)
+
+            sizes = ends - starts
+            complete = np.arange(len(grouped)) < np.repeat(cuts, sizes)
+
+            group_keep = cuts.copy()
+            aggregates = {}
+            columns = None
+
+            for rule in group_rules:
+
+                rule_pending = self.pending[rule["index"]]
+                evaluate_from = np.array(
+                    [rule_pending.get(key, chunk_start) for key in keys], dtype=np.int64
+                )
+
+                qualifying = (
+                    rule_matches(rule, grouped, lo, hi, aggregates) &
+                    complete &
+                    (seq >= np.repeat(evaluate_from, sizes))
+                )
+
+                run_lo, run_hi, windows = _merge_windows(np.flatnonzero(qualifying), lo, hi)
+                run_keys = _key_of(run_lo, starts)
+
+                # A run is final once no incomplete window can reach into it
+                closed = run_hi <= cuts[run_keys]
+
+                rule_keep = cuts.copy()
+                for a, k in zip(run_lo[~closed], run_keys[~closed]):
+                    rule_keep[k] = min(rule_keep[k], a)
+
+                if closed.any() and columns is None:
+                    columns = _event_columns(grouped)
+
+                for a, b, n, k in zip(run_lo[closed], run_hi[closed], windows[closed], run_keys[closed]):
+                    found.append((
+                        (int(seq[a]), rule["index"]),
+                        _incident(None, keys[k], columns, a, b, n, rule)
+                    ))
+
+                rule_pending.clear()
+                for k in np.flatnonzero(rule_keep < ends):
+                    rule_pending[keys[k]] = int(seq[rule_keep[k]])
+
+                group_keep = np.minimum(group_keep, rule_keep)
+
+            keep = np.arange(len(grouped)) >= np.repeat(group_keep, sizes)
+            kept[order[keep]] = True
+
+        # data is in time order, so the carry is too
+        self.carry = data[kept]
+
+        return found
+
+
+def correlate_incidents_chunked(chunks, rules=None):
+
+    # Same incidents (and numbering) as correlate_incidents on the
+    # concatenated chunks, holding only recent events in memory (see
+    # ChunkedCorrelator).
+    correlator = ChunkedCorrelator(rules)
+    found = []
+
+    chunks = (c for c in chunks if len(c))
+    following = next(chunks, None)
+
+    while following is not None:
+        chunk = following
+        following = next(chunks, None)
+        found.extend(correlator.add(chunk, final=following is None))
+
+    return _number(found)
@@ -0,0 +1,262 @@
+import json
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Correlation rules are declared in JSON (or YAML, if PyYAML is installed):
+#
+#   {"rules": [{
+#       "id": "brute_force",
+#       "incident_type": "Brute Force",
+#       "window_minutes": 10,
+#       "group_by": "user",
+#       "when": ["count(is_failed) >= 10"],
+#       "mitre_tactics": ["Credential Access"]
+#   }]}
+#
+# Every condition is "<aggregate> <op> <number>" over the events of a window
+# anchored at each event ([t, t + window]). Aggregates:
+#   count()                  events in the window
+#   count(col)               events with a non-zero col
+#   count(col <op> value)    events matching a comparison (value may be 'text')
+#   sum(col), max(col), min(col)
+#
+# Rules sharing group_by and window are compiled into one group that is
+# evaluated in a single pass: the sort, window bounds and each distinct
+# aggregate are computed once and reused by every rule of the group.
+
+RULES_PATH = os.environ.get(
+    "AEGISIR_RULES_PATH", os.path.join(os.path.dirname(__file__), "rules.json")
+)
+
+_CONDITION = re.compile(
+    r"^\s*(count|sum|max|min)\(\s*(\w+)?\s*"
+    r"(?:(==|!=|>=|<=|>|<)\s*(-?\d+(?:\.\d+)?|'[^']*'))?\s*\)"
+    r"\s*(==|!=|>=|<=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$"
+)
+
+_OPERATORS = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    ">": np.greater,
+    "<": np.less
+}
+
+
+def _literal(text):
+    if text.startswith("'"):
+        return text[1:-1]
+    return float(text) if "." in text else int(text)
+
+
+def compile_condition(text):
+
+    # "count(data_volume_mb > 500) >= 1" ->
+    #     (("count", "data_volume_mb", ">", 500), ">=", 1)
+    match = _CONDITION.match(text)
+
+    if not match:
+        raise ValueError(f"Invalid rule condition: {text!r}")
+
+    func, column, op, value, compare, threshold = match.groups()
+
+    if column is None and func != "count":
+        raise ValueError(f"{func}() needs a column: {text!r}")
+
+    if column is None and op is not None:
+        raise ValueError(f"Invalid rule condition: {text!r}")
+
+    if op is not None and func != "count":
+        raise ValueError(f"Comparisons are only supported inside count(): {text!r}")
+
+    aggregate = (func, column, op, None if value is None else _literal(value))
+
+    return aggregate, compare, _literal(threshold)
+
+
+def compile_rule(spec, index):
+
+    if not isinstance(spec, dict) or not spec.get("id"):
+        raise ValueError(f"Rule #{index + 1} needs an id.")
+
+    rule_id = spec["id"]
+    conditions = spec.get("when")
+
+    if not isinstance(conditions, list) or not conditions:
+        raise ValueError(f"Rule {rule_id}: 'when' must be a non-empty list of conditions.")
+
+    window_minutes = spec.get("window_minutes", 30)
+
+    if not isinstance(window_minutes, (int, float)) or window_minutes <= 0:
+        raise ValueError(f"Rule {rule_id}: window_minutes must be a positive number.")
+
+    try:
+        compiled = [compile_condition(condition) for condition in conditions]
+    except ValueError as e:
+        raise ValueError(f"Rule {rule_id}: {e}")
+
+    return {
+        "index": index,
+        "id": rule_id,
+        "incident_type": spec.get("incident_type", rule_id),
+        "window": pd.Timedelta(minutes=window_minutes),
+        "group_by": spec.get("group_by", "user"),
+        "conditions": compiled,
+        "mitre_tactics": list(spec.get("mitre_tactics", []))
+    }
+
+
+class RuleSet:
+
+    # Compiled rules, grouped by (group_by, window) for shared evaluation
+
+    def __init__(self, specs, version=None):
+
+        enabled = [spec for spec in specs if spec.get("enabled", True)]
+        self.rules = [compile_rule(spec, index) for index, spec in enumerate(enabled)]
+        self.version = version
+
+        ids = [rule["id"] for rule in self.rules]
+        duplicates = sorted({i for i in ids if ids.count(i) > 1})
+
+        if duplicates:
+            raise ValueError(f"Duplicate rule ids: {', '.join(duplicates)}")
+
+        self.groups = {}
+        for rule in self.rules:
+            self.groups.setdefault((rule["group_by"], rule["window"]), []).append(rule)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def grouped_by(self, column):
+
+        # The rules that group events by one column (rule indexes kept), for
+        # a partition of the events by that column (core.parallel)
+        subset = RuleSet([], self.version)
+        subset.rules = [rule for rule in self.rules if rule["group_by"] == column]
+        subset.groups = {key: rules for key, rules in self.groups.items() if key[0] == column}
+
+        return subset
+
+    def group_columns(self):
+        return list(dict.fromkeys(rule["group_by"] for rule in self.rules))
+
+
+def load_rules(path=RULES_PATH):
+
+    with open(path, "r") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("PyYAML is required for YAML rule files.")
+            document = yaml.safe_load(f)
+        else:
+            document = json.load(f)
+
+    specs = document.get("rules") if isinstance(document, dict) else document
+
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected a list of rules.")
+
+    return RuleSet(specs, version=os.path.getmtime(path))
+
+
+_rules = {}
+_rules_lock = threading.Lock()
+
+
+def get_rules(path=RULES_PATH):
+
+    # Hot reload: the file is recompiled whenever its mtime changes, so rules
+    # can be edited without restarting the app.
+    mtime = os.path.getmtime(path)
+
+    with _rules_lock:
+        cached = _rules.get(path)
+
+        if cached is None or cached.version != mtime:
+            cached = _rules[path] = load_rules(path)
+
+    return cached
+
+
+# ----------------------------
+# Window aggregates
+# ----------------------------
+
+def _prefix_sums(values, lo, hi):
+
+    dtype = np.float64 if values.dtype.kind == "f" else np.int64
+
+    prefix = np.zeros(len(values) + 1, dtype=dtype)
+    np.cumsum(values, dtype=dtype, out=prefix[1:])
+
+    return prefix[hi] - prefix[lo]
+
+
+def _range_extreme(values, lo, hi, reduce):
+
+    # Sparse table: O(n log n) build, O(1) per window
+    levels = [values]
+    width = 1
+
+    while width * 2 <= len(values):
+        previous = levels[-1]
+        levels.append(reduce(previous[:-width], previous[width:]))
+        width *= 2
+
+    size = hi - lo
+    level = np.floor(np.log2(np.maximum(size, 1))).astype(np.int64)
+    span = np.left_shift(1, level)
+
+    result = np.empty(len(lo), dtype=values.dtype)
+
+    for k in np.unique(level):
+        rows = level == k
+        table = levels[k]
+        result[rows] = reduce(table[lo[rows]], table[hi[rows] - span[rows]])
+
+    return result
+
+
+def window_aggregate(df, lo, hi, aggregate):
+
+    func, column, op, value = aggregate
+
+    if column is None:
+        return hi - lo
+
+    if column not in df.columns:
+        raise ValueError(f"Unknown column in rule condition: {column}")
+
+    values = df[column].to_numpy()
+
+    if func == "count":
+        flags = _OPERATORS[op](values, value) if op is not None else values != 0
+        return _prefix_sums(flags.astype(np.int8), lo, hi)
+
+    if func == "sum":
+        return _prefix_sums(values, lo, hi)
+
+    return _range_extreme(values, lo, hi, np.maximum if func == "max" else np.minimum)
+
+
+def rule_matches(rule, df, lo, hi, aggregates):
+
+    # aggregates memoises window_aggregate across the rules of a group
+    matches = np.ones(len(lo), dtype=bool)
+
+    for aggregate, compare, threshold in rule["conditions"]:
+        if aggregate not in aggregates:
+            aggregates[aggregate] = window_aggregate(df, lo, hi, aggregate)
+
+        matches &= _OPERATORS[compare](aggregates[aggregate], threshold)
+
+    return matches
@@ -0,0 +1,89 @@
+import pandas as pd
+
+from correlation.engine import ChunkedCorrelator
+from preprocessing.feature_engineering import concat_events
+
+# How far behind the newest event another event may arrive and still be
+# correlated by RuleStreamCorrelator
+ALLOWED_LATENESS = pd.Timedelta(minutes=5)
+
+class RuleStreamCorrelator:
+
+    # Streaming counterpart of correlation.engine.correlate_incidents_chunked
+    # for the rules in correlation/rules.json: state carries across
+    # micro-batches (or single-event frames), bounded by the longest rule
+    # window. Batches go through the same carry logic as chunked scans, so
+    # every rule runs and overlapping windows merge as in a scan.
+    #
+    # An incident is emitted once the stream has moved a full window past its
+    # events, when no later event can extend it, or when flush() closes
+    # every open window. Events are held back until they are `lateness`
+    # older than the newest one seen, so slightly out-of-order batches are
+    # still put in time order; anything arriving after that is counted in
+    # `late_events` and ignored.
+
+    def __init__(self, rules=None, lateness=ALLOWED_LATENESS):
+        self.lateness = pd.Timedelta(lateness)
+        self.incident_counter = 1
+        self.late_events = 0
+        self._chunks = ChunkedCorrelator(rules)
+        self._held = None
+        self._released = None
+
+    def process_batch(self, df):
+
+        if df.empty:
+            return []
+
+        if self._released is not None:
+            late = (df["timestamp"] < self._released).to_numpy()
+            self.late_events += int(late.sum())
+            df = df[~late]
+
+        held = df if self._held is None else concat_events([self._held, df])
+
+        if held.empty:
+            return []
+
+        cutoff = held["timestamp"].max() - self.lateness
+        ready = (held["timestamp"] < cutoff).to_numpy()
+
+        self._held = held[~ready]
+
+        if not ready.any():
+            return []
+
+        self._released = cutoff
+
+        return self._number(self._chunks.add(held[ready]))
+
+    def flush(self):
+
+        # Treat every held and carried window as complete and emit what they
+        # form, e.g. before a quiet period or at shutdown. Windows still open
+        # are cut here: later events start new ones, and events older than
+        # the newest flushed one count as late.
+        held, self._held = self._held, None
+
+        found = self._chunks.add(held, final=True)
+
+        if self._chunks.latest is not None:
+            self._released = self._chunks.latest
+
+        return self._number(found)
+
+    def _number(self, found):
+
+        found.sort(key=lambda item: item[0])
+
+        incidents = []
+        for _, incident in found:
+            incident["incident_id"] = f"INC{self.incident_counter:03d}"
+            self.incident_counter += 1
+            incidents.append(incident)
+
+        return incidents
+
+    def tracked_events(self):
+        held = 0 if self._held is None else len(self._held)
+        return held + self._chunks.carried_events()
@@ -1,32 +1,167 @@
-from sklearn.ensemble import IsolationForest
+import os
+import datetime
 
-def train_anomaly_model(df):
+import joblib
+import numpy as np
+import pandas as pd
+
+from preprocessing.user_baselines import DEVIATION_COLUMNS
+
+# Bump when the feature set or the serialized bundle layout changes;
+# persisted models with another version are rejected.
+MODEL_VERSION = 1
+
+MODEL_PATH = os.environ.get("AEGISIR_MODEL_PATH", "models/anomaly_model.joblib")
+
+FEATURE_COLUMNS = [
+    "is_failed",
+    "is_unusual_ip",
+    "is_privilege_escalation",
+    "is_sensitive_access",
+    "data_volume_mb",
+    "hour"
+]
+
+# 🔎 Explainability Layer: indicator name -> typed feature column. The
+# per-event dicts are only built on demand (see risk_indicators).
+RISK_INDICATOR_COLUMNS = {
+    "failed_login": "is_failed",
+    "unusual_ip": "is_unusual_ip",
+    "privilege_escalation": "is_privilege_escalation",
+    "sensitive_access": "is_sensitive_access",
+    "data_volume_mb": "data_volume_mb",
+    "login_hour": "hour"
+}
+
+_model_cache = {}
 
-    feature_columns = [
-        "is_failed",
-        "is_unusual_ip",
-        "is_privilege_escalation",
-        "is_sensitive_access",
-        "data_volume_mb",
-        "hour"
-    ]
 
-    X = df[feature_columns]
+def model_features(df):
+
+    # Base features, plus the per-user deviation features when preprocessing
+    # joined a baseline index (preprocessing.user_baselines)
+    return FEATURE_COLUMNS + [column for column in DEVIATION_COLUMNS if column in df]
+
+
+def fit_anomaly_model(df, features=None):
+
+    # sklearn is imported on first use: entry points that never fit (the
+    # CLI with a trained model, the UI) start without paying for it
+    from sklearn.ensemble import IsolationForest
 
     model = IsolationForest(contamination=0.1, random_state=42)
-    model.fit(X)
-
-    df["anomaly_score"] = model.decision_function(X)
-    df["anomaly_flag"] = model.predict(X)
-
-    # 🔎 Explainability Layer
-    df["risk_indicators"] = df.apply(lambda row: {
-        "failed_login": int(row["is_failed"]),
-        "unusual_ip": int(row["is_unusual_ip"]),
-        "privilege_escalation": int(row["is_privilege_escalation"]),
-        "sensitive_access": int(row["is_sensitive_access"]),
-        "data_volume_mb": float(row["data_volume_mb"]),
-        "login_hour": int(row["hour"])
-    }, axis=1)
-
-    return df, model
+    model.fit(df[features or model_features(df)])
+
+    return model
+
+
+def save_anomaly_model(model, path=MODEL_PATH, training_rows=None, features=FEATURE_COLUMNS):
+
+    import sklearn
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    bundle = {
+        "version": MODEL_VERSION,
+        "features": list(features),
+        "sklearn_version": sklearn.__version__,
+        "trained_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "training_rows": training_rows,
+        "model": model
+    }
+
+    # Write then rename, so a running app never loads a partial file
+    joblib.dump(bundle, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    _model_cache.pop(path, None)
+
+    return path
+
+
+def load_anomaly_model(path=MODEL_PATH):
+
+    # Loaded once per file version, so a model retrained by another process
+    # (train_model.py) replaces the one in memory. None when no baseline
+    # model has been trained.
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _model_cache.get(path)
+
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    bundle = joblib.load(path)
+
+    if bundle.get("version") != MODEL_VERSION:
+        raise ValueError(
+            f"Anomaly model version {bundle.get('version')} is not supported "
+            f"(expected {MODEL_VERSION}). Retrain with train_model.py."
+        )
+
+    # The bundle records the features it was trained on; any subset of the
+    # ones the pipeline can produce is fine
+    features = bundle.get("features") or []
+
+    if features[:len(FEATURE_COLUMNS)] != FEATURE_COLUMNS or \
+            any(column not in DEVIATION_COLUMNS for column in features[len(FEATURE_COLUMNS):]):
+        raise ValueError("Anomaly model feature schema does not match the pipeline.")
+
+    _model_cache[path] = (stamp, bundle)
+
+    return bundle
+
+
+def score_anomalies(df, model, features=FEATURE_COLUMNS):
+
+    missing = [column for column in features if column not in df]
+
+    if missing:
+        raise ValueError(
+            "Anomaly model uses per-user baseline features; build the index "
+            "with train_model.py --baselines."
+        )
+
+    X = df[features]
+
+    # predict() is just decision_function() < 0, so score once
+    scores = model.decision_function(X)
+    df["anomaly_score"] = scores.astype(np.float32)
+    df["anomaly_flag"] = np.where(scores < 0, -1, 1).astype(np.int8)
+
+    return df
+
+
+def risk_indicators(df):
+
+    # Build the per-event indicator dicts for a (small) slice, e.g. the
+    # events of one incident window.
+    indicators = pd.DataFrame({
+        name: df[column].astype(float if name == "data_volume_mb" else int)
+        for name, column in RISK_INDICATOR_COLUMNS.items()
+    })
+
+    return indicators.to_dict("records")
+
+
+def train_anomaly_model(df):
+
+    # Fits on the batch itself; scores then depend on the rest of the batch.
+    features = model_features(df)
+    model = fit_anomaly_model(df, features)
+
+    return score_anomalies(df, model, features), model
+
+
+def detect_anomalies(df, path=MODEL_PATH):
+
+    bundle = load_anomaly_model(path)
+
+    # No baseline model yet: fall back to fitting on the batch
+    if bundle is None:
+        return train_anomaly_model(df)
+
+    return score_anomalies(df, bundle["model"], bundle["features"]), bundle["model"]
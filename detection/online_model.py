@@ -0,0 +1,176 @@
+import numpy as np
+
+from detection.anomaly_model import FEATURE_COLUMNS, model_features
+
+# Online variant of the baseline IsolationForest for continuous ingestion.
+# Events are scored by the current forest, then offered to a fixed-size
+# reservoir that favours recent traffic; every refit_every events the forest
+# is refitted on the reservoir. Scoring costs the same per event however
+# long the stream has run, memory is bounded by the reservoir, and the model
+# follows drift over roughly `horizon` events.
+
+# Size of one fitted tree, at most 2 * max_samples - 1 nodes of ~72 bytes
+_TREE_BYTES = (2 * 256 - 1) * 72
+
+
+class OnlineIsolationForest:
+
+    # Same interface as IsolationForest (fit / decision_function / predict,
+    # decision_function < 0 meaning anomalous) plus partial_fit.
+
+    def __init__(self, reservoir_size=10_000, horizon=100_000, refit_every=10_000,
+                 contamination=0.1, n_estimators=100, max_memory_mb=None, features=None,
+                 random_state=42):
+
+        self.features = list(features or FEATURE_COLUMNS)
+
+        if max_memory_mb is not None:
+            # Whatever the forest leaves of the budget goes to the reservoir
+            available = max_memory_mb * 1024 * 1024 - n_estimators * _TREE_BYTES
+            reservoir_size = max(256, int(available // (len(self.features) * 4)))
+
+        self.reservoir_size = reservoir_size
+        self.horizon = max(horizon, reservoir_size)
+        self.refit_every = refit_every
+        self.contamination = contamination
+        self.n_estimators = n_estimators
+        self.random_state = random_state
+
+        self.reset()
+
+    def reset(self):
+
+        self._rng = np.random.default_rng(self.random_state)
+        self._reservoir = np.empty((self.reservoir_size, len(self.features)), dtype=np.float32)
+        self._filled = 0
+        self._since_refit = 0
+        self.events_seen = 0
+        self.refits = 0
+        self.model_ = None
+
+        return self
+
+    def memory_bytes(self):
+        return self._reservoir.nbytes + self.n_estimators * _TREE_BYTES
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _features(self, X):
+        if hasattr(X, "loc"):
+            X = X[self.features]
+        return np.asarray(X, dtype=np.float32)
+
+    def _sample(self, X):
+
+        # Fill the reservoir, then admit each event with probability
+        # reservoir_size / horizon into a random slot: an event survives
+        # about `horizon` further events, so the sample tracks recent traffic
+        free = min(self.reservoir_size - self._filled, len(X))
+
+        self._reservoir[self._filled:self._filled + free] = X[:free]
+        self._filled += free
+
+        rest = X[free:]
+        admitted = rest[self._rng.random(len(rest)) < self.reservoir_size / self.horizon]
+        self._reservoir[self._rng.integers(0, self.reservoir_size, len(admitted))] = admitted
+
+    def _refit(self):
+
+        from sklearn.ensemble import IsolationForest
+
+        model = IsolationForest(
+            n_estimators=self.n_estimators,
+            contamination=self.contamination,
+            random_state=self.random_state
+        )
+        model.fit(self._reservoir[:self._filled])
+
+        self.model_ = model
+        self.refits += 1
+        self._since_refit = 0
+
+    def _decision(self, X):
+
+        # Warming up (nothing fitted yet): nothing is flagged
+        if self.model_ is None:
+            return np.zeros(len(X))
+
+        return self.model_.decision_function(X)
+
+    def _process(self, X, decision):
+
+        # In order, one refit period at a time, so every event is scored by
+        # the forest that was current at its arrival
+        X = self._features(X)
+        scores = np.zeros(len(X)) if decision else None
+        position = 0
+
+        while position < len(X):
+            end = min(position + self.refit_every - self._since_refit, len(X))
+            segment = X[position:end]
+
+            if decision:
+                scores[position:end] = self._decision(segment)
+
+            self._sample(segment)
+            self._since_refit += len(segment)
+            self.events_seen += len(segment)
+
+            if self._since_refit >= self.refit_every:
+                self._refit()
+
+            position = end
+
+        return scores
+
+    # ----------------------------
+    # Public interface
+    # ----------------------------
+
+    def partial_fit(self, X):
+        self._process(X, decision=False)
+        return self
+
+    def fit(self, X):
+
+        self.reset()
+        self._process(X, decision=False)
+
+        # Refit on whatever arrived since the last scheduled refit
+        if self._since_refit and self._filled:
+            self._refit()
+
+        return self
+
+    def decision_function(self, X):
+        return self._decision(self._features(X))
+
+    def predict(self, X):
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+    def score_partial_fit(self, X):
+
+        # Prequential use on a stream: decision values for X, then learn X
+        return self._process(X, decision=True)
+
+
+def fit_online_model(df, **params):
+    features = params.pop("features", None) or model_features(df)
+    return OnlineIsolationForest(features=features, **params).fit(df[features])
+
+
+def detect_anomalies_online(df, model):
+
+    # Same columns as detection.anomaly_model.detect_anomalies; events are
+    # scored and then learned in time order, so the model keeps adapting.
+    order = np.argsort(df["timestamp"].to_numpy(), kind="stable")
+
+    scores = np.empty(len(df))
+    scores[order] = model.score_partial_fit(df[model.features].iloc[order])
+
+    df["anomaly_score"] = scores.astype(np.float32)
+    df["anomaly_flag"] = np.where(scores < 0, -1, 1).astype(np.int8)
+
+    return df, model
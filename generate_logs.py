@@ -1,129 +1,242 @@
+import argparse
 import json
+import os
 import random
 from datetime import datetime, timedelta
 
+# Defaults match the size of the original dataset: 100 normal events spread
+# over 5 users in a 300 minute span, plus one injected attack. Unlike the
+# original, timestamps fall on any second of the span and the attack starts
+# in its middle rather than 400 minutes in.
+DEFAULT_USERS = 5
+DEFAULT_EVENTS_PER_USER = 20
+DEFAULT_ATTACKS = 1
+DEFAULT_SPAN_MINUTES = 300
+
+# Start of the span for seeded runs without an explicit start, so that
+# --seed alone gives the same files on every run
+SEEDED_BASE_TIME = datetime(2026, 1, 5)
+
+LOG_FILES = {
+    "auth": "auth_logs.json",
+    "endpoint": "endpoint_logs.json",
+    "network": "network_logs.json"
+}
+
 # --------------------------
 # Helper Functions
 # --------------------------
 
-def random_timestamp(start_time, minutes_range=300):
-    return start_time + timedelta(minutes=random.randint(0, minutes_range))
+def random_timestamp(rng, start_time, minutes_range=DEFAULT_SPAN_MINUTES):
+    return start_time + timedelta(seconds=rng.randint(0, minutes_range * 60))
 
-def generate_ip(normal=True):
+def generate_ip(rng, normal=True):
     if normal:
-        return f"192.168.1.{random.randint(2, 50)}"
+        return f"192.168.1.{rng.randint(2, 50)}"
     else:
-        return f"203.45.{random.randint(10, 99)}.{random.randint(1, 254)}"
+        return f"203.45.{rng.randint(10, 99)}.{rng.randint(1, 254)}"
 
 # --------------------------
-# Log Containers
+# Normal Activity
 # --------------------------
 
-auth_logs = []
-endpoint_logs = []
-network_logs = []
-
-base_time = datetime.now()
+def iter_normal_events(rng, users, events, base_time, span_minutes):
+
+    # One event = one record per source, as in the original generator
+    for _ in range(events):
+        timestamp = random_timestamp(rng, base_time, span_minutes).isoformat()
+        user = f"user_{rng.randint(1, users)}"
+
+        yield "auth", {
+            "timestamp": timestamp,
+            "user": user,
+            "event_type": "login_attempt",
+            "status": "success",
+            "ip": generate_ip(rng, normal=True)
+        }
+
+        yield "endpoint", {
+            "timestamp": timestamp,
+            "user": user,
+            "event_type": "file_access",
+            "asset": "server_A",
+            "sensitive_access": False
+        }
+
+        yield "network", {
+            "timestamp": timestamp,
+            "user": user,
+            "event_type": "data_transfer",
+            "destination_ip": generate_ip(rng, normal=True),
+            "data_volume_mb": rng.randint(1, 50)
+        }
 
 # --------------------------
-# 1️⃣ Generate Normal Logs
+# Attack Scenario
 # --------------------------
 
-for i in range(100):
-    timestamp = random_timestamp(base_time)
-    user = f"user_{random.randint(1,5)}"
+def iter_attack_events(rng, attacker_user, attack_start):
+
+    def at(minutes):
+        return (attack_start + timedelta(minutes=minutes)).isoformat()
 
-    # Auth logs
-    auth_logs.append({
-        "timestamp": timestamp.isoformat(),
-        "user": user,
+    # Failed login attempts
+    for i in range(6):
+        yield "auth", {
+            "timestamp": at(i),
+            "user": attacker_user,
+            "event_type": "login_attempt",
+            "status": "failed",
+            "ip": generate_ip(rng, normal=False)
+        }
+
+    # Successful unusual login
+    yield "auth", {
+        "timestamp": at(7),
+        "user": attacker_user,
         "event_type": "login_attempt",
         "status": "success",
-        "ip": generate_ip(normal=True)
-    })
+        "ip": generate_ip(rng, normal=False)
+    }
 
-    # Endpoint logs
-    endpoint_logs.append({
-        "timestamp": timestamp.isoformat(),
-        "user": user,
+    # Privilege escalation
+    yield "endpoint", {
+        "timestamp": at(10),
+        "user": attacker_user,
+        "event_type": "privilege_escalation",
+        "asset": "server_A",
+        "sensitive_access": True
+    }
+
+    # Sensitive file access
+    yield "endpoint", {
+        "timestamp": at(12),
+        "user": attacker_user,
         "event_type": "file_access",
         "asset": "server_A",
-        "sensitive_access": False
-    })
+        "sensitive_access": True
+    }
 
-    # Network logs
-    network_logs.append({
-        "timestamp": timestamp.isoformat(),
-        "user": user,
+    # Large data transfer
+    yield "network", {
+        "timestamp": at(15),
+        "user": attacker_user,
         "event_type": "data_transfer",
-        "destination_ip": generate_ip(normal=True),
-        "data_volume_mb": random.randint(1, 50)
-    })
+        "destination_ip": generate_ip(rng, normal=False),
+        "data_volume_mb": 850
+    }
 
 # --------------------------
-# 2️⃣ Inject Attack Scenario
+# Public API
 # --------------------------
 
-attacker_user = "user_3"
-attack_start = base_time + timedelta(minutes=400)
+def iter_logs(users=DEFAULT_USERS, events_per_user=DEFAULT_EVENTS_PER_USER,
+              attacks=DEFAULT_ATTACKS, span_minutes=DEFAULT_SPAN_MINUTES,
+              seed=None, base_time=None):
 
-# Failed login attempts
-for i in range(6):
-    auth_logs.append({
-        "timestamp": (attack_start + timedelta(minutes=i)).isoformat(),
-        "user": attacker_user,
-        "event_type": "login_attempt",
-        "status": "failed",
-        "ip": generate_ip(normal=False)
-    })
-
-# Successful unusual login
-auth_logs.append({
-    "timestamp": (attack_start + timedelta(minutes=7)).isoformat(),
-    "user": attacker_user,
-    "event_type": "login_attempt",
-    "status": "success",
-    "ip": generate_ip(normal=False)
-})
-
-# Privilege escalation
-endpoint_logs.append({
-    "timestamp": (attack_start + timedelta(minutes=10)).isoformat(),
-    "user": attacker_user,
-    "event_type": "privilege_escalation",
-    "asset": "server_A",
-    "sensitive_access": True
-})
-
-# Sensitive file access
-endpoint_logs.append({
-    "timestamp": (attack_start + timedelta(minutes=12)).isoformat(),
-    "user": attacker_user,
-    "event_type": "file_access",
-    "asset": "server_A",
-    "sensitive_access": True
-})
-
-# Large data transfer
-network_logs.append({
-    "timestamp": (attack_start + timedelta(minutes=15)).isoformat(),
-    "user": attacker_user,
-    "event_type": "data_transfer",
-    "destination_ip": generate_ip(normal=False),
-    "data_volume_mb": 850
-})
+    # Yields (source, record) pairs lazily, so datasets far larger than
+    # memory can be streamed to disk or straight into the pipeline.
+    rng = random.Random(seed)
 
-# --------------------------
-# 3️⃣ Save to JSON
-# --------------------------
+    if base_time is None:
+        base_time = SEEDED_BASE_TIME if seed is not None else datetime.now()
+
+    yield from iter_normal_events(rng, users, users * events_per_user, base_time, span_minutes)
+
+    # Attacks are spread evenly through the span and rotate over the users,
+    # starting with user_3 as in the original scenario.
+    for i in range(attacks):
+        attacker_user = f"user_{(i + 2) % users + 1}"
+        attack_start = base_time + timedelta(minutes=span_minutes * (i + 1) / (attacks + 1))
+
+        yield from iter_attack_events(rng, attacker_user, attack_start)
+
+
+def generate_logs(**params):
+
+    # In-memory variant: returns (auth_logs, endpoint_logs, network_logs)
+    logs = {source: [] for source in LOG_FILES}
+
+    for source, record in iter_logs(**params):
+        logs[source].append(record)
+
+    return logs["auth"], logs["endpoint"], logs["network"]
+
+
+def write_logs(directory=".", fmt="json", indent=None, **params):
+
+    # Streams every source to its own file. "json" writes one array per file
+    # (indent=4 matches the original output); "jsonl" writes one record per line.
+    paths = {}
+    files = {}
+    counts = {source: 0 for source in LOG_FILES}
+
+    os.makedirs(directory, exist_ok=True)
+
+    for source, name in LOG_FILES.items():
+        if fmt == "jsonl":
+            name = name[:-len(".json")] + ".jsonl"
+        paths[source] = os.path.join(directory, name)
+        files[source] = open(paths[source], "w")
+
+    try:
+        for source, record in iter_logs(**params):
+            f = files[source]
+
+            if fmt == "jsonl":
+                f.write(json.dumps(record) + "\n")
+            else:
+                text = json.dumps(record, indent=indent)
+                if indent is not None:
+                    text = "\n".join(" " * indent + line for line in text.splitlines())
+                    f.write(("[\n" if counts[source] == 0 else ",\n") + text)
+                else:
+                    f.write(("[" if counts[source] == 0 else ", ") + text)
+
+            counts[source] += 1
+
+        for source, f in files.items():
+            if fmt != "jsonl":
+                if counts[source] == 0:
+                    f.write("[")
+                f.write("\n]" if indent is not None and counts[source] else "]")
+
+    finally:
+        for f in files.values():
+            f.close()
+
+    return paths
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Generate synthetic AegisIR log files.")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS)
+    parser.add_argument("--events-per-user", type=int, default=DEFAULT_EVENTS_PER_USER)
+    parser.add_argument("--attacks", type=int, default=DEFAULT_ATTACKS)
+    parser.add_argument("--span-minutes", type=int, default=DEFAULT_SPAN_MINUTES)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None,
+                        help="ISO timestamp the span starts at (default: now, "
+                             f"or {SEEDED_BASE_TIME.isoformat()} with --seed)")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json")
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args(argv)
 
-with open("auth_logs.json", "w") as f:
-    json.dump(auth_logs, f, indent=4)
+    write_logs(
+        args.output_dir,
+        fmt=args.format,
+        indent=4 if args.format == "json" else None,
+        users=args.users,
+        events_per_user=args.events_per_user,
+        attacks=args.attacks,
+        span_minutes=args.span_minutes,
+        seed=args.seed,
+        base_time=args.start
+    )
 
-with open("endpoint_logs.json", "w") as f:
-    json.dump(endpoint_logs, f, indent=4)
+    print("Logs generated successfully.")
 
-with open("network_logs.json", "w") as f:
-    json.dump(network_logs, f, indent=4)
 
-print("Logs generated successfully.")
+if __name__ == "__main__":
+    main()
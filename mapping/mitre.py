@@ -1,5 +1,9 @@
 def map_to_mitre(incident):
 
+    # Rule-based incidents carry their tactics (correlation/rules.json)
+    if incident.get("mitre_tactics"):
+        return list(incident["mitre_tactics"])
+
     mapping = []
 
     if "Account Compromise" in incident["incident_type"]:
@@ -1,47 +1,213 @@
+import numpy as np
 import pandas as pd
 
-def preprocess_logs(auth_logs, endpoint_logs, network_logs):
-
-    all_records = []
-
-    for log in auth_logs:
-        all_records.append({
-            "timestamp": log["timestamp"],
-            "user": log["user"],
-            "log_source": "auth",
-            "is_failed": 1 if log.get("status") == "failed" else 0,
-            "is_unusual_ip": 0 if log.get("ip", "").startswith("192.168") else 1,
-            "is_privilege_escalation": 0,
-            "is_sensitive_access": 0,
-            "data_volume_mb": 0
-        })
-
-    for log in endpoint_logs:
-        all_records.append({
-            "timestamp": log["timestamp"],
-            "user": log["user"],
-            "log_source": "endpoint",
-            "is_failed": 0,
-            "is_unusual_ip": 0,
-            "is_privilege_escalation": 1 if log.get("event_type") == "privilege_escalation" else 0,
-            "is_sensitive_access": 1 if log.get("sensitive_access") else 0,
-            "data_volume_mb": 0
-        })
-
-    for log in network_logs:
-        all_records.append({
-            "timestamp": log["timestamp"],
-            "user": log["user"],
-            "log_source": "network",
-            "is_failed": 0,
-            "is_unusual_ip": 0,
-            "is_privilege_escalation": 0,
-            "is_sensitive_access": 0,
-            "data_volume_mb": log.get("data_volume_mb", 0)
-        })
-
-    df = pd.DataFrame(all_records)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df["hour"] = df["timestamp"].dt.hour
-
-    return df
\ No newline at end of file
+from security.validator import LOG_VALIDATORS, ValidationReport
+from preprocessing.user_baselines import add_deviation_features
+
+LOG_SOURCES = ["auth", "endpoint", "network"]
+
+# Timestamps are produced with datetime.isoformat(); parsed in one bulk call
+TIMESTAMP_FORMAT = "ISO8601"
+
+INTERNAL_IP_PREFIX = "192.168"
+
+# ----------------------------
+# Event schema
+# ----------------------------
+
+# Dtype of every column the pipeline frame may carry, from preprocessing
+# through scoring and correlation: codes for strings, int8 flags, 32-bit
+# numbers and no per-row Python objects (~29 bytes per scored event).
+# Timestamps stay the datetime64 column pd.to_datetime produces. Transfer
+# volumes stay float64: rules compare them against exact thresholds
+# (data_volume_mb > 500), which float32 rounding would move.
+EVENT_SCHEMA = {
+    "user": "category",
+    "log_source": "category",
+    "is_failed": np.int8,
+    "is_unusual_ip": np.int8,
+    "is_privilege_escalation": np.int8,
+    "is_sensitive_access": np.int8,
+    "data_volume_mb": np.float64,
+    "hour": np.uint8,
+    # preprocessing.user_baselines
+    "ip": "category",
+    "is_new_ip": np.int8,
+    "volume_zscore": np.float32,
+    "is_off_hours": np.int8,
+    # detection
+    "anomaly_score": np.float32,
+    "anomaly_flag": np.int8,
+    # core.parallel
+    "seq": np.int64
+}
+
+
+def enforce_event_schema(df):
+
+    # Cast schema columns that drifted (a no-op when they already match) and
+    # refuse per-row object columns, which cost tens of bytes per event.
+    for column in df.columns:
+        dtype = EVENT_SCHEMA.get(column)
+
+        if dtype is None:
+            if df[column].dtype == object:
+                raise ValueError(f"Object column {column!r} is not allowed in the event frame.")
+            continue
+
+        if df[column].dtype != dtype:
+            df[column] = df[column].astype(dtype)
+
+    return df
+
+
+def concat_events(frames):
+
+    # pd.concat turns categoricals with different categories into object
+    # columns; give every frame the union of the categories first so the
+    # result keeps compact codes.
+    frames = list(frames)
+
+    categorical = [
+        column for column in frames[0].columns
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype)
+    ]
+
+    for column in categorical:
+        categories = frames[0][column].cat.categories
+        for frame in frames[1:]:
+            categories = categories.union(frame[column].cat.categories)
+
+        if all(frame[column].cat.categories.equals(categories) for frame in frames):
+            continue
+
+        frames = [
+            frame.assign(**{column: frame[column].cat.set_categories(categories)})
+            for frame in frames
+        ]
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def _collect(logs, source, fields, report):
+
+    # Single pass over the records: validate against the source schema and
+    # keep only the raw fields we need. Bad records are reported and skipped.
+    check = LOG_VALIDATORS[source]
+
+    columns = {field: [] for field in ("timestamp", "user") + fields}
+    appends = [(field, columns[field].append) for field in columns]
+
+    index = -1
+
+    for index, log in enumerate(logs):
+        error = check(log)
+
+        if error is not None:
+            report.reject(source, index, error)
+            continue
+
+        for field, append in appends:
+            append(log.get(field))
+
+    report.count(source, index + 1)
+
+    return columns
+
+
+def _auth_features(logs, report):
+
+    columns = _collect(logs, "auth", ("status", "ip"), report)
+
+    ips = np.asarray(
+        [ip if isinstance(ip, str) else "" for ip in columns.pop("ip")], dtype=str
+    )
+
+    columns["is_failed"] = np.asarray(columns.pop("status"), dtype=object) == "failed"
+    columns["is_unusual_ip"] = ~np.char.startswith(ips, INTERNAL_IP_PREFIX)
+    columns["ip"] = ips
+
+    return columns
+
+
+def _endpoint_features(logs, report):
+
+    columns = _collect(logs, "endpoint", ("event_type", "sensitive_access"), report)
+
+    event_types = np.asarray(columns.pop("event_type"), dtype=object)
+    sensitive = np.asarray(columns.pop("sensitive_access"), dtype=object)
+
+    columns["is_privilege_escalation"] = event_types == "privilege_escalation"
+    columns["is_sensitive_access"] = sensitive.astype(bool)
+
+    return columns
+
+
+def _network_features(logs, report):
+
+    columns = _collect(logs, "network", ("data_volume_mb",), report)
+
+    volumes = [0 if v is None else v for v in columns.pop("data_volume_mb")]
+    columns["data_volume_mb"] = np.asarray(volumes, dtype=np.float64)
+
+    return columns
+
+
+def preprocess_logs(auth_logs, endpoint_logs, network_logs, report=None, baselines=None):
+
+    if report is None:
+        report = ValidationReport()
+
+    sources = [
+        _auth_features(auth_logs, report),
+        _endpoint_features(endpoint_logs, report),
+        _network_features(network_logs, report)
+    ]
+
+    sizes = [len(source["timestamp"]) for source in sources]
+
+    def column(name, dtype):
+        return np.concatenate([
+            np.asarray(source[name], dtype=dtype) if name in source
+            else np.zeros(size, dtype=dtype)
+            for source, size in zip(sources, sizes)
+        ])
+
+    timestamps = [t for source in sources for t in source["timestamp"]]
+    users = [u for source in sources for u in source["user"]]
+
+    df = pd.DataFrame({
+        "timestamp": pd.to_datetime(timestamps, format=TIMESTAMP_FORMAT, errors="coerce"),
+        "user": pd.Categorical(users),
+        "log_source": pd.Categorical.from_codes(
+            np.repeat(np.arange(len(LOG_SOURCES), dtype=np.int8), sizes),
+            categories=LOG_SOURCES
+        ),
+        "is_failed": column("is_failed", np.int8),
+        "is_unusual_ip": column("is_unusual_ip", np.int8),
+        "is_privilege_escalation": column("is_privilege_escalation", np.int8),
+        "is_sensitive_access": column("is_sensitive_access", np.int8),
+        "data_volume_mb": column("data_volume_mb", np.float64)
+    })
+
+    unparsed = df["timestamp"].isna().to_numpy()
+
+    if unparsed.any():
+        for position in np.flatnonzero(unparsed):
+            report.reject(str(df["log_source"].iat[position]), None, "Invalid timestamp.")
+
+        df = df[~unparsed].reset_index(drop=True)
+
+    df["hour"] = df["timestamp"].dt.hour.astype(np.uint8)
+
+    # Per-user deviation features (preprocessing.user_baselines); the auth
+    # IPs are kept so the index can be updated from this batch afterwards.
+    if baselines is not None:
+        ips = np.full(len(unparsed), None, dtype=object)
+        ips[:sizes[0]] = sources[0]["ip"]
+        ips[ips == ""] = None
+
+        df["ip"] = pd.Categorical(ips[~unparsed])
+        add_deviation_features(df, baselines)
+
+    return enforce_event_schema(df)
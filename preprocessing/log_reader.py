@@ -0,0 +1,147 @@
+import codecs
+import json
+import re
+
+# Bytes read per call; memory use depends on this, not on the file size
+CHUNK_SIZE = 1024 * 1024
+
+# A single record larger than this is treated as malformed input
+MAX_RECORD_CHARS = 16 * 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+_logs_wrapper = re.compile(r'\{\s*"logs"\s*:\s*(?=\[)')
+
+
+class _TextWindow:
+
+    # Sliding window of decoded text over a binary or text file object
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = None
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+
+        chunk = self.file.read(self.chunk_size)
+
+        if not chunk:
+            self.eof = True
+
+        # Bytes may split a multi-byte character across chunks
+        if isinstance(chunk, bytes):
+            if self.decoder is None:
+                self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+            chunk = self.decoder.decode(chunk, final=self.eof)
+
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+
+        if len(self.text) > MAX_RECORD_CHARS + self.chunk_size:
+            raise ValueError("Log record too large or malformed JSON.")
+
+    def ensure(self, n_chars):
+        while len(self.text) - self.pos < n_chars and not self.eof:
+            self.fill()
+
+    def peek(self):
+
+        while True:
+            self.pos = _whitespace.match(self.text, self.pos).end()
+
+            if self.pos < len(self.text) or self.eof:
+                return self.text[self.pos:self.pos + 1]
+
+            self.fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Malformed JSON: expected '{char}'.")
+        self.pos += 1
+
+    def decode(self):
+
+        self.peek()
+
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise ValueError("Malformed JSON in log file.")
+                self.fill()
+                continue
+
+            # A number at the end of the window may continue in the next chunk
+            if end == len(self.text) and not self.eof:
+                self.fill()
+                continue
+
+            self.pos = end
+            return value
+
+
+def _iter_array(window):
+
+    window.expect("[")
+
+    if window.peek() == "]":
+        window.pos += 1
+        return
+
+    while True:
+        yield window.decode()
+
+        separator = window.peek()
+        window.pos += 1
+
+        if separator == "]":
+            return
+
+        if separator != ",":
+            raise ValueError("Malformed JSON: expected ',' or ']'.")
+
+
+def iter_log_records(file, chunk_size=CHUNK_SIZE):
+
+    # Yields records from a JSON array, a {"logs": [...]} wrapper or JSON
+    # Lines, reading the file object incrementally.
+    window = _TextWindow(file, chunk_size)
+
+    first = window.peek()
+
+    if first == "":
+        raise ValueError("Log file is empty.")
+
+    if first == "[":
+        yield from _iter_array(window)
+        return
+
+    window.ensure(256)
+    wrapper = _logs_wrapper.match(window.text, window.pos)
+
+    if wrapper:
+        window.pos = wrapper.end()
+        yield from _iter_array(window)
+        return
+
+    # JSON Lines (or concatenated objects)
+    while window.peek() != "":
+        record = window.decode()
+
+        # {"logs": [...]} whose "logs" key is not first: not streamed
+        if isinstance(record, dict) and isinstance(record.get("logs"), list):
+            yield from record["logs"]
+        else:
+            yield record
+
+
+def stream_logs(file, chunk_size=CHUNK_SIZE):
+
+    # Parsed records, ready for preprocess_logs (which validates them
+    # against the per-source schema in the same pass)
+    return iter_log_records(file, chunk_size)
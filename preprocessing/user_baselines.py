@@ -0,0 +1,379 @@
+import datetime
+import os
+import threading
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks (Windows): fold_baselines only serialises threads
+    fcntl = None
+
+# Per-user behavioural baselines: the IPs a user logs in from, the hours
+# they are active and their typical transfer volume. The index is persisted
+# between scans and updated incrementally from each batch, so preprocessing
+# can turn raw events into deviations from the user's own history:
+#
+#   is_new_ip      auth event from an IP never seen for this user
+#   volume_zscore  transfer volume vs the user's mean / std
+#   is_off_hours   event in an hour the user is rarely active
+#
+# Joining a batch costs a hash lookup per distinct user (and user/IP pair)
+# plus vectorised array indexing per event, however long the history.
+
+BASELINES_VERSION = 1
+
+BASELINES_PATH = os.environ.get("AEGISIR_BASELINES_PATH", "models/user_baselines.joblib")
+
+DEVIATION_COLUMNS = ["is_new_ip", "volume_zscore", "is_off_hours"]
+
+# Events (or transfers) a user needs before hour / volume deviations count
+MIN_HISTORY = 20
+
+# Hours holding less than this share of a user's activity are off-hours
+OFF_HOURS_SHARE = 0.02
+
+# Floor on the volume std, so near-constant users don't give huge z-scores
+MIN_VOLUME_STD = 1.0
+
+# Slice size when building an index from training logs (build_baselines)
+BUILD_PERIOD = pd.Timedelta(hours=1)
+
+# Digests of the scans folded into the index that are remembered, so
+# scanning the same export again does not count its events twice
+MAX_FOLDED_SCANS = 10_000
+
+# Event columns a scan digest covers (those present in the frame)
+DIGEST_COLUMNS = [
+    "timestamp", "user", "log_source", "ip", "is_failed", "is_unusual_ip",
+    "is_privilege_escalation", "is_sensitive_access", "data_volume_mb"
+]
+
+
+class UserBaselines:
+
+    def __init__(self):
+        self.users = {}
+        self.hours = np.zeros((0, 24), dtype=np.int64)
+        # Transfers per user: count, mean, sum of squared deviations
+        self.volume = np.zeros((0, 3), dtype=np.float64)
+        self.ips = {}
+
+    def __len__(self):
+        return len(self.users)
+
+    def _rows(self, users, create=False):
+
+        # Index row of every event's user (-1 when unknown)
+        codes, uniques = pd.factorize(users)
+        rows = np.empty(len(uniques) + 1, dtype=np.int64)
+        rows[-1] = -1
+
+        for code, user in enumerate(uniques):
+            user = str(user)
+            if user not in self.users and create:
+                self.users[user] = len(self.users)
+            rows[code] = self.users.get(user, -1)
+
+        grow = len(self.users) - len(self.hours)
+        if grow:
+            self.hours = np.vstack([self.hours, np.zeros((grow, 24), dtype=np.int64)])
+            self.volume = np.vstack([self.volume, np.zeros((grow, 3))])
+
+        # factorize marks missing users as -1, which picks rows[-1]
+        return rows[codes]
+
+    def _user_ips(self, df):
+
+        # Distinct (user, ip) pairs of the auth events, and each event's pair
+        is_auth = (df["log_source"] == "auth").to_numpy() & df["ip"].notna().to_numpy()
+        user_codes, users = pd.factorize(df["user"])
+        ip_codes, ips = pd.factorize(df["ip"])
+
+        width = max(len(ips), 1)
+        pairs = user_codes[is_auth].astype(np.int64) * width + ip_codes[is_auth]
+        unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+
+        keys = [(str(users[p // width]), str(ips[p % width])) for p in unique_pairs]
+
+        return is_auth, keys, inverse
+
+    def join(self, df):
+
+        # Deviation features of df against the history before df
+        n = len(df)
+        rows = self._rows(df["user"]) if n else np.empty(0, dtype=np.int64)
+        known = rows >= 0
+        safe = np.where(known, rows, 0)
+
+        features = {
+            "is_new_ip": np.zeros(n, dtype=np.int8),
+            "volume_zscore": np.zeros(n, dtype=np.float32),
+            "is_off_hours": np.zeros(n, dtype=np.int8)
+        }
+
+        if "ip" in df:
+            is_auth, keys, inverse = self._user_ips(df)
+            seen = np.array([ip in self.ips.get(user, ()) for user, ip in keys], dtype=bool)
+            if len(keys):
+                features["is_new_ip"][is_auth] = ~seen[inverse]
+
+        if not len(self.users) or not known.any():
+            return features
+
+        hours = df["hour"].to_numpy()
+        totals = self.hours.sum(axis=1)[safe]
+        share = self.hours[safe, hours] / np.maximum(totals, 1)
+        features["is_off_hours"] = (
+            known & (totals >= MIN_HISTORY) & (share < OFF_HOURS_SHARE)
+        ).astype(np.int8)
+
+        count, mean, m2 = self.volume[safe].T
+        std = np.maximum(np.sqrt(m2 / np.maximum(count - 1, 1)), MIN_VOLUME_STD)
+        network = (df["log_source"] == "network").to_numpy()
+        volumes = df["data_volume_mb"].to_numpy(dtype=np.float64)
+
+        features["volume_zscore"] = np.where(
+            network & known & (count >= MIN_HISTORY), (volumes - mean) / std, 0
+        ).astype(np.float32)
+
+        return features
+
+    def update(self, df):
+
+        # Fold df into the history; expects the user, log_source, hour,
+        # data_volume_mb and (for IPs) ip columns of preprocess_logs
+        if df.empty:
+            return self
+
+        rows = self._rows(df["user"], create=True)
+        valid = rows >= 0
+        np.add.at(self.hours, (rows[valid], df["hour"].to_numpy()[valid]), 1)
+
+        network = valid & (df["log_source"] == "network").to_numpy()
+        self._merge_volume(rows[network], df["data_volume_mb"].to_numpy(dtype=np.float64)[network])
+
+        if "ip" in df:
+            _, keys, _ = self._user_ips(df)
+            for user, ip in keys:
+                self.ips.setdefault(user, set()).add(ip)
+
+        return self
+
+    def _merge_volume(self, rows, volumes):
+
+        # Chan et al. parallel update of count / mean / M2 per user
+        n = len(self.users)
+        count_b = np.bincount(rows, minlength=n).astype(np.float64)
+        touched = count_b > 0
+
+        if not touched.any():
+            return
+
+        mean_b = np.zeros(n)
+        mean_b[touched] = np.bincount(rows, weights=volumes, minlength=n)[touched] / count_b[touched]
+        m2_b = np.bincount(rows, weights=(volumes - mean_b[rows]) ** 2, minlength=n)
+
+        count_a, mean_a, m2_a = self.volume.T.copy()
+        count = count_a + count_b
+        delta = mean_b - mean_a
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(touched, mean_a + delta * count_b / count, mean_a)
+            m2 = np.where(touched, m2_a + m2_b + delta ** 2 * count_a * count_b / count, m2_a)
+
+        self.volume = np.column_stack([count, mean, m2])
+
+    def merge(self, other):
+
+        # Fold another index (e.g. one built by a parallel worker) into this one
+        if not len(other):
+            return self
+
+        names = list(other.users)
+        rows = self._rows(pd.Index(names), create=True)
+        order = np.array([other.users[name] for name in names], dtype=np.int64)
+
+        self.hours[rows] += other.hours[order]
+
+        count_b, mean_b, m2_b = other.volume[order].T
+        count_a, mean_a, m2_a = self.volume[rows].T
+        count = count_a + count_b
+        delta = mean_b - mean_a
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.where(count > 0, count_b / count, 0)
+            self.volume[rows] = np.column_stack([
+                count,
+                mean_a + delta * ratio,
+                m2_a + m2_b + delta ** 2 * count_a * ratio
+            ])
+
+        for user, ips in other.ips.items():
+            self.ips.setdefault(user, set()).update(ips)
+
+        return self
+
+
+def add_deviation_features(df, baselines):
+    for column, values in baselines.join(df).items():
+        df[column] = values
+    return df
+
+
+def build_baselines(df, period=BUILD_PERIOD):
+
+    # Index for a training set (preprocessed with an empty UserBaselines, so
+    # the ip column is kept). Each time slice is joined against the history
+    # before it and then folded in, so the deviation features vary across
+    # the training set the way they will at scan time.
+    df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+    baselines = UserBaselines()
+
+    buckets = df["timestamp"].dt.floor(period).to_numpy()
+    bounds = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1], True])
+
+    features = {column: df[column].to_numpy().copy() for column in DEVIATION_COLUMNS}
+
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        chunk = df.iloc[a:b]
+
+        for column, values in baselines.join(chunk).items():
+            features[column][a:b] = values
+
+        baselines.update(chunk)
+
+    for column, values in features.items():
+        df[column] = values
+
+    return df, baselines
+
+
+def events_digest(df):
+
+    # Fingerprint of a scan's events as (rows, sum of row hashes mod 2**64).
+    # Row order does not matter, so the digests of a scan's parts (the
+    # splits of core.parallel) add up to the digest of the whole scan.
+    columns = [column for column in DIGEST_COLUMNS if column in df]
+    hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+    return len(df), int(hashes.sum(dtype=np.uint64))
+
+
+def combine_digests(digests):
+    digests = list(digests)
+    return sum(rows for rows, _ in digests), sum(total for _, total in digests) % 2 ** 64
+
+
+# ----------------------------
+# Persistence
+# ----------------------------
+
+_baselines_lock = threading.Lock()
+
+# Serialises load-merge-save in fold_baselines across scan threads; the
+# file lock (_locked) does the same across processes (app and core.cli)
+_fold_lock = threading.Lock()
+
+
+@contextmanager
+def _locked(path):
+
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def save_baselines(baselines, path=BASELINES_PATH, folded_scans=()):
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    bundle = {
+        "version": BASELINES_VERSION,
+        "updated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "users": len(baselines),
+        "baselines": baselines,
+        "folded_scans": list(folded_scans)[-MAX_FOLDED_SCANS:]
+    }
+
+    # Write then rename, so a concurrent scan never reads a partial file
+    with _baselines_lock:
+        joblib.dump(bundle, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    return path
+
+
+def _load_bundle(path):
+
+    if not os.path.exists(path):
+        return None
+
+    with _baselines_lock:
+        bundle = joblib.load(path)
+
+    if bundle.get("version") != BASELINES_VERSION:
+        raise ValueError(
+            f"User baselines version {bundle.get('version')} is not supported "
+            f"(expected {BASELINES_VERSION}). Rebuild with train_model.py --baselines."
+        )
+
+    return bundle
+
+
+def load_baselines(path=BASELINES_PATH):
+
+    # None when no index has been built yet (deviation features are off)
+    bundle = _load_bundle(path)
+
+    return None if bundle is None else bundle["baselines"]
+
+
+def update_baselines(baselines, df):
+
+    # Only events the model did not flag feed the baselines, so an attack
+    # does not teach the index that its IPs and volumes are normal.
+    if "anomaly_flag" in df:
+        df = df[df["anomaly_flag"] != -1]
+
+    return baselines.update(df)
+
+
+def fold_baselines(delta, digest, path=BASELINES_PATH):
+
+    # Merge one scan's update (a UserBaselines built from its events only)
+    # into the index as currently saved, unless a scan with the same events
+    # digest (events_digest) was folded before. Scans running side by side,
+    # in this process (core.jobs) or another (core.cli), then never
+    # overwrite each other's updates.
+    key = "%d:%016x" % digest
+
+    with _fold_lock, _locked(path):
+        bundle = _load_bundle(path)
+
+        if bundle is None:
+            return None
+
+        baselines = bundle["baselines"]
+        folded = bundle.get("folded_scans", [])
+
+        if key in folded:
+            return baselines
+
+        baselines.merge(delta)
+        save_baselines(baselines, path, folded + [key])
+
+    return baselines
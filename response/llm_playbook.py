@@ -1,8 +1,22 @@
-import ollama
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 
-def generate_playbook(incident):
+from response.playbook_cache import get_playbook_cache, playbook_cache_key
 
-    system_prompt = """
+PLAYBOOK_MODEL = os.environ.get("AEGISIR_PLAYBOOK_MODEL", "llama3")
+
+PLAYBOOK_OPTIONS = {
+    "temperature": 0.2,
+    "top_p": 0.8
+}
+
+# Concurrent ollama requests per scan, and the per-request timeout (seconds)
+MAX_CONCURRENT_PLAYBOOKS = int(os.environ.get("AEGISIR_PLAYBOOK_CONCURRENCY", "4"))
+PLAYBOOK_TIMEOUT_SECONDS = float(os.environ.get("AEGISIR_PLAYBOOK_TIMEOUT", "120"))
+
+SYSTEM_PROMPT = """
 You are a cybersecurity incident response assistant.
 
 Rules:
@@ -14,6 +28,30 @@ Rules:
 - Focus on containment, investigation, eradication, recovery, and prevention.
 """
 
+# Basic safety filtering
+FORBIDDEN_KEYWORDS = ["sudo", "rm -rf", "shutdown", "format", "wget", "curl"]
+
+UNSAFE_PLAYBOOK_MESSAGE = "Generated response contained unsafe instructions and was blocked."
+FAILED_PLAYBOOK_MESSAGE = "Playbook generation failed. Ensure Ollama is installed and running."
+CANCELLED_PLAYBOOK_MESSAGE = "Playbook generation was cancelled."
+
+_clients = {}
+
+
+def _client(timeout):
+
+    # One HTTP client per timeout; OLLAMA_HOST is honoured by ollama.Client.
+    # Imported here so scans without playbooks never load it.
+    if timeout not in _clients:
+        import ollama
+
+        _clients[timeout] = ollama.Client(timeout=timeout)
+
+    return _clients[timeout]
+
+
+def build_prompts(incident):
+
     user_prompt = f"""
 Incident Type: {incident['incident_type']}
 Severity Level: {incident['severity_level']}
@@ -29,29 +67,260 @@ Generate a structured response playbook with:
 5. Post-Incident Recommendations
 """
 
+    return SYSTEM_PROMPT, user_prompt
+
+
+def is_unsafe(content):
+
+    content = content.lower()
+
+    return any(keyword in content for keyword in FORBIDDEN_KEYWORDS)
+
+
+def playbook_cache_stats():
+
+    cache = get_playbook_cache()
+
+    return cache.stats() if cache is not None else None
+
+
+def _chat(system_prompt, user_prompt, timeout, stream=False):
+
+    return _client(timeout).chat(
+        model=PLAYBOOK_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        options=PLAYBOOK_OPTIONS,
+        stream=stream
+    )
+
+
+def generate_playbook(incident, timeout=PLAYBOOK_TIMEOUT_SECONDS):
+
+    system_prompt, user_prompt = build_prompts(incident)
+
+    # Same prompt, model and sampling options -> reuse the stored playbook
+    cache = get_playbook_cache()
+    key = playbook_cache_key(system_prompt, user_prompt, PLAYBOOK_MODEL, PLAYBOOK_OPTIONS)
+
+    if cache is not None:
+        cached = cache.get(key)
+
+        if cached is not None:
+            return cached
+
     try:
-        response = ollama.chat(
-            model="llama3",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            options={
-                "temperature": 0.2,
-                "top_p": 0.8
-            }
-        )
+        response = _chat(system_prompt, user_prompt, timeout)
 
         content = response["message"]["content"]
 
-        # Basic safety filtering
-        forbidden_keywords = ["sudo", "rm -rf", "shutdown", "format", "wget", "curl"]
+        if is_unsafe(content):
+            return UNSAFE_PLAYBOOK_MESSAGE
 
-        for keyword in forbidden_keywords:
-            if keyword in content.lower():
-                return "Generated response contained unsafe instructions and was blocked."
+        if cache is not None:
+            cache.put(key, content)
 
         return content
 
     except Exception:
-        return "Playbook generation failed. Ensure Ollama is installed and running."
\ No newline at end of file
+        return FAILED_PLAYBOOK_MESSAGE
+
+
+def stream_playbook(incident, timeout=PLAYBOOK_TIMEOUT_SECONDS):
+
+    # Yields the playbook text shown so far (cumulative, not deltas); the
+    # last value is the final playbook or one of the *_MESSAGE strings.
+    system_prompt, user_prompt = build_prompts(incident)
+
+    cache = get_playbook_cache()
+    key = playbook_cache_key(system_prompt, user_prompt, PLAYBOOK_MODEL, PLAYBOOK_OPTIONS)
+
+    if cache is not None:
+        cached = cache.get(key)
+
+        if cached is not None:
+            yield cached
+            return
+
+    # Text is held back until it can no longer be the start of a forbidden
+    # keyword, and only the new tail (plus that overlap) is rescanned.
+    holdback = max(len(keyword) for keyword in FORBIDDEN_KEYWORDS) - 1
+
+    content = ""
+    scanned = 0
+    shown = 0
+
+    # The HTTP timeout only bounds the gap between chunks
+    deadline = time.monotonic() + timeout
+
+    try:
+        for chunk in _chat(system_prompt, user_prompt, timeout, stream=True):
+
+            if time.monotonic() > deadline:
+                yield FAILED_PLAYBOOK_MESSAGE
+                return
+
+            content += chunk["message"]["content"]
+
+            if is_unsafe(content[max(0, scanned - holdback):]):
+                yield UNSAFE_PLAYBOOK_MESSAGE
+                return
+
+            scanned = len(content)
+
+            if len(content) - holdback > shown:
+                shown = len(content) - holdback
+                yield content[:shown]
+
+    except Exception:
+        yield FAILED_PLAYBOOK_MESSAGE
+        return
+
+    if cache is not None:
+        cache.put(key, content)
+
+    yield content
+
+
+class PlaybookBatch:
+
+    # Playbooks for a list of incidents, generated on a bounded thread pool.
+    # Workers stream tokens, so stream() can show partial text for any
+    # incident while each incident's "playbook" key is filled in as soon as
+    # its generation finishes. on_complete(incidents), if given, is called
+    # once every playbook is final (generated, failed or cancelled).
+
+    def __init__(self, incidents, max_workers=MAX_CONCURRENT_PLAYBOOKS,
+                 timeout=PLAYBOOK_TIMEOUT_SECONDS, on_complete=None):
+
+        self._futures = {}
+        self._partial = {}
+        self._cancelled = False
+        self._incidents = list(incidents)
+        self._on_complete = on_complete
+        self._remaining = len(self._incidents)
+        self._remaining_lock = threading.Lock()
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="playbook"
+        )
+
+        for incident in self._incidents:
+            incident["playbook"] = None
+            future = executor.submit(self._generate, incident, timeout)
+            self._futures[future] = incident
+            future.add_done_callback(lambda f, incident=incident: self._finished(incident, f))
+
+        if not self._incidents and on_complete is not None:
+            on_complete(self._incidents)
+
+        # Worker threads exit once the queue is drained
+        executor.shutdown(wait=False)
+
+    def _generate(self, incident, timeout):
+
+        text = None
+
+        for text in stream_playbook(incident, timeout):
+
+            # Closing the generator also closes the HTTP stream
+            if self._cancelled:
+                return CANCELLED_PLAYBOOK_MESSAGE
+
+            self._partial[id(incident)] = text
+
+        return text
+
+    def _fill(self, incident, future):
+
+        if future.cancelled():
+            incident["playbook"] = CANCELLED_PLAYBOOK_MESSAGE
+        elif not self._cancelled:
+            incident["playbook"] = future.result()
+
+        self._partial.pop(id(incident), None)
+
+    def _finished(self, incident, future):
+
+        self._fill(incident, future)
+
+        with self._remaining_lock:
+            self._remaining -= 1
+            complete = self._remaining == 0
+
+        if complete and self._on_complete is not None:
+            self._on_complete(self._incidents)
+
+    def _future(self, incident):
+        for future, pending in self._futures.items():
+            if pending is incident:
+                return future
+
+    def done(self):
+        return all(future.done() for future in self._futures)
+
+    # Waiters can wake before done-callbacks have run, so the helpers below
+    # fill the incident themselves once a future is done.
+
+    def as_completed(self, timeout=None):
+        for future in as_completed(self._futures, timeout=timeout):
+            self._fill(self._futures[future], future)
+            yield self._futures[future]
+
+    def stream(self, incident, poll_interval=0.1):
+
+        # Cumulative text of one incident's playbook as it is generated
+        future = self._future(incident)
+        shown = None
+
+        while future is not None and not wait([future], timeout=poll_interval).done:
+            text = self._partial.get(id(incident))
+
+            if text is not None and text != shown:
+                shown = text
+                yield text
+
+        if future is not None:
+            self._fill(incident, future)
+
+        yield incident.get("playbook")
+
+    def wait_for(self, incident, timeout=None):
+
+        future = self._future(incident)
+
+        if future is not None and wait([future], timeout=timeout).done:
+            self._fill(incident, future)
+
+        return incident.get("playbook")
+
+    def wait(self, timeout=None):
+
+        # Anything not finished by the overall deadline is cancelled
+        done, not_done = wait(self._futures, timeout=timeout)
+
+        for future in done:
+            self._fill(self._futures[future], future)
+
+        if not_done:
+            self.cancel()
+
+        return list(self._futures.values())
+
+    def cancel(self):
+
+        # Queued requests are dropped and in-flight streams stop at their
+        # next token
+        self._cancelled = True
+
+        for future, incident in self._futures.items():
+            if not future.done() and not future.cancel():
+                incident["playbook"] = CANCELLED_PLAYBOOK_MESSAGE
+
+
+def generate_playbooks(incidents, max_workers=MAX_CONCURRENT_PLAYBOOKS,
+                       timeout=PLAYBOOK_TIMEOUT_SECONDS):
+
+    return PlaybookBatch(incidents, max_workers, timeout).wait()
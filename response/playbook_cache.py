@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Empty AEGISIR_PLAYBOOK_CACHE disables the cache
+CACHE_PATH = os.environ.get("AEGISIR_PLAYBOOK_CACHE", "logs/playbook_cache.db")
+CACHE_TTL_SECONDS = float(os.environ.get("AEGISIR_PLAYBOOK_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.environ.get("AEGISIR_PLAYBOOK_CACHE_SIZE", "1000"))
+
+
+def playbook_cache_key(system_prompt, user_prompt, model, options):
+
+    # Content address of one generation request
+    payload = json.dumps({
+        "system": system_prompt,
+        "user": user_prompt,
+        "model": model,
+        "options": options
+    }, sort_keys=True)
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PlaybookCache:
+
+    # SQLite-backed playbook store with TTL expiry and LRU eviction once
+    # max_entries is exceeded. Safe to share between playbook threads.
+
+    def __init__(self, path=CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS,
+                 max_entries=CACHE_MAX_ENTRIES):
+
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS playbooks ("
+            "key TEXT PRIMARY KEY, content TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS playbooks_last_used ON playbooks (last_used)"
+        )
+
+    def get(self, key):
+
+        now = time.time()
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content, created_at FROM playbooks WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._db.execute("DELETE FROM playbooks WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            self._db.execute(
+                "UPDATE playbooks SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+
+            return row[0]
+
+    def put(self, key, content):
+
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO playbooks (key, content, created_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, content, now, now)
+            )
+
+            evicted = self._db.execute(
+                "DELETE FROM playbooks WHERE key IN ("
+                "SELECT key FROM playbooks ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self.evictions += max(evicted, 0)
+
+    def stats(self):
+
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM playbooks").fetchone()[0]
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_cache = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_playbook_cache(path=CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS,
+                             max_entries=CACHE_MAX_ENTRIES):
+
+    # Replace the process-wide cache; a falsy path disables caching
+    global _cache, _configured
+
+    if _cache is not None:
+        _cache.close()
+
+    _cache = PlaybookCache(path, ttl_seconds, max_entries) if path else None
+    _configured = True
+
+    return _cache
+
+
+def get_playbook_cache():
+
+    # Playbook threads may race on the first lookup
+    with _configure_lock:
+        if not _configured:
+            configure_playbook_cache()
+
+    return _cache
@@ -1,27 +1,186 @@
-def calculate_severity(incident):
+import json
+import os
+import threading
 
-    anomaly_intensity = incident["anomalies_detected"] / incident["events_count"]
-    systems_impact = incident["systems_affected"] / 3
-    event_density = min(incident["events_count"] / 10, 1)
-    data_exfiltration_factor = 1
+import numpy as np
+
+# Severity = weighted sum of four factors in [0, 1], mapped to a level by
+# thresholds. Weights, scales and thresholds come from a JSON file:
+#
+#   anomaly_intensity   anomalies_detected / events_count
+#   systems_impact      systems_affected / total_systems
+#   event_density       min(events_count / dense_events, 1)
+#   data_exfiltration   min(risk_summary.max_data_transfer_mb / exfiltration_mb, 1)
+#
+# calculate_severity scores one incident; score_severity_batch scores a
+# columnar table (dict of arrays or DataFrame) with the same arithmetic, so
+# both give identical scores and levels.
+
+SEVERITY_PATH = os.environ.get(
+    "AEGISIR_SEVERITY_PATH", os.path.join(os.path.dirname(__file__), "severity.json")
+)
+
+FACTORS = ["anomaly_intensity", "systems_impact", "event_density", "data_exfiltration"]
+
+# Columns of the table score_severity_batch takes
+SEVERITY_COLUMNS = ["anomalies_detected", "events_count", "systems_affected", "max_data_transfer_mb"]
+
+
+def load_severity_config(path=SEVERITY_PATH):
+
+    with open(path, "r") as f:
+        document = json.load(f)
+
+    weights = document.get("weights", {})
+    missing = [factor for factor in FACTORS if factor not in weights]
+
+    if missing:
+        raise ValueError(f"{path}: missing weights for {', '.join(missing)}.")
+
+    # Highest threshold first, as the levels are tested in order
+    levels = sorted(
+        ((level["level"], float(level["min_score"])) for level in document.get("levels", [])),
+        key=lambda level: -level[1]
+    )
+
+    return {
+        "weights": {factor: float(weights[factor]) for factor in FACTORS},
+        "total_systems": float(document.get("total_systems", 3)),
+        "dense_events": float(document.get("dense_events", 10)),
+        "exfiltration_mb": float(document.get("exfiltration_mb", 500)),
+        "levels": levels,
+        "default_level": document.get("default_level", "Low"),
+        "version": os.path.getmtime(path)
+    }
+
+
+_configs = {}
+_configs_lock = threading.Lock()
+
+
+def get_severity_config(path=SEVERITY_PATH):
+
+    # Loaded once per file version, as correlation.rules does for rules
+    mtime = os.path.getmtime(path)
+
+    with _configs_lock:
+        cached = _configs.get(path)
+
+        if cached is None or cached["version"] != mtime:
+            cached = _configs[path] = load_severity_config(path)
+
+    return cached
+
+
+def _round(score):
+    # NumPy's rounding in both paths, so batch and scalar scores agree exactly
+    return np.round(score, 3)
+
+
+# ----------------------------
+# Scalar path
+# ----------------------------
+
+def calculate_severity(incident, config=None):
+
+    config = config or get_severity_config()
+    weights = config["weights"]
+
+    events = incident["events_count"]
+    transfer_mb = incident.get("risk_summary", {}).get("max_data_transfer_mb", 0.0)
+
+    anomaly_intensity = incident["anomalies_detected"] / events if events else 0.0
+    systems_impact = incident["systems_affected"] / config["total_systems"]
+    event_density = min(events / config["dense_events"], 1.0)
+    data_exfiltration_factor = min(transfer_mb / config["exfiltration_mb"], 1.0)
 
     severity_score = (
-        0.4 * anomaly_intensity +
-        0.3 * systems_impact +
-        0.2 * event_density +
-        0.1 * data_exfiltration_factor
+        weights["anomaly_intensity"] * anomaly_intensity +
+        weights["systems_impact"] * systems_impact +
+        weights["event_density"] * event_density +
+        weights["data_exfiltration"] * data_exfiltration_factor
     )
 
-    if severity_score >= 0.8:
-        level = "Critical"
-    elif severity_score >= 0.6:
-        level = "High"
-    elif severity_score >= 0.4:
-        level = "Medium"
-    else:
-        level = "Low"
+    level = config["default_level"]
+    for name, min_score in config["levels"]:
+        if severity_score >= min_score:
+            level = name
+            break
 
     return {
-        "severity_score": round(severity_score, 3),
+        "severity_score": float(_round(severity_score)),
         "severity_level": level
     }
+
+
+# ----------------------------
+# Batch path
+# ----------------------------
+
+def severity_table(incidents):
+
+    # Columnar view of incident dicts for score_severity_batch
+    n = len(incidents)
+
+    table = {
+        column: np.fromiter((incident[column] for incident in incidents), dtype=np.float64, count=n)
+        for column in SEVERITY_COLUMNS[:3]
+    }
+    table["max_data_transfer_mb"] = np.fromiter(
+        (incident.get("risk_summary", {}).get("max_data_transfer_mb", 0.0) for incident in incidents),
+        dtype=np.float64, count=n
+    )
+
+    return table
+
+
+def score_severity_batch(table, config=None):
+
+    # Arrays of scores (float64, rounded to 3 places) and levels (str)
+    config = config or get_severity_config()
+    weights = config["weights"]
+
+    anomalies, events, systems, transfer_mb = (
+        np.asarray(table[column], dtype=np.float64) for column in SEVERITY_COLUMNS
+    )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        anomaly_intensity = np.where(events != 0, anomalies / events, 0.0)
+
+    systems_impact = systems / config["total_systems"]
+    event_density = np.minimum(events / config["dense_events"], 1.0)
+    data_exfiltration_factor = np.minimum(transfer_mb / config["exfiltration_mb"], 1.0)
+
+    scores = (
+        weights["anomaly_intensity"] * anomaly_intensity +
+        weights["systems_impact"] * systems_impact +
+        weights["event_density"] * event_density +
+        weights["data_exfiltration"] * data_exfiltration_factor
+    )
+
+    # np.select refuses an empty list; without thresholds all get the default
+    if config["levels"]:
+        levels = np.select(
+            [scores >= min_score for _, min_score in config["levels"]],
+            [name for name, _ in config["levels"]],
+            default=config["default_level"]
+        )
+    else:
+        levels = np.full(scores.shape, config["default_level"])
+
+    return _round(scores), levels
+
+
+def score_incidents(incidents, config=None):
+
+    # Batch-score incident dicts in place (the pipeline's severity stage)
+    if not incidents:
+        return incidents
+
+    scores, levels = score_severity_batch(severity_table(incidents), config)
+
+    for incident, score, level in zip(incidents, scores.tolist(), levels.tolist()):
+        incident["severity_score"] = score
+        incident["severity_level"] = level
+
+    return incidents
@@ -1,36 +1,125 @@
-MAX_FILE_SIZE_MB = 5
+# Uploads are parsed incrementally (preprocessing.log_reader), so this only
+# guards against runaway files rather than parser memory.
+MAX_FILE_SIZE_MB = 4096
 
-REQUIRED_FIELDS = [
-    "timestamp",
-    "user"
-]
+# Per-source record schemas: field -> (type, required). Optional fields may
+# be missing or null.
+LOG_SCHEMAS = {
+    "auth": {
+        "timestamp": ("string", True),
+        "user": ("string", True),
+        "status": ("string", False),
+        "ip": ("string", False)
+    },
+    "endpoint": {
+        "timestamp": ("string", True),
+        "user": ("string", True),
+        "event_type": ("string", False),
+        "sensitive_access": ("boolean", False)
+    },
+    "network": {
+        "timestamp": ("string", True),
+        "user": ("string", True),
+        "data_volume_mb": ("number", False)
+    }
+}
 
-def validate_file_size(file):
-    file.seek(0, 2)
-    size_mb = file.tell() / (1024 * 1024)
-    file.seek(0)
+# Diagnostics kept per scan; further bad records are only counted
+MAX_REPORTED_ERRORS = 50
 
-    if size_mb > MAX_FILE_SIZE_MB:
-        raise ValueError("File exceeds maximum allowed size (5MB).")
-
-    return True
+_TYPE_CHECKS = {
+    "string": lambda value: isinstance(value, str),
+    "boolean": lambda value: isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool)
+}
 
 
-def validate_logs(data):
+def compile_schema(schema):
 
-    # Allow wrapped format like {"logs": [...]}
-    if isinstance(data, dict) and "logs" in data:
-        data = data["logs"]
+    # Turns a declarative schema into one check(entry) -> error-or-None
+    # function, so the per-record cost is a flat loop over field rules.
+    rules = tuple(
+        (field, _TYPE_CHECKS[type_name], type_name, required)
+        for field, (type_name, required) in schema.items()
+    )
 
-    if not isinstance(data, list):
-        raise ValueError("Logs must be a list of JSON objects.")
+    def check(entry):
 
-    for entry in data:
         if not isinstance(entry, dict):
-            raise ValueError("Each log entry must be a JSON object.")
+            return "Each log entry must be a JSON object."
+
+        for field, is_type, type_name, required in rules:
+            value = entry.get(field)
+
+            if value is None:
+                if required:
+                    return f"Missing required field: {field}"
+            elif not is_type(value):
+                return f"Field '{field}' must be a {type_name}."
+
+        return None
+
+    return check
+
+
+LOG_VALIDATORS = {source: compile_schema(schema) for source, schema in LOG_SCHEMAS.items()}
+
+
+class ValidationReport:
+
+    # Bad-record diagnostics collected during ingestion instead of failing
+    # the whole scan on the first malformed row.
+
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.max_errors = max_errors
+        self.records = {}
+        self.invalid = {}
+        self.errors = []
+
+    def count(self, source, n_records):
+        self.records[source] = self.records.get(source, 0) + n_records
 
-        for field in REQUIRED_FIELDS:
-            if field not in entry:
-                raise ValueError(f"Missing required field: {field}")
+    def reject(self, source, index, error):
+
+        self.invalid[source] = self.invalid.get(source, 0) + 1
+
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"source": source, "record": index, "error": error})
+
+    def merge(self, other, offset=0):
+
+        # Folds in the report of one slice of a source; its record indexes
+        # are shifted by offset, the number of records before the slice.
+        for source, n_records in other.records.items():
+            self.count(source, n_records)
+
+        for source, n_invalid in other.invalid.items():
+            self.invalid[source] = self.invalid.get(source, 0) + n_invalid
+
+        for error in other.errors[:max(self.max_errors - len(self.errors), 0)]:
+            record = error["record"]
+            self.errors.append(dict(error, record=None if record is None else record + offset))
+
+    @property
+    def invalid_records(self):
+        return sum(self.invalid.values())
+
+    def as_dict(self):
+        return {
+            "total_records": sum(self.records.values()),
+            "invalid_records": self.invalid_records,
+            "invalid_by_source": dict(self.invalid),
+            "errors": list(self.errors)
+        }
+
+
+def validate_file_size(file):
+    file.seek(0, 2)
+    size_mb = file.tell() / (1024 * 1024)
+    file.seek(0)
+
+    if size_mb > MAX_FILE_SIZE_MB:
+        raise ValueError(f"File exceeds maximum allowed size ({MAX_FILE_SIZE_MB}MB).")
 
     return True
+
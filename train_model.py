@@ -0,0 +1,49 @@
+import argparse
+
+from preprocessing.feature_engineering import preprocess_logs
+from preprocessing.log_reader import stream_logs
+from preprocessing.user_baselines import BASELINES_PATH, UserBaselines, build_baselines, save_baselines
+from detection.anomaly_model import MODEL_PATH, fit_anomaly_model, model_features, save_anomaly_model
+from detection.online_model import fit_online_model
+
+# --------------------------
+# Train the baseline anomaly model once; scans then only score against it.
+# --------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the AegisIR baseline anomaly model.")
+    parser.add_argument("--auth", default="auth_logs.json")
+    parser.add_argument("--endpoint", default="endpoint_logs.json")
+    parser.add_argument("--network", default="network_logs.json")
+    parser.add_argument("--output", default=MODEL_PATH)
+    parser.add_argument("--online", action="store_true",
+                        help="warm-start an online model (detection.online_model) instead")
+    parser.add_argument("--baselines", action="store_true",
+                        help="also build the per-user baseline index and train on its deviation features")
+    parser.add_argument("--baselines-output", default=BASELINES_PATH)
+    args = parser.parse_args()
+
+    with open(args.auth, "rb") as auth, open(args.endpoint, "rb") as endpoint, \
+            open(args.network, "rb") as network:
+        df = preprocess_logs(
+            stream_logs(auth), stream_logs(endpoint), stream_logs(network),
+            baselines=UserBaselines() if args.baselines else None
+        )
+
+    baselines = None
+    if args.baselines:
+        df, baselines = build_baselines(df)
+
+    features = model_features(df)
+    model = fit_online_model(df, features=features) if args.online else fit_anomaly_model(df, features)
+    path = save_anomaly_model(model, args.output, training_rows=len(df), features=features)
+
+    print(f"Baseline model trained on {len(df)} events and saved to {path}.")
+
+    if baselines is not None:
+        path = save_baselines(baselines, args.baselines_output)
+        print(f"Baselines for {len(baselines)} users saved to {path}.")
+
+
+if __name__ == "__main__":
+    main()
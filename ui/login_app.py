@@ -6,8 +6,8 @@ import os
 # Allow importing core modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from core.pipeline import run_detection_pipeline
-from security.validator import validate_file_size, validate_logs
+from security.validator import validate_file_size
+from ui.scan_jobs import follow_scan_job, submit_scan
 
 # ----------------------------
 # Page Config
@@ -71,6 +71,7 @@ if "authenticated" not in st.session_state:
     st.session_state.authenticated = False
     st.session_state.role = None
     st.session_state.results = None
+    st.session_state.playbooks = None
 
 # ----------------------------
 # Login Screen
@@ -111,9 +112,9 @@ st.markdown(
 
 st.sidebar.header("📂 Upload Log Files")
 
-auth_file = st.sidebar.file_uploader("Auth Logs (JSON)", type=["json"])
-endpoint_file = st.sidebar.file_uploader("Endpoint Logs (JSON)", type=["json"])
-network_file = st.sidebar.file_uploader("Network Logs (JSON)", type=["json"])
+auth_file = st.sidebar.file_uploader("Auth Logs (JSON)", type=["json", "jsonl"])
+endpoint_file = st.sidebar.file_uploader("Endpoint Logs (JSON)", type=["json", "jsonl"])
+network_file = st.sidebar.file_uploader("Network Logs (JSON)", type=["json", "jsonl"])
 
 if auth_file and endpoint_file and network_file:
 
@@ -122,28 +123,23 @@ if auth_file and endpoint_file and network_file:
         validate_file_size(endpoint_file)
         validate_file_size(network_file)
 
-        auth_logs = json.loads(auth_file.getvalue().decode("utf-8"))
-        endpoint_logs = json.loads(endpoint_file.getvalue().decode("utf-8"))
-        network_logs = json.loads(network_file.getvalue().decode("utf-8"))
-
-        if isinstance(auth_logs, dict) and "logs" in auth_logs:
-            auth_logs = auth_logs["logs"]
-
-        validate_logs(auth_logs)
-        validate_logs(endpoint_logs)
-        validate_logs(network_logs)
-
         if st.sidebar.button("Start Security Scan"):
-            with st.spinner("Running AI-powered detection..."):
-                st.session_state.results = run_detection_pipeline(
-                    auth_logs,
-                    endpoint_logs,
-                    network_logs
-                )
+            submit_scan(auth_file, endpoint_file, network_file)
 
     except Exception as e:
         st.error(f"Error: {str(e)}")
 
+# Background scan (core.jobs): progress until it finishes
+job = follow_scan_job()
+
+if job is not None and job["status"] == "failed":
+    st.error(f"Error: {job['error']}")
+
+elif job is not None:
+    skipped = job["results"]["validation"]["invalid_records"]
+    if skipped:
+        st.sidebar.warning(f"{skipped} malformed log records were skipped.")
+
 if st.session_state.results:
 
     results = st.session_state.results
@@ -196,6 +192,7 @@ if results["incidents"]:
         st.write("**User:**", incident["user"])
         st.write("**Type:**", incident["incident_type"])
         st.write("**Start Time:**", incident["start_time"])
+        st.write("**End Time:**", incident.get("end_time", incident["start_time"]))
         st.write("**Systems Affected:**", incident["systems_affected"])
         st.write("**Events in Window:**", incident["events_count"])
         st.write("**Anomalies Detected:**", incident["anomalies_detected"])
@@ -280,6 +277,13 @@ if results["incidents"]:
     if st.session_state.role in ["Admin", "SOC Analyst"]:
         st.subheader("🛠 Response Playbook")
 
+        if not incident.get("playbook") and st.session_state.playbooks is not None:
+            # Render tokens as they arrive; the final text is shown below
+            placeholder = st.empty()
+            for text in st.session_state.playbooks.stream(incident):
+                placeholder.markdown(text)
+            placeholder.empty()
+
         if incident.get("playbook"):
             st.markdown(incident["playbook"])
         else:
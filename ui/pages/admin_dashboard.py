@@ -1,34 +1,89 @@
 import streamlit as st
-import json
+import pandas as pd
+import sys
 import os
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from audit.usage_store import get_usage_store
+from core.result_cache import get_result_cache
+from core.jobs import get_scan_jobs
+from audit.logger import audit_writer_stats
+
 st.set_page_config(page_title="Admin Dashboard", layout="wide")
 
 st.title("AegisIR System Usage Monitor")
 
-log_path = "logs/system_usage.json"
+store = get_usage_store()
+
+# O(1) running totals and an indexed page of recent runs, however long
+# the history is
+summary = store.summary()
 
-if not os.path.exists(log_path):
+if summary["total_runs"] == 0:
     st.info("No system usage recorded yet.")
 else:
-    with open(log_path, "r") as f:
-        usage_data = json.load(f)
-
     st.subheader("System Usage History")
 
-    for record in usage_data[::-1]:
+    for record in store.recent_runs():
         st.write(
             f"🕒 {record['timestamp']} | "
             f"Logs Processed: {record['total_logs']} | "
             f"Incidents Detected: {record['incidents_detected']}"
         )
 
-    total_runs = len(usage_data)
-    total_incidents = sum(r["incidents_detected"] for r in usage_data)
-
     st.markdown("---")
     st.subheader("Summary Metrics")
 
     col1, col2 = st.columns(2)
-    col1.metric("Total System Runs", total_runs)
-    col2.metric("Total Incidents Generated", total_incidents)
+    col1.metric("Total System Runs", summary["total_runs"])
+    col2.metric("Total Incidents Generated", summary["total_incidents"])
+
+    # Stage latency over recent scans (core.instrumentation)
+    latency = store.stage_latency_percentiles()
+
+    if latency:
+        st.markdown("---")
+        st.subheader("Pipeline Stage Latency (recent runs)")
+
+        latency_df = pd.DataFrame.from_dict(latency, orient="index")
+        st.bar_chart(latency_df[["p50_ms", "p95_ms"]])
+        st.dataframe(latency_df)
+
+# Scan result cache, shared by every session of this app process
+cache_stats = get_result_cache().stats()
+
+st.markdown("---")
+st.subheader("Scan Result Cache")
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Hit Rate", f"{cache_stats['hit_rate'] * 100:.0f}%")
+col2.metric("In Memory", f"{cache_stats['memory_entries']} ({cache_stats['memory_mb']} MB)")
+col3.metric("On Disk", f"{cache_stats['disk_entries']} ({cache_stats['disk_mb']} MB)")
+
+# Background scan jobs (core.jobs)
+jobs = get_scan_jobs()
+job_counts = jobs.counts()
+
+st.markdown("---")
+st.subheader("Scan Jobs")
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Running", f"{job_counts['running']} / {jobs.workers} workers")
+col2.metric("Queued", job_counts["queued"])
+col3.metric("Finished", job_counts["done"])
+col4.metric("Failed", job_counts["failed"])
+
+# Audit writer of this app process (audit.logger)
+audit_stats = audit_writer_stats()
+
+st.markdown("---")
+st.subheader("Audit Log Writer")
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Records Written", audit_stats["written"])
+col2.metric("Write Failures", audit_stats["failed"])
+col3.metric("Queued", audit_stats["queued"])
+
+if audit_stats["failed"]:
+    st.error(f"Audit records were lost. Last error: {audit_stats['last_error']}")
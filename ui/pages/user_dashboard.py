@@ -1,13 +1,11 @@
 import streamlit as st
-import json
 import sys
 import os
-from datetime import datetime
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from core.pipeline import run_detection_pipeline
-from security.validator import validate_file_size, validate_logs
+from security.validator import validate_file_size
+from ui.scan_jobs import follow_scan_job, submit_scan
 
 st.set_page_config(page_title="AegisIR - User Dashboard", layout="wide")
 
@@ -16,12 +14,13 @@ st.title("AegisIR SOC Detection System")
 # Sidebar upload
 st.sidebar.header("Upload Log Files")
 
-auth_file = st.sidebar.file_uploader("Auth Logs (JSON)", type=["json"])
-endpoint_file = st.sidebar.file_uploader("Endpoint Logs (JSON)", type=["json"])
-network_file = st.sidebar.file_uploader("Network Logs (JSON)", type=["json"])
+auth_file = st.sidebar.file_uploader("Auth Logs (JSON)", type=["json", "jsonl"])
+endpoint_file = st.sidebar.file_uploader("Endpoint Logs (JSON)", type=["json", "jsonl"])
+network_file = st.sidebar.file_uploader("Network Logs (JSON)", type=["json", "jsonl"])
 
 if "results" not in st.session_state:
     st.session_state.results = None
+    st.session_state.playbooks = None
 
 if auth_file and endpoint_file and network_file:
 
@@ -30,49 +29,24 @@ if auth_file and endpoint_file and network_file:
         validate_file_size(endpoint_file)
         validate_file_size(network_file)
 
-        auth_logs = json.loads(auth_file.getvalue().decode("utf-8"))
-        endpoint_logs = json.loads(endpoint_file.getvalue().decode("utf-8"))
-        network_logs = json.loads(network_file.getvalue().decode("utf-8"))
-
-        if isinstance(auth_logs, dict) and "logs" in auth_logs:
-            auth_logs = auth_logs["logs"]
-
-        validate_logs(auth_logs)
-        validate_logs(endpoint_logs)
-        validate_logs(network_logs)
-
         if st.sidebar.button("Start Security Scan"):
-            with st.spinner("Running AI Detection..."):
-                st.session_state.results = run_detection_pipeline(
-                    auth_logs,
-                    endpoint_logs,
-                    network_logs
-                )
-
-                # 🔥 Log system usage
-                usage_record = {
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "incidents_detected": len(st.session_state.results["incidents"]),
-                    "total_logs": st.session_state.results["total_logs"]
-                }
-
-                os.makedirs("logs", exist_ok=True)
-
-                log_path = "logs/system_usage.json"
+            # Background job; same uploads as an earlier scan are served from
+            # the result cache. 🔥 The job logs system usage when it finishes.
+            submit_scan(auth_file, endpoint_file, network_file, record_usage=True)
 
-                if os.path.exists(log_path):
-                    with open(log_path, "r") as f:
-                        data = json.load(f)
-                else:
-                    data = []
+    except Exception as e:
+        st.error(str(e))
 
-                data.append(usage_record)
+# Survives reruns and switching to the admin page and back
+job = follow_scan_job()
 
-                with open(log_path, "w") as f:
-                    json.dump(data, f, indent=4)
+if job is not None and job["status"] == "failed":
+    st.error(job["error"])
 
-    except Exception as e:
-        st.error(str(e))
+elif job is not None:
+    skipped = job["results"]["validation"]["invalid_records"]
+    if skipped:
+        st.sidebar.warning(f"{skipped} malformed log records were skipped.")
 
 if st.session_state.results:
 
@@ -110,6 +84,7 @@ if st.session_state.results:
         st.write("Detection Confidence:", f"{confidence_percent}%")
         st.write("Incident Type:", incident["incident_type"])
         st.write("Start Time:", incident["start_time"])
+        st.write("End Time:", incident.get("end_time", incident["start_time"]))
 
         st.markdown("---")
 
@@ -124,6 +99,13 @@ if st.session_state.results:
 
         st.markdown("---")
 
+        if not incident.get("playbook") and st.session_state.playbooks is not None:
+            # Render tokens as they arrive; the final text is shown below
+            placeholder = st.empty()
+            for text in st.session_state.playbooks.stream(incident):
+                placeholder.markdown(text)
+            placeholder.empty()
+
         if incident.get("playbook"):
             st.subheader("Response Playbook")
             st.markdown(incident["playbook"])
@@ -0,0 +1,67 @@
+import time
+from functools import partial
+
+import streamlit as st
+
+from core.jobs import get_scan_jobs
+from audit.logger import write_playbook_audit
+from response.llm_playbook import PlaybookBatch
+
+# Polling period while the session's scan job is queued or running
+POLL_SECONDS = 0.5
+
+
+def submit_scan(auth_file, endpoint_file, network_file, record_usage=False):
+
+    # Queue the scan (core.jobs) and remember its id in the session, so
+    # reruns and page switches pick it up again
+    st.session_state.scan_job_id = get_scan_jobs().submit(
+        auth_file, endpoint_file, network_file, record_usage=record_usage
+    )
+    st.session_state.results = None
+    st.session_state.playbooks = None
+
+
+def follow_scan_job():
+
+    # Call on every rerun. While the session's job is queued or running this
+    # shows its progress and reruns the page; when it has finished, results
+    # move into st.session_state and the job is returned (once).
+    job_id = st.session_state.get("scan_job_id")
+
+    if job_id is None:
+        return None
+
+    job = get_scan_jobs().get(job_id)
+
+    if job is None:
+        st.session_state.scan_job_id = None
+        return None
+
+    if job["status"] == "queued":
+        st.sidebar.progress(0.0, text="Scan queued...")
+        time.sleep(POLL_SECONDS)
+        st.rerun()
+
+    if job["status"] == "running":
+        stage = (job["stage"] or "starting").replace("_", " ")
+        st.sidebar.progress(job["progress"], text=f"Scanning: {stage}...")
+        time.sleep(POLL_SECONDS)
+        st.rerun()
+
+    st.session_state.scan_job_id = None
+
+    if job["status"] == "done":
+        results = job["results"]
+        st.session_state.results = results
+
+        # The scan's audit record was written before its playbooks existed;
+        # a follow-up record carries them (cache hits were audited before)
+        on_complete = None
+        if not results["cached"]:
+            on_complete = partial(write_playbook_audit, results["run_id"])
+
+        # Playbooks are generated in the background while results render
+        st.session_state.playbooks = PlaybookBatch(results["incidents"], on_complete=on_complete)
+
+    return job